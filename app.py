@@ -8,8 +8,11 @@ import plotly.express as px
 # 导入自定义模块
 from data_fetcher import BinanceDataFetcher
 from indicators import TechnicalIndicators
+from indicator_cache import IndicatorCache
+from indicator_registry import parameter_keys, warmup_bars
 from backtest_engine import BacktestEngine
 from chart_utils import ChartUtils
+from memory_utils import from_compact, memory_report
 
 # 设置页面配置
 st.set_page_config(
@@ -30,6 +33,13 @@ def get_data_fetcher():
 
 data_fetcher = get_data_fetcher()
 
+# 指标缓存在多次回测之间共享，只修改交易参数时不再重复计算指标
+@st.cache_resource
+def get_indicator_cache():
+    return IndicatorCache()
+
+indicator_cache = get_indicator_cache()
+
 # 侧边栏配置
 st.sidebar.header("📊 回测配置")
 
@@ -100,6 +110,12 @@ commission = st.sidebar.slider(
     step=0.01
 ) / 100
 
+compact_mode = st.sidebar.checkbox(
+    "紧凑内存模式",
+    value=False,
+    help="价格与指标使用float32存储，内存约减半，适合长周期1分钟数据（相对误差<1e-5）"
+)
+
 # 止盈止损设置
 st.sidebar.subheader("止盈止损")
 use_take_profit = st.sidebar.checkbox("启用止盈", value=False)
@@ -243,6 +259,22 @@ if st.sidebar.checkbox("ATR"):
     indicators['atr'] = True
     indicators['atr_period'] = atr_period
 
+# 高周期RSI过滤（只使用已收盘的高周期K线）
+if st.sidebar.checkbox("高周期RSI过滤"):
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        htf_timeframe = st.selectbox("过滤周期", ["1h", "4h", "1d", "1w"], index=1)
+    with col2:
+        htf_rsi_period = st.number_input("高周期RSI周期", min_value=5, max_value=30, value=14)
+    htf_buy_range = st.sidebar.slider("允许买入的高周期RSI区间", 0, 100, (50, 100))
+    
+    indicators['higher_timeframes'] = {htf_timeframe: {'rsi': True, 'rsi_period': htf_rsi_period}}
+    indicators['htf_filter'] = {
+        'column': f'RSI_{htf_timeframe}',
+        'buy_min': htf_buy_range[0],
+        'buy_max': htf_buy_range[1]
+    }
+
 # 广告位
 st.sidebar.markdown("---")
 st.sidebar.markdown(
@@ -265,26 +297,38 @@ run_backtest = st.sidebar.button("🚀 运行回测", type="primary")
 if run_backtest:
     with st.spinner("正在获取数据..."):
         # 获取历史数据
+        timeframe = timeframe_options[selected_timeframe]
         df = data_fetcher.fetch_historical_data(
             selected_symbol,
             start_date,
             end_date,
-            timeframe_options[selected_timeframe]
+            timeframe,
+            compact=compact_mode,
+            warmup_bars=warmup_bars(indicators, timeframe)
         )
         
         if df.empty:
             st.error("无法获取数据，请检查网络连接或选择其他时间范围")
         else:
-            st.success(f"成功获取 {len(df)} 条数据")
+            # 数据开头包含开始日期之前的指标预热K线，只用于指标计算和回测，不计入条数、不在图表中显示
+            start_ts = pd.Timestamp(start_date)
+            first_bar = int(df.index.searchsorted(
+                start_ts if isinstance(df.index, pd.DatetimeIndex) else start_ts.value // 10**6))
+            st.success(f"成功获取 {len(df) - first_bar} 条数据"
+                       + (f"（另含 {first_bar} 条指标预热数据）" if first_bar else ""))
             
-            # 计算技术指标
-            with st.spinner("正在计算技术指标..."):
-                df_with_indicators = TechnicalIndicators.calculate_all_indicators(df, indicators)
+            # 技术指标按需计算：只有回测信号和图表实际读取的指标列才会被计算
+            df_with_indicators = TechnicalIndicators.calculate_all_indicators(
+                df, indicators, cache=indicator_cache, lazy=True
+            )
             
             # 运行回测
-            with st.spinner("正在运行回测..."):
+            with st.spinner("正在计算技术指标并运行回测..."):
                 engine = BacktestEngine(initial_capital, commission, take_profit_pct, stop_loss_pct)
-                results = engine.run_backtest(df_with_indicators, indicators)
+                # 与获取数据时的预热K线数一致（含高周期指标），权益曲线从所选开始日期起算
+                results = engine.run_backtest(df_with_indicators, indicators, timeframe=timeframe)
+            
+            st.caption(f"数据内存占用: {memory_report(df_with_indicators)['total_mb']:.2f} MB")
             
             if results:
                 # 显示回测结果
@@ -326,20 +370,19 @@ if run_backtest:
                 # 图表展示
                 st.header("📈 图表分析")
                 
+                # 图表需要datetime索引；非紧凑模式下图表直接读取惰性指标表。图表从所选开始日期起显示
+                chart_df = (from_compact(df_with_indicators.to_frame()).iloc[first_bar:] if compact_mode
+                            else df_with_indicators.rows(first_bar))
+                
                 # 创建标签页
                 tab1, tab2, tab3, tab4, tab5 = st.tabs(["技术分析", "权益曲线", "回撤分析", "交易点位", "交易记录"])
                 
                 with tab1:
                     # 技术分析图
-                    selected_indicators = [k for k in indicators.keys() if k not in ['rsi_period', 'rsi_oversold', 'rsi_overbought', 
-                                                                                   'kdj_k_period', 'kdj_d_period', 'kdj_j_period', 
-                                                                                   'kdj_buy_threshold', 'kdj_sell_threshold',
-                                                                                   'bb_period', 'bb_std', 'ema_periods', 'ema_short', 
-                                                                                   'ema_long', 'sma_periods', 'macd_fast', 'macd_slow', 
-                                                                                   'macd_signal', 'stoch_k_period', 'stoch_d_period', 'atr_period']]
+                    selected_indicators = [k for k in indicators.keys() if k not in parameter_keys()]
                     
                     tech_chart = ChartUtils.create_technical_chart(
-                        df_with_indicators, 
+                        chart_df, 
                         selected_indicators,
                         f"{selected_symbol} 技术分析"
                     )
@@ -364,7 +407,7 @@ if run_backtest:
                 with tab4:
                     # 交易点位图
                     trade_chart = ChartUtils.create_trade_chart(
-                        df_with_indicators,
+                        chart_df,
                         results['trades'],
                         f"{selected_symbol} 交易点位"
                     )
@@ -432,8 +475,9 @@ else:
         main_coins = ['BTC/USDT', 'ETH/USDT', 'BNB/USDT', 'ADA/USDT']
         price_data = []
         
+        prices = data_fetcher.get_current_prices(main_coins)
         for coin in main_coins:
-            price = data_fetcher.get_current_price(coin)
+            price = prices.get(coin)
             if price:
                 price_data.append({
                     '币种': coin,
@@ -0,0 +1,360 @@
+import asyncio
+import os
+import time
+import pandas as pd
+import ccxt.async_support as ccxt_async
+from datetime import datetime, timedelta
+
+from config import DEFAULT_CONFIG
+from data_fetcher import (BinanceDataFetcher, parse_date, record_leading_gap, split_windows, stitch_candles,
+                          ticker_weight)
+from data_quality import GapRegistry, validate_ohlcv
+from resampler import bars_before
+
+
+class AsyncRequestWeightLimiter:
+    """
+    请求权重限速器（asyncio版令牌桶）
+
+    与 RequestWeightLimiter 的参数含义相同，供同一事件循环内的所有协程共享。
+    """
+
+    def __init__(self, weight_per_minute):
+        self.rate = weight_per_minute / 60.0
+        self.capacity = max(weight_per_minute / 10.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, weight=1):
+        """等待直到可以消耗指定权重"""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= weight:
+                self.tokens -= weight
+                return
+
+            await asyncio.sleep((weight - self.tokens) / self.rate)
+
+
+class AsyncBinanceDataFetcher:
+    """
+    币安数据获取器（asyncio版）
+
+    接口与 BinanceDataFetcher 一致，但全部为协程。多个交易对、多个分页窗口
+    在同一个事件循环中并发请求，共用一个权重限速器和并发上限。
+
+    用法:
+        async with AsyncBinanceDataFetcher() as fetcher:
+            frames = await fetcher.fetch_many_historical(symbols, start, end, '1h')
+    """
+
+    def __init__(self, store=None, use_cache=None, max_concurrency=None):
+        """
+        初始化数据获取器
+
+        Args:
+            store: 本地K线存储，默认按配置 data.cache_backend 创建 OHLCVStore 或 CandleArchive
+            use_cache: 是否启用本地缓存，默认读取配置 data.use_cache
+            max_concurrency: 同时进行的请求数上限，默认读取配置 data.max_workers
+        """
+        self.exchange = ccxt_async.binance({
+            'enableRateLimit': False,
+            'options': {
+                'defaultType': 'spot'
+            }
+        })
+
+        data_config = DEFAULT_CONFIG['data']
+        self.kline_weight = data_config['kline_weight']
+        self.limiter = AsyncRequestWeightLimiter(data_config['weight_per_minute'])
+        self.semaphore = asyncio.Semaphore(max_concurrency or data_config['max_workers'])
+
+        # 市场信息缓存与 BinanceDataFetcher 相同（共用磁盘缓存文件）
+        self.markets_cache = BinanceDataFetcher._create_markets_cache()
+        self._markets_lock = asyncio.Lock()
+        self.ticker_ttl = data_config['ticker_ttl']
+
+        if use_cache is None:
+            use_cache = data_config['use_cache']
+        if store is None and use_cache:
+            store = BinanceDataFetcher._create_store()
+        self.store = store
+
+        # 数据质量检查与缺口修复（与 BinanceDataFetcher 相同，共用缺口登记表文件）
+        self.validate = data_config['validate']
+        self.repair_gaps = data_config['repair_gaps']
+        gap_path = os.path.join(store.base_dir, 'known_gaps.json') if store is not None else None
+        self.gap_registry = GapRegistry(gap_path)
+        self.last_quality_report = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """关闭底层HTTP会话"""
+        await self.exchange.close()
+
+    async def _request(self, method, *args, weight=1):
+        """在限速器和并发上限的约束下调用交易所接口"""
+        async with self.semaphore:
+            await self.limiter.acquire(weight)
+            return await getattr(self.exchange, method)(*args)
+
+    async def load_markets(self, reload=False):
+        """
+        加载市场信息（带TTL的内存/磁盘缓存，规则与 BinanceDataFetcher.load_markets 相同）
+
+        缓存过期时在线程中用同步客户端拉取，结果设置到异步客户端上。
+
+        Args:
+            reload: 是否忽略缓存强制重新拉取
+        """
+        async with self._markets_lock:
+            loaded = await asyncio.to_thread(
+                self.markets_cache.load,
+                lambda: BinanceDataFetcher._download_markets(BinanceDataFetcher._create_exchange()),
+                reload
+            )
+            if loaded is not None:
+                self.exchange.set_markets(*loaded)
+        return self.exchange.markets
+
+    async def get_available_symbols(self):
+        """获取可用的交易对"""
+        try:
+            markets = await self.load_markets()
+            # 过滤出USDT交易对
+            usdt_pairs = [symbol for symbol in markets.keys() if symbol.endswith('/USDT')]
+            return sorted(usdt_pairs)
+        except Exception as e:
+            print(f"获取交易对失败: {e}")
+            return []
+
+    async def fetch_ohlcv(self, symbol, timeframe='1d', limit=1000, since=None):
+        """
+        获取K线数据
+
+        Args:
+            symbol: 交易对，如 'BTC/USDT'
+            timeframe: 时间周期，如 '1m', '5m', '1h', '1d'
+            limit: 获取数量
+            since: 开始时间戳
+        """
+        try:
+            # 转换时间格式
+            if since:
+                if isinstance(since, str):
+                    since = int(datetime.strptime(since, '%Y-%m-%d').timestamp() * 1000)
+                elif isinstance(since, datetime):
+                    since = int(since.timestamp() * 1000)
+
+            await self.load_markets()
+            ohlcv = await self._request('fetch_ohlcv', symbol, timeframe, since, limit,
+                                        weight=self.kline_weight)
+            return BinanceDataFetcher._to_dataframe(ohlcv)
+
+        except Exception as e:
+            print(f"获取数据失败: {e}")
+            return pd.DataFrame()
+
+    async def fetch_historical_data(self, symbol, start_date, end_date, timeframe='1d', warmup_bars=0):
+        """
+        获取历史数据
+
+        Args:
+            symbol: 交易对
+            start_date: 开始日期
+            end_date: 结束日期
+            timeframe: 时间周期
+            warmup_bars: 在开始日期之前额外获取的K线数，供指标预热
+        """
+        try:
+            # 转换日期格式
+            start_date = parse_date(start_date)
+            end_date = parse_date(end_date)
+
+            # 计算时间戳
+            since = int(start_date.timestamp() * 1000)
+            end_timestamp = int(end_date.timestamp() * 1000)
+
+            if warmup_bars > 0:
+                warmup_since = bars_before(since, timeframe, warmup_bars)
+                start_date -= timedelta(milliseconds=since - warmup_since)
+                since = warmup_since
+
+            df = await self._fetch_frame(symbol, timeframe, since, end_timestamp)
+
+            if df.empty:
+                return pd.DataFrame()
+
+            # 过滤日期范围（索引有序，二分定位后切片）
+            df = df.iloc[df.index.searchsorted(start_date, side='left'):
+                         df.index.searchsorted(end_date, side='right')]
+
+            return df
+
+        except Exception as e:
+            print(f"获取历史数据失败: {e}")
+            return pd.DataFrame()
+
+    async def fetch_many_historical(self, symbols, start_date, end_date, timeframe='1d', warmup_bars=0):
+        """
+        并发获取多个交易对的历史数据
+
+        Returns:
+            {交易对: DataFrame}，获取失败的交易对对应空DataFrame
+        """
+        frames = await asyncio.gather(*[
+            self.fetch_historical_data(symbol, start_date, end_date, timeframe, warmup_bars)
+            for symbol in symbols
+        ])
+        return dict(zip(symbols, frames))
+
+    async def _fetch_frame(self, symbol, timeframe, since, end_timestamp):
+        """
+        获取 [since, end_timestamp] 区间的K线DataFrame（有缓存时走缓存）
+
+        启用 validate 时会去重、剔除异常K线，并只针对检测到的缺口重新下载。
+        """
+        if self.store is not None:
+            df = await self._fetch_with_store(symbol, timeframe, since, end_timestamp)
+        else:
+            df = BinanceDataFetcher._to_dataframe(await self._fetch_range(symbol, timeframe, since, end_timestamp))
+
+        if not self.validate or df.empty:
+            return df
+
+        df, report = validate_ohlcv(df, timeframe)
+        if self.repair_gaps and not report['gaps'].empty:
+            df, report = await self._repair_gaps(symbol, timeframe, df, report)
+
+        self.last_quality_report = report
+        if report['duplicates'] or report['invalid'] or report['missing_bars']:
+            print(f"{symbol} {timeframe} 数据检查: 重复 {report['duplicates']} 条, "
+                  f"异常 {report['invalid']} 条, 缺口 {len(report['gaps'])} 处共 {report['missing_bars']} 根K线")
+
+        return df
+
+    async def _repair_gaps(self, symbol, timeframe, df, report):
+        """重新下载缺口区间并合并，各缺口并发下载（见 BinanceDataFetcher._repair_gaps）"""
+        gaps = self.gap_registry.unknown(symbol, timeframe, report['gaps'])
+        if gaps.empty:
+            return df, report
+
+        ranges = list(zip(gaps['start'], gaps['end']))
+        pages = await asyncio.gather(*[
+            self._fetch_range(symbol, timeframe, int(start), int(end) + 1) for start, end in ranges
+        ])
+        fetched = [candle for (start, end), ohlcv in zip(ranges, pages)
+                   for candle in ohlcv if start <= candle[0] <= end]
+
+        if fetched:
+            if self.store is not None:
+                await asyncio.to_thread(self.store.save, symbol, timeframe, fetched)
+            df = pd.concat([df, BinanceDataFetcher._to_dataframe(fetched)])
+            df, report = validate_ohlcv(df, timeframe)
+
+        # 仍未补齐的缺口视为交易所侧确实缺失
+        self.gap_registry.add(symbol, timeframe, self.gap_registry.unknown(symbol, timeframe, report['gaps']))
+        return df, report
+
+    async def _fetch_range(self, symbol, timeframe, since, until):
+        """
+        按1000根K线一个窗口切分区间并发下载，拼接去重
+
+        与 BinanceDataFetcher._fetch_range_parallel 相同，先单独请求第一个窗口，
+        区间开头早于交易所最早的K线时从第一根K线处重新切分窗口。
+        """
+        await self.load_markets()
+
+        page_ms = self.exchange.parse_timeframe(timeframe) * 1000 * 1000
+        if since > until:
+            return []
+
+        async def fetch_page(window_start):
+            return await self._request('fetch_ohlcv', symbol, timeframe, window_start, 1000,
+                                       weight=self.kline_weight)
+
+        async def fetch_window(window_start, window_end):
+            return [candle for candle in await fetch_page(window_start) if candle[0] < window_end]
+
+        first_page = await fetch_page(since)
+        if not first_page:
+            return []
+        windows = split_windows(max(since, first_page[0][0]), until, page_ms)
+        if not windows:
+            return []
+
+        pages = [[candle for candle in first_page if candle[0] < windows[0][1]]]
+        pages.extend(await asyncio.gather(*[fetch_window(*window) for window in windows[1:]]))
+        return stitch_candles(pages)
+
+    async def _fetch_with_store(self, symbol, timeframe, since, end_timestamp):
+        """优先读取本地缓存，只下载缓存头部/尾部缺失的区间"""
+        coverage = await asyncio.to_thread(self.store.coverage, symbol, timeframe)
+
+        if coverage is None:
+            missing = [(since, end_timestamp)]
+        else:
+            first_ts, last_ts = coverage
+            missing = []
+            if since < first_ts and not self.gap_registry.covers(symbol, timeframe, since, first_ts - 1):
+                missing.append((since, first_ts))
+            if end_timestamp > last_ts:
+                missing.append((last_ts, end_timestamp))
+
+        for range_start, range_end in missing:
+            ohlcv = await self._fetch_range(symbol, timeframe, range_start, range_end)
+            await asyncio.to_thread(self.store.save, symbol, timeframe, ohlcv)
+            if range_start == since:
+                record_leading_gap(self.gap_registry, symbol, timeframe, range_start, ohlcv,
+                                   first_ts if coverage is not None else None)
+
+        return await asyncio.to_thread(self.store.load, symbol, timeframe, since, end_timestamp)
+
+    async def get_current_price(self, symbol):
+        """获取当前价格"""
+        return (await self.get_current_prices([symbol])).get(symbol)
+
+    async def get_current_prices(self, symbols):
+        """
+        批量获取当前价格（见 BinanceDataFetcher.get_current_prices，两者共用最新价格缓存）
+
+        Args:
+            symbols: 交易对列表
+
+        Returns:
+            {交易对: 最新价}，获取失败的交易对对应 None
+        """
+        now = time.time()
+        cache = BinanceDataFetcher._ticker_cache
+        prices = {}
+        with BinanceDataFetcher._ticker_lock:
+            for symbol in symbols:
+                cached = cache.get(symbol)
+                if cached is not None and now - cached[0] < self.ticker_ttl:
+                    prices[symbol] = cached[1]
+
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            try:
+                await self.load_markets()
+                tickers = await self._request('fetch_tickers', missing, weight=ticker_weight(len(missing)))
+            except Exception as e:
+                print(f"获取当前价格失败: {e}")
+                tickers = {}
+
+            with BinanceDataFetcher._ticker_lock:
+                for symbol in missing:
+                    ticker = tickers.get(symbol)
+                    prices[symbol] = ticker['last'] if ticker else None
+                    if prices[symbol] is not None:
+                        cache[symbol] = (now, prices[symbol])
+
+        return {symbol: prices.get(symbol) for symbol in symbols}
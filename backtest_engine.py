@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import warnings
+
+from indicator_registry import warmup_bars
+from signal_rules import signal_matrix
+
 warnings.filterwarnings('ignore')
 
 class BacktestEngine:
@@ -40,88 +44,230 @@ class BacktestEngine:
             df: 包含技术指标的DataFrame
             strategy_params: 策略参数字典
         """
-        signals = pd.Series(0, index=df.index)
+        # RSI、KDJ、布林带、EMA、MACD规则见 signal_rules（与批量回测、组合回测共用）
+        signals = pd.Series(signal_matrix(df, df['close'], strategy_params)[:, 0], index=df.index, dtype=np.int64)
         
-        # RSI策略
-        if 'rsi' in strategy_params and 'RSI' in df.columns:
-            rsi_oversold = strategy_params.get('rsi_oversold', 30)
-            rsi_overbought = strategy_params.get('rsi_overbought', 70)
-            
-            # RSI超卖买入信号
-            rsi_buy = (df['RSI'] < rsi_oversold) & (df['RSI'].shift(1) >= rsi_oversold)
-            # RSI超买卖出信号
-            rsi_sell = (df['RSI'] > rsi_overbought) & (df['RSI'].shift(1) <= rsi_overbought)
-            
-            signals[rsi_buy] = 1
-            signals[rsi_sell] = -1
+        # 高周期过滤：{'column': 'RSI_4h', 'buy_min': 50, 'buy_max': 70}，
+        # 只保留高周期指标落在区间内的买入信号（指标尚无值时不买入），卖出信号不受影响
+        htf_filter = strategy_params.get('htf_filter')
+        if htf_filter and htf_filter.get('column') in df.columns:
+            value = df[htf_filter['column']]
+            allowed = value.notna()
+            if htf_filter.get('buy_min') is not None:
+                allowed &= value >= htf_filter['buy_min']
+            if htf_filter.get('buy_max') is not None:
+                allowed &= value <= htf_filter['buy_max']
+            signals[(signals == 1) & ~allowed] = 0
+        
+        return signals
+    
+    @staticmethod
+    def _first_exit(closes, entry, last, buy_price, take_profit, stop_loss):
+        """
+        查找买入后第一根触发止盈或止损的K线
+        
+        按逐渐加倍的区块扫描，耗时与持仓K线数成正比，而不是与剩余K线数成正比。
+        
+        Args:
+            closes: 收盘价数组
+            entry: 买入K线位置（从下一根开始检查）
+            last: 最后检查的K线位置（含）
+            buy_price: 买入价格
+            take_profit: 止盈百分比
+            stop_loss: 止损百分比
+        
+        Returns:
+            (K线位置, 收益率)，未触发时为 (None, None)
+        """
+        if not (take_profit or stop_loss) or not buy_price > 0:
+            return None, None
+        
+        position, chunk = entry + 1, 64
+        while position <= last:
+            end = min(position + chunk, last + 1)
+            returns = (closes[position:end] - buy_price) / buy_price
+            hit = np.zeros(end - position, dtype=bool)
+            if take_profit:
+                hit |= returns >= take_profit
+            if stop_loss:
+                hit |= returns <= -stop_loss
+            hits = np.flatnonzero(hit)
+            if len(hits):
+                return position + hits[0], float(returns[hits[0]])
+            position, chunk = end, chunk * 2
+        return None, None
+    
+    @staticmethod
+    def execute_signals(closes, signals, start=0, initial_capital=10000, commission=0.001,
+                        take_profit=None, stop_loss=None):
+        """
+        数组化执行交易信号
+        
+        按交易而不是按K线推进：用信号位置直接跳到下一次买入，再在持仓区间内向量化查找
+        止盈/止损/卖出，最后按区间整段填充持仓和现金数组。语义与逐K线循环完全一致：
+        每根K线先检查止盈止损（触发时平仓，该K线不记录权益、不处理信号），再记录权益，
+        再处理信号；买入使用95%资金、整数股数并扣除手续费；第 start 根K线只记录权益不交易。
+        最后一根K线的强制平仓由调用方处理。
+        
+        Args:
+            closes: 收盘价数组
+            signals: 信号数组（1买入，-1卖出，0不操作），与 closes 等长
+            start: 回测起始K线位置
+            initial_capital: 初始资金
+            commission: 手续费率
+            take_profit: 止盈百分比
+            stop_loss: 止损百分比
+        
+        Returns:
+            dict: recorded（是否记录权益的布尔数组）、position/capital/equity（记录权益时的
+                  持仓、现金、权益数组）、trades（交易列表 (K线位置, 动作, 股数, 金额, 现金, 收益率%)）、
+                  final_capital/final_position/avg_buy_price（结束时状态）
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        signals = np.asarray(signals)
+        n = len(closes)
+        bars = np.arange(n)
+        buy_bars = np.flatnonzero((signals == 1) & (bars > start))
+        sell_bars = np.flatnonzero((signals == -1) & (bars > start))
+        
+        recorded = bars >= start
+        position = np.zeros(n, dtype=np.int64)
+        capital = np.empty(n, dtype=np.float64)
+        trades = []
+        
+        cash = initial_capital
+        shares, buy_price = 0, 0
+        flat_from = start  # 空仓区间起点（该区间现金不变）
+        buy_from = start + 1  # 最早可买入的K线（起始K线不交易）
         
-        # KDJ策略
-        if 'kdj' in strategy_params and all(col in df.columns for col in ['K', 'D', 'J']):
-            kdj_buy_threshold = strategy_params.get('kdj_buy_threshold', 20)
-            kdj_sell_threshold = strategy_params.get('kdj_sell_threshold', 80)
+        while True:
+            # 空仓：找到下一根资金足够买入的买入信号K线
+            entry = None
+            for bar in buy_bars[np.searchsorted(buy_bars, buy_from):]:
+                price = float(closes[bar])
+                candidate = int(cash * 0.95 / price)  # 保留5%现金
+                if candidate > 0:
+                    cost = candidate * price * (1 + commission)
+                    if cost <= cash:
+                        entry = bar
+                        break
             
-            # KDJ金叉买入
-            kdj_buy = (df['K'] > df['D']) & (df['K'].shift(1) <= df['D'].shift(1)) & (df['K'] < kdj_buy_threshold)
-            # KDJ死叉卖出
-            kdj_sell = (df['K'] < df['D']) & (df['K'].shift(1) >= df['D'].shift(1)) & (df['K'] > kdj_sell_threshold)
+            if entry is None:
+                capital[flat_from:] = cash
+                break
             
-            signals[kdj_buy] = 1
-            signals[kdj_sell] = -1
-        
-        # 布林带策略
-        if 'boll' in strategy_params and all(col in df.columns for col in ['BB_upper', 'BB_middle', 'BB_lower']):
-            # 价格触及下轨买入
-            boll_buy = df['close'] <= df['BB_lower']
-            # 价格触及上轨卖出
-            boll_sell = df['close'] >= df['BB_upper']
+            capital[flat_from:entry + 1] = cash  # 买入K线先记录权益再买入
+            cash -= cost
+            shares, buy_price = candidate, price
+            trades.append((entry, 'BUY', shares, cost, cash, None))
             
-            signals[boll_buy] = 1
-            signals[boll_sell] = -1
-        
-        # EMA策略
-        if 'ema' in strategy_params:
-            ema_short = strategy_params.get('ema_short', 12)
-            ema_long = strategy_params.get('ema_long', 26)
+            # 持仓：卖出信号之前（含）第一根触发止盈/止损的K线，否则在卖出信号处卖出
+            next_sell = np.searchsorted(sell_bars, entry + 1)
+            sell_bar = sell_bars[next_sell] if next_sell < len(sell_bars) else None
+            last = sell_bar if sell_bar is not None else n - 1
+            exit_bar, exit_return = BacktestEngine._first_exit(
+                closes, entry, last, buy_price, take_profit, stop_loss)
             
-            if f'EMA_{ema_short}' in df.columns and f'EMA_{ema_long}' in df.columns:
-                # 短期EMA上穿长期EMA买入
-                ema_buy = (df[f'EMA_{ema_short}'] > df[f'EMA_{ema_long}']) & \
-                         (df[f'EMA_{ema_short}'].shift(1) <= df[f'EMA_{ema_long}'].shift(1))
-                # 短期EMA下穿长期EMA卖出
-                ema_sell = (df[f'EMA_{ema_short}'] < df[f'EMA_{ema_long}']) & \
-                          (df[f'EMA_{ema_short}'].shift(1) >= df[f'EMA_{ema_long}'].shift(1))
-                
-                signals[ema_buy] = 1
-                signals[ema_sell] = -1
-        
-        # MACD策略
-        if 'macd' in strategy_params and all(col in df.columns for col in ['MACD', 'MACD_signal']):
-            # MACD金叉买入
-            macd_buy = (df['MACD'] > df['MACD_signal']) & (df['MACD'].shift(1) <= df['MACD_signal'].shift(1))
-            # MACD死叉卖出
-            macd_sell = (df['MACD'] < df['MACD_signal']) & (df['MACD'].shift(1) >= df['MACD_signal'].shift(1))
+            if exit_bar is not None:
+                action = 'TAKE_PROFIT' if take_profit and exit_return >= take_profit else 'STOP_LOSS'
+                recorded[exit_bar] = False
+                held_until = exit_bar
+            elif sell_bar is not None:
+                action, exit_bar, exit_return = 'SELL', sell_bar, None
+                held_until = sell_bar + 1  # 卖出K线先记录权益再卖出
+            else:
+                position[entry + 1:] = shares
+                capital[entry + 1:] = cash
+                break
             
-            signals[macd_buy] = 1
-            signals[macd_sell] = -1
+            position[entry + 1:held_until] = shares
+            capital[entry + 1:exit_bar + 1] = cash
+            revenue = shares * float(closes[exit_bar]) * (1 - commission)
+            cash += revenue
+            trades.append((exit_bar, action, shares, revenue, cash,
+                           exit_return * 100 if exit_return is not None else None))
+            shares, buy_price = 0, 0
+            flat_from = buy_from = exit_bar + 1
+            if flat_from >= n:
+                break
         
-        return signals
+        return {
+            'recorded': recorded,
+            'position': position,
+            'capital': capital,
+            'equity': capital + position * closes,
+            'trades': trades,
+            'final_capital': cash,
+            'final_position': shares,
+            'avg_buy_price': buy_price
+        }
     
-    def run_backtest(self, df, strategy_params):
+    def run_backtest(self, df, strategy_params, skip_warmup=True, timeframe=None, reference=False):
         """
         运行回测
         
         Args:
             df: 包含技术指标的DataFrame
             strategy_params: 策略参数字典
+            skip_warmup: 是否跳过指标预热区间（按 indicator_registry 声明的预热K线数），
+                         该区间内指标为NaN、不会产生信号，也不计入权益曲线
+            timeframe: df 的K线周期；提供时预热区间同时计入高周期指标（higher_timeframes）的预热，
+                       与获取数据时传入的 warmup_bars(strategy_params, timeframe) 一致
+            reference: 使用逐K线循环的参考实现（结果与默认的数组实现一致，用于核对）
         """
         self.reset()
         
         # 计算交易信号
         signals = self.calculate_signals(df, strategy_params)
+        start = min(warmup_bars(strategy_params, timeframe), max(len(df) - 1, 0)) if skip_warmup else 0
+        
+        if reference:
+            return self._run_backtest_loop(df, signals, start)
+        
+        # 转为float64，紧凑模式(float32)下资金计算仍保持双精度
+        closes = df['close'].to_numpy(dtype=np.float64)
+        result = self.execute_signals(closes, signals.to_numpy(), start, self.initial_capital,
+                                      self.commission, self.take_profit, self.stop_loss)
         
-        # 执行回测
-        for i, (timestamp, row) in enumerate(df.iterrows()):
-            self.current_price = row['close']
+        recorded = result['recorded']
+        self.equity_curve = pd.DataFrame({
+            'timestamp': df.index[recorded],
+            'equity': result['equity'][recorded],
+            'capital': result['capital'][recorded],
+            'position': result['position'][recorded],
+            'price': closes[recorded]
+        })
+        
+        for bar, action, shares, amount, capital, return_pct in result['trades']:
+            trade = {
+                'timestamp': df.index[bar],
+                'action': action,
+                'price': float(closes[bar]),
+                'shares': shares,
+                'cost' if action == 'BUY' else 'revenue': amount,
+                'capital': capital,
+                'position': shares if action == 'BUY' else 0
+            }
+            if return_pct is not None:
+                trade['return_pct'] = return_pct
+            self.trades.append(trade)
+        
+        self.capital = result['final_capital']
+        self.position = result['final_position']
+        self.avg_buy_price = result['avg_buy_price']
+        if len(closes):
+            self.current_price = float(closes[-1])
+        
+        self._close_position(df)
+        return self.get_results()
+    
+    def _run_backtest_loop(self, df, signals, start):
+        """逐K线循环执行回测（参考实现）"""
+        # 执行回测（只读取收盘价列，不逐行构造整行Series，惰性指标表也不会因此计算全部指标）
+        # 转为Python浮点数，紧凑模式(float32)下资金计算仍保持双精度
+        closes = df['close'].to_numpy(dtype=np.float64).tolist()
+        for i, (timestamp, close) in enumerate(zip(df.index[start:], closes[start:]), start=start):
+            self.current_price = close
             
             # 检查止盈止损
             if self.position > 0 and self.avg_buy_price > 0:
@@ -180,7 +326,7 @@ class BacktestEngine:
             })
             
             # 处理交易信号
-            if i > 0:  # 跳过第一个数据点
+            if i > start:  # 跳过第一个数据点
                 signal = signals.iloc[i]
                 
                 if signal == 1 and self.position == 0:  # 买入信号
@@ -223,7 +369,11 @@ class BacktestEngine:
                     self.position = 0
                     self.avg_buy_price = 0
         
-        # 最后一天强制平仓
+        self._close_position(df)
+        return self.get_results()
+    
+    def _close_position(self, df):
+        """最后一天强制平仓"""
         if self.position > 0:
             revenue = self.position * self.current_price * (1 - self.commission)
             self.capital += revenue
@@ -237,17 +387,25 @@ class BacktestEngine:
                 'capital': self.capital,
                 'position': 0
             })
-        
-        return self.get_results()
     
     def get_results(self):
         """获取回测结果"""
-        if not self.equity_curve:
+        if len(self.equity_curve) == 0:
             return {}
         
-        equity_df = pd.DataFrame(self.equity_curve)
+        # 数组实现直接生成DataFrame，参考实现为逐K线的字典列表
+        if isinstance(self.equity_curve, pd.DataFrame):
+            equity_df = self.equity_curve.copy()
+        else:
+            equity_df = pd.DataFrame(self.equity_curve)
         trades_df = pd.DataFrame(self.trades) if self.trades else pd.DataFrame()
         
+        # 紧凑模式下时间为int64毫秒时间戳，统一转换为datetime
+        if pd.api.types.is_integer_dtype(equity_df['timestamp']):
+            equity_df['timestamp'] = pd.to_datetime(equity_df['timestamp'], unit='ms')
+        if not trades_df.empty and pd.api.types.is_integer_dtype(trades_df['timestamp']):
+            trades_df['timestamp'] = pd.to_datetime(trades_df['timestamp'], unit='ms')
+        
         # 计算收益率
         initial_equity = self.initial_capital
         final_equity = equity_df['equity'].iloc[-1]
@@ -278,14 +436,13 @@ class BacktestEngine:
             sell_trades = trades_df[trades_df['action'].isin(['SELL', 'TAKE_PROFIT', 'STOP_LOSS'])]
             
             if len(buy_trades) > 0 and len(sell_trades) > 0:
-                trade_returns = []
-                for i in range(min(len(buy_trades), len(sell_trades))):
-                    buy_price = buy_trades.iloc[i]['price']
-                    sell_price = sell_trades.iloc[i]['price']
-                    trade_return = (sell_price - buy_price) / buy_price
-                    trade_returns.append(trade_return)
+                # 第i笔买入与第i笔卖出配对
+                count = min(len(buy_trades), len(sell_trades))
+                buy_prices = buy_trades['price'].to_numpy()[:count]
+                sell_prices = sell_trades['price'].to_numpy()[:count]
+                trade_returns = (sell_prices - buy_prices) / buy_prices
                 
-                win_rate = sum(1 for r in trade_returns if r > 0) / len(trade_returns) * 100 if trade_returns else 0
+                win_rate = int((trade_returns > 0).sum()) / count * 100
             else:
                 win_rate = 0
         else:
@@ -0,0 +1,385 @@
+"""
+批量参数回测
+
+把成百上千个参数组合作为 (K线 × 组合) 矩阵的列，一次遍历K线同时回测全部组合。
+每根K线上所有组合的止盈止损和买卖都是长度为组合数的向量运算；权益、最大回撤、
+夏普比率按K线分块在线累计，不保存逐K线的权益记录。
+
+信号规则与 BacktestEngine.calculate_signals 共用 signal_rules（RSI、KDJ、布林带、EMA、MACD，
+不支持高周期过滤），阈值等参数按组合取列向量；单个组合的结果与 BacktestEngine.run_backtest 一致。
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_CONFIG
+from indicator_registry import (INDICATOR_REGISTRY, indicator_outputs, resolve_params, signal_inputs,
+                                signal_thresholds, warmup_bars)
+from indicators import TechnicalIndicators
+from parameter_sweep import ENGINE_PARAMETER_KEYS, METRIC_COLUMNS, expand_grid
+from signal_rules import rule_signals, with_previous
+
+# 每次生成信号矩阵的最大元素数（K线数 × 组合数），限制分块时的内存占用
+CHUNK_ELEMENTS = 2_000_000
+
+
+class _EquityStatistics:
+    """
+    按K线分块在线累计每个组合的权益统计
+
+    与 BacktestEngine.get_results 在完整权益曲线上的计算相同：最大回撤为相对历史峰值的最小值，
+    夏普比率为相邻两条权益记录收益率的均值/样本标准差 × sqrt(252)。收益率的均值和平方差
+    按块合并（Chan 并行算法），只保留每个组合的几个标量。
+    """
+
+    def __init__(self, count):
+        self.last_equity = np.full(count, np.nan)
+        self.last_record = np.zeros(count, dtype=np.int64)
+        self.peak = np.full(count, -np.inf)
+        self.max_drawdown = np.zeros(count)
+        self.returns = np.zeros(count, dtype=np.int64)
+        self.return_mean = np.zeros(count)
+        self.return_m2 = np.zeros(count)
+
+    def update(self, equity, exited, offset, warmup=None):
+        """
+        合并一块K线的权益
+
+        Args:
+            equity: (块内K线 × 组合) 权益矩阵，会被原地修改
+            exited: 同形状的布尔矩阵，触发止盈止损的K线（不记录权益）
+            offset: 块首根K线的位置
+            warmup: 同形状的布尔矩阵，预热区间内的K线（不记录权益）；块内没有时为None
+        """
+        if warmup is None and not np.isnan(self.last_equity).any():
+            self._update_exits(equity, exited, offset)
+        else:
+            recorded = ~exited if warmup is None else ~exited & ~warmup
+            self._update_masked(equity, recorded, offset)
+
+    def _merge_returns(self, count, mean, m2):
+        """合并一块收益率的条数、均值和平方差"""
+        total = self.returns + count
+        delta = mean - self.return_mean
+        self.return_mean = self.return_mean + delta * count / np.maximum(total, 1)
+        self.return_m2 = self.return_m2 + m2 + delta ** 2 * self.returns * count / np.maximum(total, 1)
+        self.returns = total
+
+    def _update_drawdown(self, equity, recorded=None):
+        """更新峰值和最大回撤，recorded 为None时 equity 中的每个值都参与计算"""
+        values = equity if recorded is None else np.where(recorded, equity, -np.inf)
+        peak = np.maximum.accumulate(np.vstack([self.peak[None], values]), axis=0)[1:]
+        drawdown = (equity - peak) / peak * 100
+        if recorded is not None:
+            drawdown[~recorded] = np.inf
+        self.max_drawdown = np.minimum(self.max_drawdown, drawdown.min(axis=0))
+        self.peak = peak[-1]
+
+    def _update_exits(self, equity, exited, offset):
+        """
+        预热之后的块：只有止盈止损K线不记录权益
+
+        同一组合的止盈止损K线不会相邻（平仓后至少要一根K线买入），
+        把这些K线的权益替换为上一条记录，相当于跳过该K线：下一根K线的收益率仍相对于上一条记录，
+        被替换的K线收益率为0，从条数和平方差中扣除即可。
+        """
+        rows, columns = np.nonzero(exited)
+        if len(rows):
+            previous_rows = np.maximum(rows - 1, 0)
+            equity[rows, columns] = np.where(rows > 0, equity[previous_rows, columns], self.last_equity[columns])
+        skipped = exited.sum(axis=0)
+
+        period_return = equity / np.vstack([self.last_equity[None], equity[:-1]]) - 1
+        count = len(equity) - skipped
+        mean = period_return.sum(axis=0) / np.maximum(count, 1)
+        m2 = ((period_return - mean) ** 2).sum(axis=0) - skipped * mean ** 2
+        self._merge_returns(count, mean, np.maximum(m2, 0))
+
+        self._update_drawdown(equity)
+        self.last_equity = equity[-1]
+        self.last_record = offset + len(equity) - 1 - exited[-1]
+
+    def _update_masked(self, equity, recorded, offset):
+        """包含预热区间的块：按掩码逐列取上一条权益记录"""
+        latest = np.where(recorded, np.arange(len(equity))[:, None], -1)
+        np.maximum.accumulate(latest, axis=0, out=latest)
+        filled = np.where(latest >= 0, np.take_along_axis(equity, np.maximum(latest, 0), axis=0),
+                          self.last_equity)
+        previous = np.vstack([self.last_equity[None], filled[:-1]])
+
+        has_previous = recorded & ~np.isnan(previous)
+        period_return = np.where(has_previous, equity / previous - 1, 0.0)
+        count = has_previous.sum(axis=0)
+        mean = period_return.sum(axis=0) / np.maximum(count, 1)
+        m2 = (np.where(has_previous, period_return - mean, 0.0) ** 2).sum(axis=0)
+        self._merge_returns(count, mean, m2)
+
+        self._update_drawdown(equity, recorded)
+        self.last_equity = filled[-1]
+        self.last_record = np.where(recorded.any(axis=0),
+                                    offset + len(equity) - 1 - np.argmax(recorded[::-1], axis=0),
+                                    self.last_record)
+
+    def sharpe_ratio(self):
+        """收益率不足两条或标准差为0时为0"""
+        std = np.sqrt(self.return_m2 / np.maximum(self.returns - 1, 1))
+        return np.where((self.returns > 1) & (std > 0), self.return_mean / np.where(std > 0, std, 1) * np.sqrt(252), 0)
+
+
+class BatchBacktest:
+    """(K线 × 参数组合) 矩阵批量回测"""
+
+    def __init__(self, df, base_params=None, backend=None):
+        """
+        初始化批量回测
+
+        Args:
+            df: OHLCV数据DataFrame
+            base_params: 所有组合共用的参数（策略参数和引擎参数），网格中的同名参数会覆盖
+            backend: 指标计算后端，None 使用 config 中的 indicator_backend
+        """
+        self.df = df
+        self.base_params = dict(base_params or {})
+        self.backend = backend
+        # 按 (指标, 参数) 缓存的指标结果，多次 run（如滚动窗口）之间复用
+        self._indicators = {}
+
+    def _indicator(self, name, params):
+        """计算（或从缓存读取）一个指标在完整历史上的结果"""
+        key = (name, params)
+        if key not in self._indicators:
+            method = getattr(TechnicalIndicators, INDICATOR_REGISTRY[name]['method'])
+            self._indicators[key] = method(self.df, *params, backend=self.backend)
+        return self._indicators[key]
+
+    def _signal_inputs(self, name, combos):
+        """
+        计算所有组合的信号规则用到的不同指标列，按输入位置分别堆叠
+
+        Args:
+            name: 注册表中的指标名
+            combos: 参数组合列表
+
+        Returns:
+            (启用该规则的组合掩码, 每个输入的 (K线 × 不同列数) 矩阵列表, 每个输入中各组合对应的列位置数组列表)
+        """
+        spec = INDICATOR_REGISTRY[name]
+        slots = len(spec['signal']['inputs'])
+        keys = [{} for _ in range(slots)]
+        positions = np.zeros((slots, len(combos)), dtype=np.int64)
+        mask = np.zeros(len(combos), dtype=bool)
+
+        for i, combo in enumerate(combos):
+            if name not in combo:
+                continue
+            params = resolve_params(name, combo)
+            # 输入列 -> (指标计算参数, 列名)；序列指标（如EMA）每个周期单独计算一列
+            if 'series_param' in spec:
+                sources = {column: ((period,), column) for period, column in
+                           zip(params[spec['series_param']], indicator_outputs(name, params))}
+            else:
+                sources = {column: (tuple(params.values()), column) for column in indicator_outputs(name, params)}
+
+            # 与 calculate_signals 相同，输入列没有全部计算时不使用该规则
+            columns = signal_inputs(name, combo)
+            if not all(column in sources for column in columns):
+                continue
+            mask[i] = True
+            for slot, column in enumerate(columns):
+                positions[slot, i] = keys[slot].setdefault(sources[column], len(keys[slot]))
+
+        matrices = []
+        for slot_keys in keys:
+            values = []
+            for params, column in slot_keys:
+                result = self._indicator(name, params)
+                values.append((result if isinstance(result, pd.Series) else result[column]).to_numpy(dtype=np.float64))
+            matrices.append(np.column_stack(values) if values else np.full((len(self.df), 1), np.nan))
+        return mask, matrices, list(positions)
+
+    def _signal_builder(self, combos):
+        """
+        准备各规则的指标矩阵和阈值，返回按K线区间生成信号矩阵的函数
+
+        Returns:
+            函数 (a, b) -> (b - a) × 组合数 的 int8 信号矩阵
+        """
+        close = self.df['close'].to_numpy(dtype=np.float64)
+
+        # 与 signal_matrix 相同的规则顺序，后面的规则覆盖前面的信号
+        rules = []
+        for name, spec in INDICATOR_REGISTRY.items():
+            if 'signal' not in spec or not any(name in combo for combo in combos):
+                continue
+            mask, matrices, positions = self._signal_inputs(name, combos)
+            # 每个阈值为长度为组合数的数组
+            thresholds = list(np.array([signal_thresholds(name, combo) for combo in combos],
+                                       dtype=np.float64).reshape(len(combos), -1).T)
+            rules.append((spec['signal']['rule'], mask, matrices, positions, thresholds))
+
+        def build(a, b):
+            signals = np.zeros((b - a, len(combos)), dtype=np.int8)
+
+            def gather(matrix, positions):
+                # 多取前一根K线用于判断穿越，第一根K线没有前值
+                if a == 0:
+                    return with_previous(matrix[:b][:, positions])
+                return matrix[a - 1:b][:, positions]
+
+            for rule, mask, matrices, positions, thresholds in rules:
+                inputs = [gather(matrix, slot_positions) for matrix, slot_positions in zip(matrices, positions)]
+                buy, sell = rule_signals(rule, inputs, close[a:b, None], thresholds)
+                signals[buy & mask] = 1
+                signals[sell & mask] = -1
+            return signals
+
+        return build
+
+    def run(self, grid, equity_curves=False, bars=None, skip_warmup=True):
+        """
+        运行批量回测
+
+        Args:
+            grid: 参数网格 {参数名: 取值列表} 或参数字典列表，见 parameter_sweep.expand_grid
+            equity_curves: 是否同时返回 (K线 × 组合) 的权益矩阵（未记录权益的K线为NaN），
+                           组合和K线都很多时占用内存较大
+            bars: 只回测 [起始位置, 结束位置) 区间的K线，指标仍在完整历史上计算（并在多次调用间复用），
+                  结果与对完整指标表切片后运行 BacktestEngine 相同（结束位置超过K线数时截断）；None为全部K线
+            skip_warmup: 是否从区间起点再跳过各组合的指标预热K线（与 BacktestEngine.run_backtest 相同）
+
+        Returns:
+            DataFrame: 每行一个参数组合，列为网格参数和 METRIC_COLUMNS（与 ParameterSweep 相同）；
+            equity_curves=True 时返回 (DataFrame, 权益DataFrame)
+        """
+        combos = expand_grid(grid)
+        first, n = bars if bars is not None else (0, len(self.df))
+        n = min(n, len(self.df))
+        if not combos or first >= n:
+            return (pd.DataFrame(), pd.DataFrame()) if equity_curves else pd.DataFrame()
+
+        params = [{**self.base_params, **combo} for combo in combos]
+        if any('htf_filter' in combo for combo in params):
+            raise ValueError("批量回测不支持高周期过滤(htf_filter)，请使用 ParameterSweep")
+        strategies = [{key: value for key, value in combo.items() if key not in ENGINE_PARAMETER_KEYS}
+                      for combo in params]
+
+        count = len(combos)
+        closes = self.df['close'].to_numpy(dtype=np.float64)
+        build_signals = self._signal_builder(strategies)
+
+        # 引擎参数（未启用的止盈/止损用无穷大阈值表示，永远不会触发）
+        initial = np.array([combo.get('initial_capital', DEFAULT_CONFIG['initial_capital']) for combo in params],
+                           dtype=np.float64)
+        commission = np.array([combo.get('commission', DEFAULT_CONFIG['commission']) for combo in params],
+                              dtype=np.float64)
+        take_profit = np.array([combo.get('take_profit') or np.inf for combo in params], dtype=np.float64)
+        stop_loss = np.array([-combo['stop_loss'] if combo.get('stop_loss') else -np.inf for combo in params],
+                             dtype=np.float64)
+        start = np.array([first + min(warmup_bars(strategy) if skip_warmup else 0, n - first - 1)
+                          for strategy in strategies], dtype=np.int64)
+
+        # 持仓状态（空仓时买入价为NaN，止盈止损比较恒为False）
+        cash = initial.copy()
+        shares = np.zeros(count)
+        buy_price = np.full(count, np.nan)
+
+        take_profit_count = np.zeros(count, dtype=np.int64)
+        stop_loss_count = np.zeros(count, dtype=np.int64)
+        sell_count = np.zeros(count, dtype=np.int64)
+        wins = np.zeros(count, dtype=np.int64)
+        statistics = _EquityStatistics(count)
+
+        equity_matrix = np.full((n - first, count), np.nan) if equity_curves else None
+        chunk = int(np.clip(CHUNK_ELEMENTS // count, 64, 8192))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for a in range(first, n, chunk):
+                b = min(a + chunk, n)
+                positions = np.arange(a, b)[:, None]
+                signals = build_signals(a, b)
+                signals[positions <= start] = 0  # 起始K线及之前不交易
+
+                # 逐K线只推进持仓状态，记录权益时的现金和持仓留到整块结束后统一计算
+                cash_rows = np.empty((b - a, count))
+                share_rows = np.empty((b - a, count))
+                exited_rows = np.zeros((b - a, count), dtype=bool)
+
+                for i in range(a, b):
+                    price = closes[i]
+                    row = signals[i - a]
+
+                    # 止盈止损（触发的K线不记录权益、不处理信号）
+                    current_return = (price - buy_price) / buy_price
+                    exited = (current_return >= take_profit) | (current_return <= stop_loss)
+                    any_exit = exited.any()
+                    if any_exit:
+                        hit_take_profit = exited & (current_return >= take_profit)
+                        cash[exited] += shares[exited] * price * (1 - commission[exited])
+                        wins += exited & (price > buy_price)
+                        take_profit_count += hit_take_profit
+                        stop_loss_count += exited & ~hit_take_profit
+                        shares[exited] = 0
+                        buy_price[exited] = np.nan
+                        exited_rows[i - a] = exited
+
+                    cash_rows[i - a] = cash
+                    share_rows[i - a] = shares
+
+                    # 处理交易信号
+                    buy = (row == 1) & (shares == 0)
+                    if any_exit:
+                        buy &= ~exited
+                    if buy.any():
+                        candidate = np.floor(cash[buy] * 0.95 / price)  # 保留5%现金，整数股数
+                        cost = candidate * price * (1 + commission[buy])
+                        filled = (candidate > 0) & (cost <= cash[buy])
+                        buy[buy] = filled
+                        cash[buy] -= cost[filled]
+                        shares[buy] = candidate[filled]
+                        buy_price[buy] = price
+
+                    sell = (row == -1) & (shares > 0)
+                    if sell.any():
+                        cash[sell] += shares[sell] * price * (1 - commission[sell])
+                        wins += sell & (price > buy_price)
+                        sell_count += sell
+                        shares[sell] = 0
+                        buy_price[sell] = np.nan
+
+                equity = cash_rows + share_rows * closes[a:b, None]
+                warmup = positions < start if a < start.max() else None
+                if equity_matrix is not None:
+                    skipped = exited_rows if warmup is None else exited_rows | warmup
+                    equity_matrix[a - first:b - first] = np.where(skipped, np.nan, equity)
+                statistics.update(equity, exited_rows, a, warmup)
+
+        # 最后一根K线强制平仓（只影响交易统计，最终权益取最后一条权益记录）
+        holding = shares > 0
+        wins += holding & (closes[n - 1] > buy_price)
+        sell_count += holding
+
+        trades = take_profit_count + stop_loss_count + sell_count
+        final_equity = statistics.last_equity
+        index = self.df.index
+        if not isinstance(index, pd.DatetimeIndex):
+            index = pd.to_datetime(np.asarray(index), unit='ms')
+        days = np.asarray((index[statistics.last_record] - index[start]).days, dtype=np.float64)
+        annual_return = np.where(days > 0, (final_equity / initial) ** (365 / np.where(days > 0, days, 1)) - 1, 0)
+
+        metrics = pd.DataFrame({
+            'total_return': (final_equity - initial) / initial * 100,
+            'annual_return': annual_return * 100,
+            'max_drawdown': statistics.max_drawdown,
+            'sharpe_ratio': statistics.sharpe_ratio(),
+            'win_rate': np.where(trades > 0, wins / np.maximum(trades, 1) * 100, 0),
+            'total_trades': trades,
+            'take_profit_count': take_profit_count,
+            'stop_loss_count': stop_loss_count,
+            'normal_sell_count': sell_count,
+            'final_equity': final_equity
+        }, columns=METRIC_COLUMNS)
+        result = pd.concat([pd.DataFrame(combos), metrics], axis=1)
+
+        if equity_curves:
+            return result, pd.DataFrame(equity_matrix, index=self.df.index[first:n])
+        return result
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+技术指标性能基准
+
+用随机游走生成的K线比较 ta 参考实现与 numpy 内核的耗时，
+重点是依赖滚动最高/最低价的KDJ、随机指标，以及不同窗口长度下的滚动极值。
+
+用法:
+    python benchmark_indicators.py
+    python benchmark_indicators.py --bars 2000000 --windows 9 14 100 1000
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+import indicator_kernels as kernels
+from indicators import TechnicalIndicators
+
+
+def make_candles(bars, seed=0):
+    """生成随机游走K线（1分钟周期）"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, bars)))
+    spread = close * rng.uniform(0, 0.002, bars)
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, bars)
+    }, index=pd.date_range('2020-01-01', periods=bars, freq='1min', name='timestamp'))
+
+
+def timed(func, repeat):
+    """返回多次运行中的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='技术指标性能基准')
+    parser.add_argument('--bars', type=int, default=1_000_000, help='K线数量')
+    parser.add_argument('--windows', type=int, nargs='+', default=[9, 14, 100, 1000],
+                        help='滚动极值的窗口长度')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数（取最短耗时）')
+    args = parser.parse_args()
+
+    df = make_candles(args.bars)
+    print(f"K线数量: {args.bars:,}")
+    print(f"{'项目':<28}{'ta':>10}{'numpy':>10}{'加速':>8}")
+
+    for window in args.windows:
+        rows = [
+            (f"KDJ({window},3)",
+             lambda: TechnicalIndicators.calculate_kdj(df, window, 3, 3, backend='ta'),
+             lambda: TechnicalIndicators.calculate_kdj(df, window, 3, 3, backend='numpy')),
+            (f"Stochastic({window},3)",
+             lambda: TechnicalIndicators.calculate_stochastic(df, window, 3, backend='ta'),
+             lambda: TechnicalIndicators.calculate_stochastic(df, window, 3, backend='numpy')),
+            (f"rolling max/min({window})",
+             lambda: (df['high'].rolling(window).max(), df['low'].rolling(window).min()),
+             lambda: (kernels.rolling_max(df['high'].to_numpy(), window),
+                      kernels.rolling_min(df['low'].to_numpy(), window))),
+        ]
+        for name, reference, kernel in rows:
+            ta_time = timed(reference, args.repeat)
+            numpy_time = timed(kernel, args.repeat)
+            print(f"{name:<28}{ta_time:>9.3f}s{numpy_time:>9.3f}s{ta_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_CONFIG
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class CandleArchive:
+    """
+    内存映射K线归档
+
+    每个 交易对/时间周期 一个目录，每列一个 .npy 文件：timestamp 为毫秒
+    时间戳(int64)，其余列为float64。读取时以 mmap 方式打开，时间区间通过
+    searchsorted 在 O(log n) 内定位，返回的是映射文件上的零拷贝视图，
+    多个进程读取同一份归档时共享操作系统的页缓存。
+
+    新数据全部晚于已归档的最后一根K线时，直接追加到各列 .npy 文件末尾并原地更新文件头中的
+    长度，不重写已有数据。
+
+    提供与 OHLCVStore 相同的 coverage/load/save/clear 接口，
+    可直接作为 BinanceDataFetcher(store=CandleArchive()) 的存储后端。
+    """
+
+    def __init__(self, base_dir=None):
+        """
+        初始化归档
+
+        Args:
+            base_dir: 归档目录，默认使用配置中的 data.archive_dir
+        """
+        self.base_dir = base_dir or DEFAULT_CONFIG['data']['archive_dir']
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._mapped = {}
+
+    def _dir(self, symbol, timeframe):
+        """获取交易对/时间周期对应的目录"""
+        return os.path.join(self.base_dir, f"{symbol.replace('/', '_')}_{timeframe}")
+
+    def _open(self, symbol, timeframe):
+        """
+        以只读 mmap 方式打开全部列
+
+        打开结果按时间戳文件的修改时间缓存，归档被重写后自动重新映射。
+
+        Returns:
+            {列名: np.memmap}，无归档时返回 None
+        """
+        path = self._dir(symbol, timeframe)
+        ts_path = os.path.join(path, 'timestamp.npy')
+        if not os.path.exists(ts_path):
+            return None
+
+        mtime = os.stat(ts_path).st_mtime_ns
+        cached = self._mapped.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                   for name in ['timestamp'] + PRICE_COLUMNS}
+        self._mapped[path] = (mtime, columns)
+        return columns
+
+    def coverage(self, symbol, timeframe):
+        """
+        获取已归档数据的时间范围
+
+        Returns:
+            (首根K线时间戳, 末根K线时间戳)，单位毫秒；无归档时返回 None
+        """
+        columns = self._open(symbol, timeframe)
+        if columns is None or len(columns['timestamp']) == 0:
+            return None
+        timestamps = columns['timestamp']
+        return int(timestamps[0]), int(timestamps[-1])
+
+    def slice(self, symbol, timeframe, start_ts=None, end_ts=None):
+        """
+        按时间区间截取列视图（不复制数据）
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            start_ts: 开始时间戳（毫秒，含）
+            end_ts: 结束时间戳（毫秒，含）
+
+        Returns:
+            {列名: 只读ndarray视图}，无归档时返回 None
+        """
+        columns = self._open(symbol, timeframe)
+        if columns is None:
+            return None
+
+        timestamps = columns['timestamp']
+        lo = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side='left'))
+        hi = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side='right'))
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def load(self, symbol, timeframe, start_ts=None, end_ts=None):
+        """
+        读取归档K线为DataFrame
+
+        价格列直接引用映射视图（只读），仅时间索引会生成一份datetime副本。
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            start_ts: 开始时间戳（毫秒，含）
+            end_ts: 结束时间戳（毫秒，含）
+        """
+        columns = self.slice(symbol, timeframe, start_ts, end_ts)
+        if columns is None or len(columns['timestamp']) == 0:
+            return pd.DataFrame()
+
+        index = pd.DatetimeIndex(columns['timestamp'].view('datetime64[ms]'), name='timestamp')
+        return pd.DataFrame({name: columns[name] for name in PRICE_COLUMNS}, index=index, copy=False)
+
+    def save(self, symbol, timeframe, ohlcv):
+        """
+        合并写入K线，按时间戳去重（新数据覆盖旧数据）
+
+        新数据全部晚于已归档的最后一根K线时只追加到列文件末尾，不重写已有数据。
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            ohlcv: 交易所返回的 [[timestamp, open, high, low, close, volume], ...]
+                   或同结构的DataFrame
+        """
+        if isinstance(ohlcv, pd.DataFrame):
+            new = {name: ohlcv[name].to_numpy() for name in ['timestamp'] + PRICE_COLUMNS}
+        else:
+            if len(ohlcv) == 0:
+                return
+            array = np.asarray(ohlcv, dtype=np.float64)
+            new = {name: array[:, i] for i, name in enumerate(['timestamp'] + PRICE_COLUMNS)}
+        if len(new['timestamp']) == 0:
+            return
+        new['timestamp'] = new['timestamp'].astype(np.int64)
+
+        existing = self.slice(symbol, timeframe)
+        has_existing = existing is not None and len(existing['timestamp']) > 0
+        if has_existing and new['timestamp'].min() > existing['timestamp'][-1]:
+            rows = len(existing['timestamp'])
+            del existing
+            self._append(symbol, timeframe, rows, new)
+            return
+
+        if has_existing:
+            merged = {name: np.concatenate([existing[name], new[name]]) for name in new}
+        else:
+            merged = new
+
+        # 按时间戳去重，保留后写入的数据
+        timestamps = merged['timestamp']
+        _, reversed_pos = np.unique(timestamps[::-1], return_index=True)
+        keep = len(timestamps) - 1 - reversed_pos
+
+        path = self._dir(symbol, timeframe)
+        os.makedirs(path, exist_ok=True)
+        # 价格列先写，时间戳最后写：读取方以时间戳文件的修改时间判断是否重新映射
+        for name in PRICE_COLUMNS + ['timestamp']:
+            dtype = np.int64 if name == 'timestamp' else np.float64
+            column_path = os.path.join(path, f'{name}.npy')
+            tmp_path = column_path + '.tmp.npy'
+            np.save(tmp_path, merged[name][keep].astype(dtype))
+            os.replace(tmp_path, column_path)
+
+        self._mapped.pop(path, None)
+
+    def _append(self, symbol, timeframe, rows, new):
+        """
+        把晚于已有数据的K线追加到各列文件末尾
+
+        数据按已有行数定位写入（而不是写到文件末尾），上次追加中途失败留下的多余数据会被覆盖；
+        文件头中的长度在数据写完后才更新，读取方在此之前只看到原来的行数。
+
+        Args:
+            rows: 已归档的K线数（以时间戳列为准）
+            new: {列名: 新数据数组}
+        """
+        timestamps = new['timestamp']
+        _, reversed_pos = np.unique(timestamps[::-1], return_index=True)
+        keep = len(timestamps) - 1 - reversed_pos
+
+        path = self._dir(symbol, timeframe)
+        self._mapped.pop(path, None)
+        # 与 save 相同，时间戳列最后写
+        for name in PRICE_COLUMNS + ['timestamp']:
+            dtype = np.int64 if name == 'timestamp' else np.float64
+            values = np.ascontiguousarray(new[name][keep], dtype=dtype)
+            column_path = os.path.join(path, f'{name}.npy')
+            if not self._append_column(column_path, rows, values):
+                # 文件头放不下新的长度时（极少见）整列重写
+                existing = np.load(column_path, mmap_mode='r')[:rows]
+                tmp_path = column_path + '.tmp.npy'
+                np.save(tmp_path, np.concatenate([existing, values]))
+                del existing
+                os.replace(tmp_path, column_path)
+
+    @staticmethod
+    def _append_column(column_path, rows, values):
+        """
+        原地追加一列数据并更新 .npy 文件头的长度
+
+        Returns:
+            是否成功；新文件头与原文件头长度不同时返回False，文件不做修改
+        """
+        with open(column_path, 'r+b') as f:
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            _, fortran_order, dtype = read_header(f)
+            offset = f.tell()
+
+            header = io.BytesIO()
+            header_data = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order,
+                           'shape': (rows + len(values),)}
+            if version == (1, 0):
+                np.lib.format.write_array_header_1_0(header, header_data)
+            else:
+                np.lib.format.write_array_header_2_0(header, header_data)
+            if len(header.getvalue()) != offset:
+                return False
+
+            f.seek(offset + rows * dtype.itemsize)
+            f.write(values.tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(header.getvalue())
+        return True
+
+    def clear(self, symbol=None, timeframe=None):
+        """
+        删除归档
+
+        Args:
+            symbol: 交易对，None 表示全部
+            timeframe: 时间周期，None 表示该交易对的全部周期
+        """
+        for name in os.listdir(self.base_dir):
+            path = os.path.join(self.base_dir, name)
+            if not os.path.isdir(path):
+                continue
+            dir_symbol, _, dir_timeframe = name.rpartition('_')
+            if symbol is not None and dir_symbol != symbol.replace('/', '_'):
+                continue
+            if timeframe is not None and dir_timeframe != timeframe:
+                continue
+            for file_name in os.listdir(path):
+                os.remove(os.path.join(path, file_name))
+            os.rmdir(path)
+            self._mapped.pop(path, None)
@@ -48,12 +48,40 @@ DEFAULT_CONFIG = {
         }
     },
     
+    # 指标计算后端: 'numpy'(indicator_kernels，默认) 或 'ta'(参考实现，与numpy后端的一致性见 tests/test_indicator_backends.py)
+    'indicator_backend': 'numpy',
+    
+    # 指标结果缓存（IndicatorCache）
+    'indicator_cache': {
+        'max_mb': 256,       # 内存中缓存的最大容量（MB）
+        'spill_dir': None    # 淘汰数据的落盘目录，None为不落盘
+    },
+    
+    # 参数扫描（ParameterSweep）
+    'parameter_sweep': {
+        'max_workers': None  # 工作进程数，None为CPU核数
+    },
+    
     # 数据获取参数
     'data': {
         'timeframe': '1d',
         'limit': 1000,
         'retry_count': 3,
-        'retry_delay': 1
+        'retry_delay': 1,
+        'max_workers': 4,            # 并行下载线程数，1 表示逐页串行下载
+        'weight_per_minute': 4800,   # 每分钟请求权重预算（币安上限6000，预留余量）
+        'kline_weight': 2,           # 单次K线请求(limit=1000)的权重
+        # 最新价格请求(fetch_tickers)的权重: [(交易对数上限, 权重), ...]，None 表示不限
+        'ticker_weights': [(20, 2), (100, 40), (None, 80)],
+        'markets_ttl': 6 * 3600,     # 交易对/市场信息缓存有效期（秒）
+        'ticker_ttl': 5,             # 最新价格缓存有效期（秒）
+        'validate': True,            # 是否对K线做去重/异常/缺口检查
+        'repair_gaps': True,         # 检测到缺口时是否重新下载缺失区间
+        'use_cache': True,           # 是否启用本地K线缓存
+        'cache_backend': 'parquet',  # 缓存后端: 'parquet'(OHLCVStore) 或 'mmap'(CandleArchive)
+        'cache_dir': 'data_cache',   # Parquet缓存目录
+        'archive_dir': 'data_archive',  # 内存映射归档目录
+        'import_chunk_size': 200000     # 导入公开K线归档时每块读取的行数
     },
     
     # 图表配置
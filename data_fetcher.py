@@ -3,22 +3,267 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date, timedelta
 import time
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DEFAULT_CONFIG
+from data_store import OHLCVStore
+from data_quality import GapRegistry, validate_ohlcv
+from candle_archive import CandleArchive
+from memory_utils import to_compact
+from resampler import (BASE_TIMEFRAMES, bars_before, can_derive, next_bucket_start, resample_ohlcv,
+                       timeframe_to_ms)
+
+def parse_date(value):
+    """将字符串/date/datetime统一转换为当天零点的datetime"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d')
+    elif isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.strptime(str(value), '%Y-%m-%d')
+
+
+def split_windows(since, until, page_ms):
+    """
+    将 [since, until] 区间切分为每页一个窗口
+    
+    Returns:
+        [(窗口开始, 窗口结束), ...]，窗口结束不含；最后一个窗口包含 until
+    """
+    return [(start, min(start + page_ms, until + 1))
+            for start in range(since, until + 1, page_ms)]
+
+
+def record_leading_gap(gap_registry, symbol, timeframe, since, ohlcv, listed=None):
+    """
+    登记区间开头交易所没有K线的部分（如交易对上市之前），之后不再重复请求
+    
+    Args:
+        gap_registry: GapRegistry
+        symbol: 交易对
+        timeframe: 时间周期
+        since: 请求区间的开始时间戳（毫秒）
+        ohlcv: 从 since 开始下载到的K线
+        listed: 已知存在的最早K线时间戳（如缓存的首根K线），下载结果为空时使用
+    """
+    earliest = [ohlcv[0][0]] if ohlcv else []
+    if listed is not None:
+        earliest.append(listed)
+    if earliest and min(earliest) > since:
+        gap = pd.DataFrame({'start': [since], 'end': [min(earliest) - 1], 'missing': [0]})
+        gap_registry.add(symbol, timeframe, gap)
+
+
+def stitch_candles(pages):
+    """拼接多页K线并按时间戳去重排序"""
+    candles = {}
+    for page in pages:
+        for candle in page:
+            candles[candle[0]] = candle
+    
+    return [candles[ts] for ts in sorted(candles)]
+
+
+def ticker_weight(count):
+    """
+    一次 fetch_tickers 请求的权重
+    
+    Args:
+        count: 请求的交易对数
+    """
+    for max_symbols, weight in DEFAULT_CONFIG['data']['ticker_weights']:
+        if max_symbols is None or count <= max_symbols:
+            return weight
+
+
+class MarketsCache:
+    """
+    市场信息缓存：内存中的加载时间 + 磁盘JSON
+    
+    同步和asyncio版数据获取器共用。超过 ttl 秒后才重新调用交易所接口，
+    接口失败时退回到已过期的磁盘缓存。
+    """
+    
+    def __init__(self, path, ttl):
+        """
+        Args:
+            path: 磁盘缓存文件路径
+            ttl: 有效期（秒）
+        """
+        self.path = path
+        self.ttl = ttl
+        self.loaded_at = None
+    
+    def load(self, download, reload=False):
+        """
+        按缓存规则获取市场信息
+        
+        Args:
+            download: 调用交易所接口的函数，返回 (markets, currencies)
+            reload: 是否忽略缓存强制重新拉取
+        
+        Returns:
+            (markets, currencies)；内存中的副本仍在有效期内时返回 None，调用方沿用客户端已加载的市场信息
+        """
+        now = time.time()
+        if not reload and self.loaded_at is not None and now - self.loaded_at < self.ttl:
+            return None
+        
+        cached = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取市场信息缓存失败: {e}")
+        
+        if not reload and cached is not None and now - cached['updated'] < self.ttl:
+            self.loaded_at = cached['updated']
+            return cached['markets'], cached['currencies']
+        
+        try:
+            markets, currencies = download()
+        except Exception:
+            if cached is None:
+                raise
+            # 接口不可用时使用过期缓存
+            self.loaded_at = now
+            return cached['markets'], cached['currencies']
+        
+        self.loaded_at = now
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated': now, 'markets': markets, 'currencies': currencies}, f, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"写入市场信息缓存失败: {e}")
+        
+        return markets, currencies
+
+
+class RequestWeightLimiter:
+    """
+    请求权重限速器（线程安全的令牌桶）
+    
+    令牌按 weight_per_minute / 60 的速率恢复，桶容量为每分钟预算的1/10，
+    因此任意一分钟内消耗的权重不会超过预算的1.1倍。
+    """
+    
+    def __init__(self, weight_per_minute):
+        self.rate = weight_per_minute / 60.0
+        self.capacity = max(weight_per_minute / 10.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, weight=1):
+        """阻塞直到可以消耗指定权重"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                
+                wait = (weight - self.tokens) / self.rate
+            time.sleep(wait)
+
 
 class BinanceDataFetcher:
     """币安数据获取器"""
     
-    def __init__(self):
-        self.exchange = ccxt.binance({
+    # 最新价格缓存 {交易对: (获取时间, 最新价)}，所有实例（即所有Streamlit会话）共享
+    _ticker_cache = {}
+    _ticker_lock = threading.Lock()
+    
+    def __init__(self, store=None, use_cache=None, max_workers=None):
+        """
+        初始化数据获取器
+        
+        Args:
+            store: 本地K线存储，默认按配置 data.cache_backend 创建 OHLCVStore 或 CandleArchive
+            use_cache: 是否启用本地缓存，默认读取配置 data.use_cache
+            max_workers: 并行下载线程数，默认读取配置 data.max_workers
+        """
+        self.exchange = self._create_exchange()
+        
+        data_config = DEFAULT_CONFIG['data']
+        self.max_workers = max_workers or data_config['max_workers']
+        self.kline_weight = data_config['kline_weight']
+        self.limiter = RequestWeightLimiter(data_config['weight_per_minute'])
+        
+        # 市场信息缓存：内存中的副本 + 磁盘JSON，超过 markets_ttl 秒后重新拉取
+        self.markets_cache = self._create_markets_cache()
+        self.ticker_ttl = data_config['ticker_ttl']
+        
+        if use_cache is None:
+            use_cache = data_config['use_cache']
+        if store is None and use_cache:
+            store = self._create_store()
+        self.store = store
+        
+        # 数据质量检查与缺口修复
+        self.validate = data_config['validate']
+        self.repair_gaps = data_config['repair_gaps']
+        gap_path = os.path.join(store.base_dir, 'known_gaps.json') if store is not None else None
+        self.gap_registry = GapRegistry(gap_path)
+        self.last_quality_report = None
+    
+    @staticmethod
+    def _create_store():
+        """按配置 data.cache_backend 创建本地K线存储"""
+        if DEFAULT_CONFIG['data']['cache_backend'] == 'mmap':
+            return CandleArchive()
+        return OHLCVStore()
+    
+    @staticmethod
+    def _create_markets_cache():
+        """按配置创建市场信息缓存"""
+        data_config = DEFAULT_CONFIG['data']
+        return MarketsCache(os.path.join(data_config['cache_dir'], 'markets.json'), data_config['markets_ttl'])
+    
+    @staticmethod
+    def _download_markets(exchange):
+        """通过同步客户端拉取市场信息，返回 (markets, currencies)"""
+        markets = exchange.load_markets(reload=True)
+        return markets, exchange.currencies
+    
+    @staticmethod
+    def _create_exchange():
+        """创建币安现货客户端"""
+        return ccxt.binance({
             'enableRateLimit': True,
             'options': {
                 'defaultType': 'spot'
             }
         })
     
+    def load_markets(self, reload=False):
+        """
+        加载市场信息（带TTL的内存/磁盘缓存）
+        
+        依次使用内存中的市场信息、磁盘缓存文件，都过期时才调用交易所接口，
+        接口失败时退回到已过期的磁盘缓存（见 MarketsCache）。
+        
+        Args:
+            reload: 是否忽略缓存强制重新拉取
+        """
+        loaded = self.markets_cache.load(lambda: self._download_markets(self.exchange), reload)
+        if loaded is not None:
+            self.exchange.set_markets(*loaded)
+        return self.exchange.markets
+    
     def get_available_symbols(self):
         """获取可用的交易对"""
         try:
-            markets = self.exchange.load_markets()
+            markets = self.load_markets()
             # 过滤出USDT交易对
             usdt_pairs = [symbol for symbol in markets.keys() if symbol.endswith('/USDT')]
             return sorted(usdt_pairs)
@@ -44,6 +289,7 @@ class BinanceDataFetcher:
                 elif isinstance(since, datetime):
                     since = int(since.timestamp() * 1000)
             
+            self.load_markets()
             ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since, limit)
             
             # 转换为DataFrame
@@ -57,64 +303,51 @@ class BinanceDataFetcher:
             print(f"获取数据失败: {e}")
             return pd.DataFrame()
     
-    def fetch_historical_data(self, symbol, start_date, end_date, timeframe='1d'):
+    def fetch_historical_data(self, symbol, start_date, end_date, timeframe='1d', base_timeframe=None,
+                              compact=False, warmup_bars=0):
         """
         获取历史数据
         
+        启用本地缓存时，若某个更细周期的缓存已完整覆盖所需区间，
+        直接由其在本地合成目标周期，不再请求交易所。
+        
         Args:
             symbol: 交易对
             start_date: 开始日期
             end_date: 结束日期
             timeframe: 时间周期
+            base_timeframe: 指定由该细周期合成（如 '1m'），缺失部分会先下载细周期数据
+            compact: 是否返回紧凑表示（float32列 + int64毫秒索引），见 memory_utils
+            warmup_bars: 在开始日期之前额外获取的K线数，供指标预热
+                         （见 indicator_registry.warmup_bars）
         """
         try:
             # 转换日期格式
-            if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, '%Y-%m-%d')
-            elif isinstance(start_date, date):
-                start_date = datetime.combine(start_date, datetime.min.time())
-            elif not isinstance(start_date, datetime):
-                start_date = datetime.strptime(str(start_date), '%Y-%m-%d')
-                
-            if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, '%Y-%m-%d')
-            elif isinstance(end_date, date):
-                end_date = datetime.combine(end_date, datetime.min.time())
-            elif not isinstance(end_date, datetime):
-                end_date = datetime.strptime(str(end_date), '%Y-%m-%d')
+            start_date = parse_date(start_date)
+            end_date = parse_date(end_date)
             
             # 计算时间戳
             since = int(start_date.timestamp() * 1000)
             end_timestamp = int(end_date.timestamp() * 1000)
             
-            all_data = []
-            current_since = since
+            if warmup_bars > 0:
+                warmup_since = bars_before(since, timeframe, warmup_bars)
+                start_date -= timedelta(milliseconds=since - warmup_since)
+                since = warmup_since
             
-            while current_since < end_timestamp:
-                # 获取数据
-                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, current_since, 1000)
-                
-                if not ohlcv:
-                    break
-                
-                all_data.extend(ohlcv)
-                
-                # 更新时间戳
-                current_since = ohlcv[-1][0] + 1
-                
-                # 避免请求过于频繁
-                time.sleep(0.1)
+            df = self._fetch_derived(symbol, timeframe, since, end_timestamp, base_timeframe)
+            if df is None:
+                df = self._fetch_frame(symbol, timeframe, since, end_timestamp)
             
-            if not all_data:
+            if df.empty:
                 return pd.DataFrame()
             
-            # 转换为DataFrame
-            df = pd.DataFrame(all_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
+            # 过滤日期范围（索引有序，二分定位后切片）
+            df = df.iloc[df.index.searchsorted(start_date, side='left'):
+                         df.index.searchsorted(end_date, side='right')]
             
-            # 过滤日期范围
-            df = df[(df.index >= start_date) & (df.index <= end_date)]
+            if compact:
+                df = to_compact(df)
             
             return df
             
@@ -122,11 +355,260 @@ class BinanceDataFetcher:
             print(f"获取历史数据失败: {e}")
             return pd.DataFrame()
     
+    def _fetch_frame(self, symbol, timeframe, since, end_timestamp):
+        """
+        获取 [since, end_timestamp] 区间的K线DataFrame（有缓存时走缓存）
+        
+        启用 validate 时会去重、剔除异常K线，并只针对检测到的缺口重新下载。
+        """
+        if self.store is not None:
+            df = self._fetch_with_store(symbol, timeframe, since, end_timestamp)
+        else:
+            df = self._to_dataframe(self._fetch_range(symbol, timeframe, since, end_timestamp))
+        
+        if not self.validate or df.empty:
+            return df
+        
+        df, report = validate_ohlcv(df, timeframe)
+        if self.repair_gaps and not report['gaps'].empty:
+            df, report = self._repair_gaps(symbol, timeframe, df, report)
+        
+        self.last_quality_report = report
+        if report['duplicates'] or report['invalid'] or report['missing_bars']:
+            print(f"{symbol} {timeframe} 数据检查: 重复 {report['duplicates']} 条, "
+                  f"异常 {report['invalid']} 条, 缺口 {len(report['gaps'])} 处共 {report['missing_bars']} 根K线")
+        
+        return df
+    
+    def _repair_gaps(self, symbol, timeframe, df, report):
+        """
+        重新下载缺口区间并合并
+        
+        已登记为确认缺失的区间直接跳过；重新下载后仍缺失的区间会被登记，避免之后重复请求。
+        """
+        gaps = self.gap_registry.unknown(symbol, timeframe, report['gaps'])
+        if gaps.empty:
+            return df, report
+        
+        fetched = []
+        for start, end in zip(gaps['start'], gaps['end']):
+            ohlcv = self._fetch_range(symbol, timeframe, int(start), int(end) + 1)
+            fetched.extend(candle for candle in ohlcv if start <= candle[0] <= end)
+        
+        if fetched:
+            if self.store is not None:
+                self.store.save(symbol, timeframe, fetched)
+            df = pd.concat([df, self._to_dataframe(fetched)])
+            df, report = validate_ohlcv(df, timeframe)
+        
+        # 仍未补齐的缺口视为交易所侧确实缺失
+        self.gap_registry.add(symbol, timeframe, self.gap_registry.unknown(symbol, timeframe, report['gaps']))
+        return df, report
+    
+    def _fetch_derived(self, symbol, timeframe, since, end_timestamp, base_timeframe=None):
+        """
+        由更细周期的K线在本地合成目标周期
+        
+        未指定 base_timeframe 时，只使用已完整覆盖区间的缓存周期（优先较粗的周期，
+        需要合成的K线更少）；没有可用缓存时返回 None，由调用方直接下载目标周期。
+        """
+        if base_timeframe is None or base_timeframe == timeframe:
+            if base_timeframe is not None or self.store is None:
+                return None
+            base_timeframe = self._find_cached_base(symbol, timeframe, since, end_timestamp)
+            if base_timeframe is None:
+                return None
+        elif not can_derive(base_timeframe, timeframe):
+            raise ValueError(f"无法由 {base_timeframe} 合成 {timeframe} K线")
+        
+        # 最后一根目标K线需要其周期内的全部细周期K线
+        base_end = next_bucket_start(end_timestamp, timeframe) - timeframe_to_ms(base_timeframe)
+        base_df = self._fetch_frame(symbol, base_timeframe, since, base_end)
+        return resample_ohlcv(base_df, timeframe)
+    
+    def _find_cached_base(self, symbol, timeframe, since, end_timestamp):
+        """查找缓存中完整覆盖区间、且能合成目标周期的细周期"""
+        now = int(time.time() * 1000)
+        for base_timeframe in reversed(BASE_TIMEFRAMES):
+            if not can_derive(base_timeframe, timeframe):
+                continue
+            coverage = self.store.coverage(symbol, base_timeframe)
+            if coverage is None:
+                continue
+            
+            base_ms = timeframe_to_ms(base_timeframe)
+            needed_last = next_bucket_start(end_timestamp, timeframe) - base_ms
+            # 区间延伸到当前时间时，只要求覆盖到最近一根已收盘的细周期K线
+            needed_last = min(needed_last, now - now % base_ms - base_ms)
+            if coverage[0] <= since and coverage[1] >= needed_last:
+                return base_timeframe
+        
+        return None
+    
+    def _fetch_range(self, symbol, timeframe, since, until):
+        """
+        分页下载 [since, until) 区间内的K线
+        
+        max_workers 大于1时按窗口并行下载，否则逐页串行下载。
+        
+        Returns:
+            交易所原始K线列表 [[timestamp, open, high, low, close, volume], ...]
+        """
+        if self.max_workers > 1:
+            return self._fetch_range_parallel(symbol, timeframe, since, until)
+        
+        self.load_markets()
+        all_data = []
+        current_since = since
+        
+        while current_since < until:
+            # 获取数据
+            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, current_since, 1000)
+            
+            if not ohlcv:
+                break
+            
+            all_data.extend(ohlcv)
+            
+            # 更新时间戳
+            current_since = ohlcv[-1][0] + 1
+            
+            # 避免请求过于频繁
+            time.sleep(0.1)
+        
+        return all_data
+    
+    def _fetch_range_parallel(self, symbol, timeframe, since, until):
+        """
+        按1000根K线一个窗口切分区间，通过线程池并行下载后拼接去重
+        
+        每个线程使用独立的客户端（共享已加载的市场信息），
+        所有请求共用 self.limiter 控制请求权重。
+        第一个窗口先单独请求：区间开头早于交易所最早的K线（如上市之前）时，
+        从第一根K线处重新切分窗口，不为没有数据的区间发送请求。
+        """
+        page_ms = self.exchange.parse_timeframe(timeframe) * 1000 * 1000
+        # 与串行分页一致，包含恰好落在 until 上的K线
+        windows = split_windows(since, until, page_ms)
+        if not windows:
+            return []
+        
+        self.load_markets()
+        local = threading.local()
+        
+        def fetch_page(window_start):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = self._create_exchange()
+                client.enableRateLimit = False
+                client.set_markets(self.exchange.markets, self.exchange.currencies)
+                local.client = client
+            
+            self.limiter.acquire(self.kline_weight)
+            return client.fetch_ohlcv(symbol, timeframe, window_start, 1000)
+        
+        def fetch_window(window):
+            window_start, window_end = window
+            return [candle for candle in fetch_page(window_start) if candle[0] < window_end]
+        
+        first_page = fetch_page(since)
+        if not first_page:
+            return []
+        windows = split_windows(max(since, first_page[0][0]), until, page_ms)
+        pages = [[candle for candle in first_page if candle[0] < windows[0][1]]] if windows else []
+        windows = windows[1:]
+        
+        if windows:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(windows))) as pool:
+                pages.extend(pool.map(fetch_window, windows))
+        
+        return stitch_candles(pages)
+    
+    def _fetch_with_store(self, symbol, timeframe, since, end_timestamp):
+        """
+        优先读取本地缓存，只下载缓存头部/尾部缺失的区间
+        
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            since: 开始时间戳（毫秒）
+            end_timestamp: 结束时间戳（毫秒）
+        """
+        coverage = self.store.coverage(symbol, timeframe)
+        
+        if coverage is None:
+            missing = [(since, end_timestamp)]
+        else:
+            first_ts, last_ts = coverage
+            missing = []
+            # 头部缺口（已确认交易所没有数据的区间，如上市之前，不再请求）
+            if since < first_ts and not self.gap_registry.covers(symbol, timeframe, since, first_ts - 1):
+                missing.append((since, first_ts))
+            # 尾部缺口：从最后一根K线重新下载，覆盖缓存时尚未收盘的K线
+            if end_timestamp > last_ts:
+                missing.append((last_ts, end_timestamp))
+        
+        for range_start, range_end in missing:
+            ohlcv = self._fetch_range(symbol, timeframe, range_start, range_end)
+            self.store.save(symbol, timeframe, ohlcv)
+            if range_start == since:
+                record_leading_gap(self.gap_registry, symbol, timeframe, range_start, ohlcv,
+                                   first_ts if coverage is not None else None)
+        
+        return self.store.load(symbol, timeframe, since, end_timestamp)
+    
+    @staticmethod
+    def _to_dataframe(ohlcv):
+        """将交易所原始K线列表转换为以时间为索引的DataFrame"""
+        if not ohlcv:
+            return pd.DataFrame()
+        
+        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        
+        return df
+    
     def get_current_price(self, symbol):
         """获取当前价格"""
-        try:
-            ticker = self.exchange.fetch_ticker(symbol)
-            return ticker['last']
-        except Exception as e:
-            print(f"获取当前价格失败: {e}")
-            return None
+        return self.get_current_prices([symbol]).get(symbol)
+    
+    def get_current_prices(self, symbols):
+        """
+        批量获取当前价格
+        
+        未命中缓存的交易对通过一次 fetch_tickers 请求获取，
+        结果在 ticker_ttl 秒内直接复用。
+        
+        Args:
+            symbols: 交易对列表
+        
+        Returns:
+            {交易对: 最新价}，获取失败的交易对对应 None
+        """
+        now = time.time()
+        prices = {}
+        with self._ticker_lock:
+            for symbol in symbols:
+                cached = self._ticker_cache.get(symbol)
+                if cached is not None and now - cached[0] < self.ticker_ttl:
+                    prices[symbol] = cached[1]
+        
+        missing = [symbol for symbol in symbols if symbol not in prices]
+        if missing:
+            try:
+                self.load_markets()
+                self.limiter.acquire(ticker_weight(len(missing)))
+                tickers = self.exchange.fetch_tickers(missing)
+            except Exception as e:
+                print(f"获取当前价格失败: {e}")
+                tickers = {}
+            
+            with self._ticker_lock:
+                for symbol in missing:
+                    ticker = tickers.get(symbol)
+                    prices[symbol] = ticker['last'] if ticker else None
+                    if prices[symbol] is not None:
+                        self._ticker_cache[symbol] = (now, prices[symbol])
+        
+        return {symbol: prices.get(symbol) for symbol in symbols}
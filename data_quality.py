@@ -0,0 +1,149 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from resampler import bucket_start, grid_position, grid_timestamp
+
+GAP_COLUMNS = ['start', 'end', 'missing']
+
+
+def find_gaps(timestamps, timeframe):
+    """
+    对照K线网格查找缺口
+
+    Args:
+        timestamps: 已排序、去重的K线开盘时间（毫秒，int64数组）
+        timeframe: 时间周期
+
+    Returns:
+        缺口索引DataFrame，每行一处缺口:
+        start/end 为缺失的第一根/最后一根K线开盘时间（毫秒），missing 为缺失根数
+    """
+    if len(timestamps) < 2:
+        return pd.DataFrame(columns=GAP_COLUMNS, dtype=np.int64)
+
+    positions = grid_position(timestamps, timeframe)
+    steps = np.diff(positions)
+    holes = np.flatnonzero(steps > 1)
+
+    return pd.DataFrame({
+        'start': grid_timestamp(positions[holes] + 1, timeframe),
+        'end': grid_timestamp(positions[holes + 1] - 1, timeframe),
+        'missing': steps[holes] - 1
+    })
+
+
+def validate_ohlcv(df, timeframe):
+    """
+    K线数据质量检查（全部为向量化操作）
+
+    依次执行：按时间排序、去除重复时间戳（保留最后一条）、剔除异常K线
+    （缺失值、非正价格、负成交量、最高/最低价与开收盘价矛盾、不在K线网格上），
+    最后对照网格生成缺口索引。
+
+    Args:
+        df: 以时间为索引的OHLCV DataFrame
+        timeframe: 时间周期
+
+    Returns:
+        (清洗后的DataFrame, 报告字典)
+        报告字典: {'duplicates': 重复条数, 'invalid': 异常条数,
+                  'gaps': 缺口索引DataFrame, 'missing_bars': 缺失K线总数}
+    """
+    if df.empty:
+        return df, {'duplicates': 0, 'invalid': 0,
+                    'gaps': pd.DataFrame(columns=GAP_COLUMNS, dtype=np.int64), 'missing_bars': 0}
+
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    if not df.index.is_monotonic_increasing:
+        order = np.argsort(timestamps, kind='stable')
+        df = df.iloc[order]
+        timestamps = timestamps[order]
+
+    # 相同时间戳只保留最后一条
+    duplicate = np.r_[timestamps[1:] == timestamps[:-1], False]
+
+    o = df['open'].to_numpy()
+    h = df['high'].to_numpy()
+    l = df['low'].to_numpy()
+    c = df['close'].to_numpy()
+    v = df['volume'].to_numpy()
+    with np.errstate(invalid='ignore'):
+        invalid = (np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c) | np.isnan(v)
+                   | (o <= 0) | (h <= 0) | (l <= 0) | (c <= 0) | (v < 0)
+                   | (h < np.maximum(o, c)) | (l > np.minimum(o, c))
+                   | (bucket_start(timestamps, timeframe) != timestamps))
+    invalid &= ~duplicate
+
+    keep = ~(duplicate | invalid)
+    if not keep.all():
+        df = df[keep]
+        timestamps = timestamps[keep]
+
+    gaps = find_gaps(timestamps, timeframe)
+    report = {
+        'duplicates': int(duplicate.sum()),
+        'invalid': int(invalid.sum()),
+        'gaps': gaps,
+        'missing_bars': int(gaps['missing'].sum()) if not gaps.empty else 0
+    }
+    return df, report
+
+
+class GapRegistry:
+    """
+    已确认缺口登记表
+
+    重新下载后仍然缺失的区间（如交易所停机期间）记录在这里，之后不再重复请求。
+    path 为 None 时只保存在内存中。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._gaps = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._gaps = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"读取缺口登记表失败: {e}")
+
+    @staticmethod
+    def _key(symbol, timeframe):
+        return f"{symbol}|{timeframe}"
+
+    def unknown(self, symbol, timeframe, gaps):
+        """从缺口索引中去掉已确认的缺口"""
+        known = self._gaps.get(self._key(symbol, timeframe))
+        if not known or gaps.empty:
+            return gaps
+        known = np.asarray(known, dtype=np.int64).reshape(-1, 2)
+
+        # 缺口完全落在某个已确认区间内即视为已知
+        starts = gaps['start'].to_numpy()
+        ends = gaps['end'].to_numpy()
+        covered = ((known[:, 0][None, :] <= starts[:, None])
+                   & (known[:, 1][None, :] >= ends[:, None])).any(axis=1)
+        return gaps[~covered]
+
+    def covers(self, symbol, timeframe, start, end):
+        """[start, end] 区间（毫秒，含两端）是否完全落在某个已确认缺口内"""
+        gaps = pd.DataFrame({'start': [int(start)], 'end': [int(end)], 'missing': [0]})
+        return self.unknown(symbol, timeframe, gaps).empty
+
+    def add(self, symbol, timeframe, gaps):
+        """登记确认无法补齐的缺口"""
+        if gaps.empty:
+            return
+        key = self._key(symbol, timeframe)
+        known = self._gaps.setdefault(key, [])
+        known.extend([int(start), int(end)] for start, end in zip(gaps['start'], gaps['end']))
+
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._gaps, f)
+            except OSError as e:
+                print(f"写入缺口登记表失败: {e}")
@@ -0,0 +1,210 @@
+import os
+import shutil
+import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
+
+from config import DEFAULT_CONFIG
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# 尾部追加的分片文件数达到该值时合并回主文件
+MAX_PARTS = 64
+
+
+class OHLCVStore:
+    """
+    本地K线存储
+
+    每个 交易对/时间周期 对应一个Parquet文件，timestamp列为毫秒时间戳(int64)，
+    其余列为float64。fetch_historical_data 只会向已有区间的头部或尾部扩展，
+    因此每个文件覆盖的始终是一段连续区间，用首尾时间戳即可判断缺口。
+
+    新数据全部晚于已有的最后一根K线时（尾部刷新、按时间顺序导入归档），只把新数据写成
+    一个分片文件放在 {文件名}.parts 目录下，不重写主文件；分片数达到 MAX_PARTS 或
+    写入与已有区间重叠的数据时，再合并成单个文件。
+    """
+
+    def __init__(self, base_dir=None):
+        """
+        初始化本地存储
+
+        Args:
+            base_dir: 存储目录，默认使用配置中的 data.cache_dir
+        """
+        self.base_dir = base_dir or DEFAULT_CONFIG['data']['cache_dir']
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _path(self, symbol, timeframe):
+        """获取交易对/时间周期对应的文件路径"""
+        name = f"{symbol.replace('/', '_')}_{timeframe}.parquet"
+        return os.path.join(self.base_dir, name)
+
+    def _parts_dir(self, symbol, timeframe):
+        """尾部追加分片所在的目录"""
+        return self._path(symbol, timeframe)[:-len('.parquet')] + '.parts'
+
+    def _files(self, symbol, timeframe):
+        """按时间先后排列的数据文件：主文件在前，分片按序号排列"""
+        path = self._path(symbol, timeframe)
+        files = [path] if os.path.exists(path) else []
+        parts_dir = self._parts_dir(symbol, timeframe)
+        if os.path.isdir(parts_dir):
+            files.extend(os.path.join(parts_dir, name) for name in sorted(os.listdir(parts_dir))
+                         if name.endswith('.parquet'))
+        return files
+
+    def _read(self, symbol, timeframe, columns=None, filters=None):
+        """读取原始存储数据（timestamp为毫秒整数）"""
+        files = self._files(symbol, timeframe)
+        if not files:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        if len(files) == 1:
+            return pd.read_parquet(files[0], columns=columns, filters=filters)
+        return pq.ParquetDataset(files, filters=filters).read(columns=columns).to_pandas()
+
+    @staticmethod
+    def _timestamp_bounds(path):
+        """
+        从Parquet行组统计信息读取文件的首尾时间戳（文件内按时间排序）
+
+        没有统计信息时（如其他工具写入的文件）退回读取整列。
+        """
+        metadata = pq.read_metadata(path)
+        if metadata.num_rows == 0:
+            return None
+        column = metadata.schema.names.index('timestamp')
+        first = metadata.row_group(0).column(column).statistics
+        last = metadata.row_group(metadata.num_row_groups - 1).column(column).statistics
+        if first is not None and last is not None and first.has_min_max and last.has_min_max:
+            return int(first.min), int(last.max)
+
+        timestamps = pd.read_parquet(path, columns=['timestamp'])['timestamp']
+        return int(timestamps.iloc[0]), int(timestamps.iloc[-1])
+
+    def coverage(self, symbol, timeframe):
+        """
+        获取已缓存数据的时间范围（只读取首尾文件的元数据）
+
+        Returns:
+            (首根K线时间戳, 末根K线时间戳)，单位毫秒；无缓存时返回 None
+        """
+        files = self._files(symbol, timeframe)
+        first = self._timestamp_bounds(files[0]) if files else None
+        if first is None:
+            return None
+        return first[0], self._timestamp_bounds(files[-1])[1]
+
+    def load(self, symbol, timeframe, start_ts=None, end_ts=None):
+        """
+        读取缓存K线
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            start_ts: 开始时间戳（毫秒，含）
+            end_ts: 结束时间戳（毫秒，含）
+        """
+        filters = []
+        if start_ts is not None:
+            filters.append(('timestamp', '>=', int(start_ts)))
+        if end_ts is not None:
+            filters.append(('timestamp', '<=', int(end_ts)))
+
+        if not self._files(symbol, timeframe):
+            return pd.DataFrame()
+
+        df = self._read(symbol, timeframe, filters=filters or None)
+        if df.empty:
+            return pd.DataFrame()
+
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        return df
+
+    def save(self, symbol, timeframe, ohlcv):
+        """
+        合并写入K线，按时间戳去重（新数据覆盖旧数据）
+
+        新数据全部晚于已缓存的最后一根K线时只追加一个分片，不重写已有数据。
+
+        Args:
+            symbol: 交易对
+            timeframe: 时间周期
+            ohlcv: 交易所返回的 [[timestamp, open, high, low, close, volume], ...]
+                   或同结构的DataFrame
+        """
+        if isinstance(ohlcv, pd.DataFrame):
+            new_df = ohlcv[OHLCV_COLUMNS]
+        else:
+            new_df = pd.DataFrame(ohlcv, columns=OHLCV_COLUMNS)
+        if new_df.empty:
+            return
+
+        new_df = new_df.astype({'timestamp': np.int64, 'open': np.float64, 'high': np.float64,
+                                'low': np.float64, 'close': np.float64, 'volume': np.float64})
+
+        coverage = self.coverage(symbol, timeframe)
+        if coverage is not None and new_df['timestamp'].min() > coverage[1]:
+            self._append(symbol, timeframe, self._normalize(new_df))
+            return
+
+        if coverage is not None:
+            new_df = pd.concat([self._read(symbol, timeframe), new_df], ignore_index=True)
+        self._rewrite(symbol, timeframe, self._normalize(new_df))
+
+    @staticmethod
+    def _normalize(df):
+        """按时间戳去重（保留后写入的）并排序"""
+        df = df.drop_duplicates(subset='timestamp', keep='last')
+        return df.sort_values('timestamp').reset_index(drop=True)
+
+    def _append(self, symbol, timeframe, df):
+        """把晚于已有数据的K线写成新分片，分片过多时合并"""
+        parts_dir = self._parts_dir(symbol, timeframe)
+        os.makedirs(parts_dir, exist_ok=True)
+        parts = [name for name in os.listdir(parts_dir) if name.endswith('.parquet')]
+        if len(parts) + 1 >= MAX_PARTS:
+            self._rewrite(symbol, timeframe, pd.concat([self._read(symbol, timeframe), df], ignore_index=True))
+            return
+
+        sequence = max((int(name[:-len('.parquet')]) for name in parts), default=0) + 1
+        part_path = os.path.join(parts_dir, f'{sequence:06d}.parquet')
+        df.to_parquet(part_path + '.tmp', index=False)
+        os.replace(part_path + '.tmp', part_path)
+
+    def _rewrite(self, symbol, timeframe, df):
+        """把全部数据写成单个主文件并删除分片"""
+        # 先写临时文件再替换，避免中途失败损坏已有缓存；分片在替换前删除，
+        # 中途失败时最多丢失尾部数据（下次按缺口重新下载），不会留下重复的K线
+        path = self._path(symbol, timeframe)
+        tmp_path = path + '.tmp'
+        df.to_parquet(tmp_path, index=False)
+        shutil.rmtree(self._parts_dir(symbol, timeframe), ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    def clear(self, symbol=None, timeframe=None):
+        """
+        删除缓存
+
+        Args:
+            symbol: 交易对，None 表示全部
+            timeframe: 时间周期，None 表示该交易对的全部周期
+        """
+        for name in os.listdir(self.base_dir):
+            if name.endswith('.parquet'):
+                stem = name[:-len('.parquet')]
+            elif name.endswith('.parts'):
+                stem = name[:-len('.parts')]
+            else:
+                continue
+            file_symbol, _, file_timeframe = stem.rpartition('_')
+            if symbol is not None and file_symbol != symbol.replace('/', '_'):
+                continue
+            if timeframe is not None and file_timeframe != timeframe:
+                continue
+            path = os.path.join(self.base_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_CONFIG
+
+
+def dataset_fingerprint(df):
+    """
+    计算K线数据的内容指纹
+
+    对时间索引和OHLCV列的原始字节做blake2b摘要，数据内容不变时指纹不变，
+    与DataFrame对象本身无关；任何一根K线变化都会得到新的指纹。
+
+    Args:
+        df: 包含OHLCV数据的DataFrame（datetime索引或紧凑表示的整数索引）
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(df.index, pd.DatetimeIndex):
+        index = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    else:
+        index = np.asarray(df.index)
+    digest.update(np.ascontiguousarray(index).tobytes())
+
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        if column in df.columns:
+            values = np.ascontiguousarray(df[column].to_numpy())
+            digest.update(f"{column}:{values.dtype.str}".encode())
+            digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+class IndicatorCache:
+    """
+    技术指标结果缓存
+
+    以 (数据指纹, 指标列名, 参数) 为键，每个指标列单独保存为float64数组，
+    修改某个指标的参数只会让该指标重新计算，其余指标直接命中缓存。
+    内存中按LRU策略淘汰，总大小不超过 max_mb；设置 spill_dir 时
+    被淘汰的列写入磁盘，再次访问时从磁盘读回。
+    """
+
+    def __init__(self, max_mb=None, spill_dir=None):
+        """
+        初始化缓存
+
+        Args:
+            max_mb: 内存中缓存的最大容量（MB），默认使用配置中的 indicator_cache.max_mb
+            spill_dir: 淘汰数据的落盘目录，默认使用配置中的 indicator_cache.spill_dir（None为不落盘）
+        """
+        settings = DEFAULT_CONFIG.get('indicator_cache', {})
+        if max_mb is None:
+            max_mb = settings.get('max_mb', 256)
+        if spill_dir is None:
+            spill_dir = settings.get('spill_dir')
+
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(fingerprint, column, params):
+        """生成缓存键，参数字典按键名排序后参与比较"""
+        return fingerprint, column, tuple(sorted((params or {}).items()))
+
+    def _spill_path(self, key):
+        """缓存键对应的落盘文件路径"""
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.npy")
+
+    def _insert(self, key, values):
+        """写入内存并按LRU淘汰，调用方需持有锁"""
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key).nbytes
+        self._entries[key] = values
+        self._nbytes += values.nbytes
+
+        while self._nbytes > self.max_bytes and self._entries:
+            old_key, old_values = self._entries.popitem(last=False)
+            self._nbytes -= old_values.nbytes
+            if self.spill_dir:
+                try:
+                    np.save(self._spill_path(old_key), old_values)
+                except OSError as e:
+                    print(f"指标缓存落盘失败: {e}")
+
+    def get(self, fingerprint, column, params):
+        """
+        读取缓存的指标列
+
+        Returns:
+            只读的float64数组；未命中时返回 None
+        """
+        key = self.make_key(fingerprint, column, params)
+        with self._lock:
+            values = self._entries.get(key)
+            if values is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return values
+
+            if self.spill_dir:
+                path = self._spill_path(key)
+                if os.path.exists(path):
+                    try:
+                        values = np.load(path)
+                    except (OSError, ValueError) as e:
+                        print(f"读取指标缓存失败: {e}")
+                    else:
+                        values.setflags(write=False)
+                        self._insert(key, values)
+                        self.hits += 1
+                        return values
+
+            self.misses += 1
+            return None
+
+    def put(self, fingerprint, column, params, values):
+        """写入一个指标列"""
+        values = np.array(values, dtype=np.float64)
+        values.setflags(write=False)
+        key = self.make_key(fingerprint, column, params)
+        with self._lock:
+            self._insert(key, values)
+
+    def clear(self):
+        """清空内存缓存及落盘文件"""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            if self.spill_dir and os.path.isdir(self.spill_dir):
+                for name in os.listdir(self.spill_dir):
+                    if name.endswith('.npy'):
+                        os.remove(os.path.join(self.spill_dir, name))
+
+    def stats(self):
+        """
+        缓存使用情况
+
+        Returns:
+            {'entries': 内存中的列数, 'memory_mb': 内存占用MB, 'hits': 命中次数, 'misses': 未命中次数}
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'memory_mb': self._nbytes / 1024 / 1024,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,383 @@
+"""
+NumPy技术指标内核
+
+与 TechnicalIndicators 的 ta 实现逐项对应，输入输出均为 float64 ndarray，
+不创建任何中间 pandas 对象，适合参数扫描时反复调用。
+指数平滑类递推（EMA、Wilder平滑）使用 scipy.signal.lfilter 在C层完成。
+
+输入可以是一维序列，也可以是 (时间 × 交易对) 的二维矩阵，此时沿第0轴按列独立计算，
+结果与逐列调用一致。每列开头的NaN（如上市前的K线、MACD信号线的输入）
+视为该列尚未开始，计算从该列第一个有效值起算。
+
+与 ta 的差异仅在浮点舍入层面（约为序列量级的1e-12）；价格跨越多个数量级时，
+pandas 的在线滚动标准差会累积误差，这里的两遍法结果更接近精确值。
+序列中间出现NaN时，递推结果会从该处起一直为NaN，应先经过 data_quality.validate_ohlcv 清洗。
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+# 滑动窗口分块计算时每块的行数，控制临时数组大小
+_CHUNK_ROWS = 65536
+
+
+def _first_valid(x):
+    """每列第一个非NaN值的位置（一维输入返回整数），全为NaN的列返回 len(x)"""
+    valid = ~np.isnan(x)
+    start = np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+    return int(start) if x.ndim == 1 else start
+
+
+def _column_groups(start):
+    """
+    按起始位置对列分组
+
+    Returns:
+        [(起始位置, 列选择器)]，一维输入时列选择器为 Ellipsis
+    """
+    if np.ndim(start) == 0:
+        return [(start, Ellipsis)]
+    return [(int(s), start == s) for s in np.unique(start)]
+
+
+def ewm(x, alpha, min_periods=0):
+    """
+    指数加权平均（等价于 pandas ewm(alpha=alpha, adjust=False)）
+
+    从每列第一个非NaN值开始递推，前 min_periods-1 个有效值位置输出NaN。
+    起始位置相同的列在同一次 lfilter 调用中完成。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+
+    for start, columns in _column_groups(_first_valid(x)):
+        if start >= len(x):
+            continue
+        block = x[start:, columns]
+        result = np.empty_like(block)
+        result[0] = block[0]
+        if len(block) > 1:
+            # y[t] = (1-alpha)*y[t-1] + alpha*x[t]，初始状态为 y[start] = x[start]
+            result[1:] = lfilter([alpha], [1.0, alpha - 1.0], block[1:], axis=0,
+                                 zi=(1.0 - alpha) * block[:1])[0]
+        if min_periods > 1:
+            result[:min_periods - 1] = np.nan
+        out[start:, columns] = result
+    return out
+
+
+def ema(x, period):
+    """EMA，等价于 ta.trend.EMAIndicator"""
+    return ewm(x, 2.0 / (period + 1), min_periods=period)
+
+
+def sma(x, period):
+    """
+    简单移动平均，等价于 rolling(period).mean()（窗口内有NaN时输出NaN）
+
+    使用前缀和一次求出全部窗口和；先减去每列首个有效值以降低累加的数量级。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if len(x) < period:
+        return out
+
+    valid = ~np.isnan(x)
+    start = np.minimum(_first_valid(x), len(x) - 1)
+    reference = np.take_along_axis(x, np.reshape(start, (1,) + x.shape[1:]), axis=0)[0]
+    reference = np.where(np.isnan(reference), 0.0, reference)
+
+    zero = np.zeros((1,) + x.shape[1:])
+    csum = np.concatenate((zero, np.cumsum(np.where(valid, x - reference, 0.0), axis=0)))
+    count = np.concatenate((zero, np.cumsum(valid, axis=0)))
+    window_sum = csum[period:] - csum[:-period]
+    window_count = count[period:] - count[:-period]
+    out[period - 1:] = np.where(window_count == period, window_sum / period + reference, np.nan)
+    return out
+
+
+def rolling_std(x, period, mean=None):
+    """
+    滚动总体标准差（ddof=0），等价于 rolling(period).std(ddof=0)
+
+    按块构造滑动窗口视图做两遍法计算，避免平方和相减的精度损失。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    if len(x) < period:
+        return out
+    if mean is None:
+        mean = sma(x, period)
+
+    windows = sliding_window_view(x, period, axis=0)
+    window_mean = mean[period - 1:]
+    for lo in range(0, len(windows), _CHUNK_ROWS):
+        hi = min(lo + _CHUNK_ROWS, len(windows))
+        deviation = windows[lo:hi] - window_mean[lo:hi, ..., None]
+        out[period - 1 + lo:period - 1 + hi] = np.sqrt((deviation * deviation).mean(axis=-1))
+    return out
+
+
+def _rolling_extreme(x, period, ufunc, fill):
+    """
+    滚动最大/最小值的 van Herk/Gil-Werman 算法
+
+    将序列按 period 分块，分别求块内前缀和后缀的累计极值，
+    任意长度为 period 的窗口恰好跨越相邻两块，窗口极值 = max(左块后缀, 右块前缀)。
+    每个元素只参与常数次比较，耗时与窗口长度无关（O(n)），且全部为向量化操作。
+    窗口内有NaN时结果为NaN，与 rolling(period).max()/min() 一致。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    n = len(x)
+    if n < period:
+        return out
+    if period == 1:
+        out[:] = x
+        return out
+
+    pad = (-n) % period
+    padded = np.concatenate((x, np.full((pad,) + x.shape[1:], fill)))
+    blocks = padded.reshape((-1, period) + x.shape[1:])
+    prefix = ufunc.accumulate(blocks, axis=1).reshape(padded.shape)
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    out[period - 1:] = ufunc(suffix[:n - period + 1], prefix[period - 1:n])
+    return out
+
+
+def rolling_max(x, period):
+    """滚动最大值，等价于 rolling(period).max()"""
+    return _rolling_extreme(x, period, np.maximum, -np.inf)
+
+
+def rolling_min(x, period):
+    """滚动最小值，等价于 rolling(period).min()"""
+    return _rolling_extreme(x, period, np.minimum, np.inf)
+
+
+def donchian_channel(high, low, period=20):
+    """唐奇安通道，返回 (上轨=N周期最高价, 中轨, 下轨=N周期最低价)"""
+    upper = rolling_max(high, period)
+    lower = rolling_min(low, period)
+    return upper, (upper + lower) / 2, lower
+
+
+def rolling_drawdown(close, period):
+    """滚动回撤：收盘价相对最近 period 根K线内最高收盘价的回落比例（≤0）"""
+    close = np.asarray(close, dtype=np.float64)
+    return close / rolling_max(close, period) - 1
+
+
+def _mask_before(out, start, rows):
+    """将每列 start+rows 之前的位置置为NaN"""
+    position = np.arange(len(out)).reshape((-1,) + (1,) * (out.ndim - 1))
+    out[position < np.asarray(start) + rows] = np.nan
+    return out
+
+
+def rsi(close, period=14):
+    """RSI，等价于 ta.momentum.RSIIndicator"""
+    close = np.asarray(close, dtype=np.float64)
+    diff = np.diff(close, axis=0, prepend=np.nan)
+    # 与 ta 一致：第一根K线的涨跌记为0（上市前的NaN同样记为0，平滑结果保持为0）
+    with np.errstate(invalid='ignore'):
+        gain = np.where(diff > 0, diff, 0.0)
+        loss = np.where(diff < 0, -diff, 0.0)
+
+    avg_gain = ewm(gain, 1.0 / period)
+    avg_loss = ewm(loss, 1.0 / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    return _mask_before(out, _first_valid(close), period - 1)
+
+
+def macd(close, fast_period=12, slow_period=26, signal_period=9):
+    """MACD，等价于 ta.trend.MACD，返回 (MACD, 信号线, 柱状图)"""
+    line = ema(close, fast_period) - ema(close, slow_period)
+    signal = ema(line, signal_period)
+    return line, signal, line - signal
+
+
+def bollinger_bands(close, period=20, std_dev=2):
+    """布林带，等价于 ta.volatility.BollingerBands，返回 (上轨, 中轨, 下轨)"""
+    middle = sma(close, period)
+    std = rolling_std(close, period, middle)
+    return middle + std_dev * std, middle, middle - std_dev * std
+
+
+def _stochastic_k(close, lowest, highest):
+    """由滚动最低/最高价计算 %K"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 * (np.asarray(close, dtype=np.float64) - lowest) / (highest - lowest)
+
+
+def stochastic(high, low, close, k_period=14, d_period=3):
+    """随机指标，等价于 ta.momentum.StochasticOscillator，返回 (%K, %D)"""
+    k = _stochastic_k(close, rolling_min(low, k_period), rolling_max(high, k_period))
+    return k, sma(k, d_period)
+
+
+def kdj(high, low, close, k_period=9, d_period=3):
+    """KDJ，返回 (K, D, J)，J = 3K - 2D"""
+    k, d = stochastic(high, low, close, k_period, d_period)
+    return k, d, 3 * k - 2 * d
+
+
+def true_range(high, low, close):
+    """真实波幅，每列第一根有效K线取最高价-最低价"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_close = np.concatenate((np.full((1,) + close.shape[1:], np.nan), close[:-1]))
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, period=14):
+    """
+    ATR，等价于 ta.volatility.AverageTrueRange（预热期输出0）
+
+    二维输入时上市前的位置为NaN；有效K线不足 period 根的列全部为NaN
+    （与 calculate_atr 在 ta 后端对过短数据返回空结果一致）。
+    """
+    tr = true_range(high, low, close)
+    if tr.ndim == 1 and len(tr) < period:
+        raise ValueError(f"数据长度 {len(tr)} 小于ATR周期 {period}")
+
+    out = np.full(tr.shape, np.nan)
+    decay = (period - 1) / period
+    for start, columns in _column_groups(_first_valid(tr)):
+        if len(tr) - start < period:
+            continue
+        block = tr[start:, columns]
+        result = np.zeros_like(block)
+        seed = block[:period].mean(axis=0)
+        result[period - 1] = seed
+        if len(block) > period:
+            # atr[i] = (atr[i-1]*(period-1) + tr[i]) / period
+            result[period:] = lfilter([1.0 / period], [1.0, -decay], block[period:], axis=0,
+                                      zi=decay * seed[None, ...])[0]
+        out[start:, columns] = result
+    return out
+
+
+def sma_grid(close, periods):
+    """
+    多个周期的SMA，返回 (K线数 × 周期数) 数组，第j列对应 periods[j]
+
+    所有周期共用一次前缀和，每个周期只需一次差分。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    grid = np.full((len(periods), len(close)), np.nan)
+    if len(close) == 0:
+        return grid.T
+
+    reference = close[0]
+    csum = np.concatenate(([0.0], np.cumsum(close - reference)))
+    for j, period in enumerate(periods):
+        if period <= len(close):
+            grid[j, period - 1:] = (csum[period:] - csum[:-period]) / period + reference
+    return grid.T
+
+
+def ema_grid(close, periods):
+    """多个周期的EMA，返回 (K线数 × 周期数) 数组，第j列对应 periods[j]"""
+    close = np.asarray(close, dtype=np.float64)
+    grid = np.empty((len(periods), len(close)))
+    for j, period in enumerate(periods):
+        grid[j] = ema(close, period)
+    return grid.T
+
+
+def rsi_grid(close, periods):
+    """
+    多个周期的RSI，返回 (K线数 × 周期数) 数组，第j列对应 periods[j]
+
+    涨跌幅只计算一次；每个周期的平均涨幅和平均跌幅作为两行在同一次 lfilter 中递推。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    grid = np.full((len(periods), len(close)), np.nan)
+    if len(close) == 0:
+        return grid.T
+
+    diff = np.diff(close, prepend=close[0])
+    moves = np.vstack([np.where(diff > 0, diff, 0.0), np.where(diff < 0, -diff, 0.0)])
+
+    for j, period in enumerate(periods):
+        alpha = 1.0 / period
+        averages = np.empty_like(moves)
+        averages[:, 0] = moves[:, 0]
+        averages[:, 1:] = lfilter([alpha], [1.0, alpha - 1.0], moves[:, 1:], axis=1,
+                                  zi=(1.0 - alpha) * moves[:, :1])[0]
+        avg_gain, avg_loss = averages
+        with np.errstate(divide='ignore', invalid='ignore'):
+            grid[j] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        grid[j, :period - 1] = np.nan
+    return grid.T
+
+
+class SharedIntermediates:
+    """
+    指标共享中间结果
+
+    同一组K线上的多个指标往往依赖相同的中间量：KDJ与随机指标共用滚动最高/最低价，
+    EMA与MACD共用收盘价EMA，SMA与布林带共用滚动均值。这里按 (中间量, 周期)
+    惰性计算并记住结果，各指标方法从中取用，同一中间量只计算一次。
+    方法签名与模块级内核一致（去掉价格数组参数），结果逐位相同。
+    """
+
+    def __init__(self, high, low, close):
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self._memo = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """由OHLCV DataFrame构造"""
+        return cls(df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+
+    def _get(self, key, compute):
+        """读取中间量，首次访问时计算"""
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def ema(self, period):
+        return self._get(('ema', period), lambda: ema(self.close, period))
+
+    def sma(self, period):
+        return self._get(('sma', period), lambda: sma(self.close, period))
+
+    def std(self, period):
+        return self._get(('std', period), lambda: rolling_std(self.close, period, self.sma(period)))
+
+    def highest(self, period):
+        return self._get(('highest', period), lambda: rolling_max(self.high, period))
+
+    def lowest(self, period):
+        return self._get(('lowest', period), lambda: rolling_min(self.low, period))
+
+    def rsi(self, period=14):
+        return self._get(('rsi', period), lambda: rsi(self.close, period))
+
+    def macd(self, fast_period=12, slow_period=26, signal_period=9):
+        line = self.ema(fast_period) - self.ema(slow_period)
+        signal = ema(line, signal_period)
+        return line, signal, line - signal
+
+    def bollinger_bands(self, period=20, std_dev=2):
+        middle, std = self.sma(period), self.std(period)
+        return middle + std_dev * std, middle, middle - std_dev * std
+
+    def stochastic(self, k_period=14, d_period=3):
+        k = self._get(('stoch_k', k_period),
+                      lambda: _stochastic_k(self.close, self.lowest(k_period), self.highest(k_period)))
+        return k, self._get(('stoch_d', k_period, d_period), lambda: sma(k, d_period))
+
+    def kdj(self, k_period=9, d_period=3):
+        k, d = self.stochastic(k_period, d_period)
+        return k, d, 3 * k - 2 * d
+
+    def atr(self, period=14):
+        return self._get(('atr', period), lambda: atr(self.high, self.low, self.close, period))
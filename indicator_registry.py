@@ -0,0 +1,167 @@
+"""
+技术指标注册表
+
+每个指标在这里声明一次：计算方法、输入列、参数键及默认值、输出列、预热K线数，
+以及交易信号规则和只被交易信号使用的参数键。指标计算、回测信号、数据获取和界面都从这里读取，
+不再各自硬编码列名和参数名。
+"""
+
+from resampler import timeframe_to_ms
+
+# 预热K线数 = 第一个有效值之前的K线根数（该区间内指标为NaN，ATR为0）
+#
+# signal 为该指标的交易信号规则（见 signal_rules），按注册表顺序应用、后面的规则覆盖前面的信号：
+#   rule: 'threshold' 指标下穿买入阈值买入、上穿卖出阈值卖出；
+#         'cross' 第一个输入上穿第二个输入买入、下穿卖出（有阈值时还要求第一个输入低于买入阈值/高于卖出阈值）；
+#         'band' 收盘价触及下轨买入、触及上轨卖出
+#   inputs: 规则使用的指标列，可以引用 input_params 中的参数（如 'EMA_{ema_short}'）
+#   thresholds: 阈值参数键及默认值（买入阈值在前）
+INDICATOR_REGISTRY = {
+    'rsi': {
+        'label': 'RSI',
+        'method': 'calculate_rsi',
+        'inputs': ['close'],
+        'params': {'rsi_period': 14},
+        'outputs': ['RSI'],
+        'warmup': lambda p: p['rsi_period'] - 1,
+        'signal_params': ['rsi_oversold', 'rsi_overbought'],
+        'signal': {'rule': 'threshold', 'inputs': ['RSI'],
+                   'thresholds': {'rsi_oversold': 30, 'rsi_overbought': 70}}
+    },
+    'kdj': {
+        'label': 'KDJ',
+        'method': 'calculate_kdj',
+        'inputs': ['high', 'low', 'close'],
+        'params': {'kdj_k_period': 9, 'kdj_d_period': 3, 'kdj_j_period': 3},
+        'outputs': ['K', 'D', 'J'],
+        'warmup': lambda p: p['kdj_k_period'] + p['kdj_d_period'] - 2,
+        'signal_params': ['kdj_buy_threshold', 'kdj_sell_threshold'],
+        'signal': {'rule': 'cross', 'inputs': ['K', 'D'],
+                   'thresholds': {'kdj_buy_threshold': 20, 'kdj_sell_threshold': 80}}
+    },
+    'boll': {
+        'label': '布林带',
+        'method': 'calculate_bollinger_bands',
+        'inputs': ['close'],
+        'params': {'bb_period': 20, 'bb_std': 2},
+        'outputs': ['BB_upper', 'BB_middle', 'BB_lower'],
+        'warmup': lambda p: p['bb_period'] - 1,
+        'signal_params': [],
+        'signal': {'rule': 'band', 'inputs': ['BB_lower', 'BB_upper']}
+    },
+    'ema': {
+        'label': 'EMA',
+        'method': 'calculate_ema',
+        'inputs': ['close'],
+        'params': {'ema_periods': [12, 26]},
+        # 按周期列表中的每个周期各输出一列
+        'series_param': 'ema_periods',
+        'outputs': ['EMA_{period}'],
+        'warmup': lambda p: max(p['ema_periods'], default=1) - 1,
+        'signal_params': ['ema_short', 'ema_long'],
+        # 短期/长期EMA都在 ema_periods 中（两列都已计算）时才生效
+        'signal': {'rule': 'cross', 'inputs': ['EMA_{ema_short}', 'EMA_{ema_long}'],
+                   'input_params': {'ema_short': 12, 'ema_long': 26}}
+    },
+    'sma': {
+        'label': 'SMA',
+        'method': 'calculate_sma',
+        'inputs': ['close'],
+        'params': {'sma_periods': [20, 50]},
+        'series_param': 'sma_periods',
+        'outputs': ['SMA_{period}'],
+        'warmup': lambda p: max(p['sma_periods'], default=1) - 1,
+        'signal_params': []
+    },
+    'macd': {
+        'label': 'MACD',
+        'method': 'calculate_macd',
+        'inputs': ['close'],
+        'params': {'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9},
+        'outputs': ['MACD', 'MACD_signal', 'MACD_histogram'],
+        'warmup': lambda p: max(p['macd_fast'], p['macd_slow']) + p['macd_signal'] - 2,
+        'signal_params': [],
+        'signal': {'rule': 'cross', 'inputs': ['MACD', 'MACD_signal']}
+    },
+    'stoch': {
+        'label': '随机指标',
+        'method': 'calculate_stochastic',
+        'inputs': ['high', 'low', 'close'],
+        'params': {'stoch_k_period': 14, 'stoch_d_period': 3},
+        'outputs': ['Stoch_K', 'Stoch_D'],
+        'warmup': lambda p: p['stoch_k_period'] + p['stoch_d_period'] - 2,
+        'signal_params': []
+    },
+    'atr': {
+        'label': 'ATR',
+        'method': 'calculate_atr',
+        'inputs': ['high', 'low', 'close'],
+        'params': {'atr_period': 14},
+        'outputs': ['ATR'],
+        'warmup': lambda p: p['atr_period'] - 1,
+        'signal_params': []
+    }
+}
+
+# 不属于单个指标、但同样出现在参数字典中的键
+# higher_timeframes: {高周期: 指标参数字典}，见 multi_timeframe
+# htf_filter: 按高周期指标过滤买入信号，见 BacktestEngine.calculate_signals
+EXTRA_PARAMETER_KEYS = ['higher_timeframes', 'htf_filter']
+
+
+def resolve_params(name, indicator_params):
+    """取出指标的参数值，未设置的使用默认值（按注册表中的参数顺序）"""
+    defaults = INDICATOR_REGISTRY[name]['params']
+    return {key: indicator_params.get(key, default) for key, default in defaults.items()}
+
+
+def indicator_outputs(name, indicator_params=None):
+    """指标在给定参数下输出的列名"""
+    spec = INDICATOR_REGISTRY[name]
+    params = resolve_params(name, indicator_params or {})
+    if 'series_param' in spec:
+        return [spec['outputs'][0].format(period=period) for period in params[spec['series_param']]]
+    return list(spec['outputs'])
+
+
+def signal_inputs(name, strategy_params):
+    """指标的信号规则在给定参数下使用的指标列名"""
+    signal = INDICATOR_REGISTRY[name]['signal']
+    values = {key: strategy_params.get(key, default) for key, default in signal.get('input_params', {}).items()}
+    return [column.format(**values) for column in signal['inputs']]
+
+
+def signal_thresholds(name, strategy_params):
+    """指标的信号规则在给定参数下的阈值（按注册表中的顺序，未设置的使用默认值）"""
+    thresholds = INDICATOR_REGISTRY[name]['signal'].get('thresholds', {})
+    return [strategy_params.get(key, default) for key, default in thresholds.items()]
+
+
+def warmup_bars(indicator_params, timeframe=None):
+    """
+    参数字典中启用的所有指标所需的最大预热K线数
+
+    Args:
+        indicator_params: 指标参数字典（与 calculate_all_indicators 相同）
+        timeframe: 基础K线周期；提供时同时计入高周期指标的预热，
+                   折算为基础K线数（另加开头不完整的一根和等待收盘的一根高周期K线）
+    """
+    bars = [INDICATOR_REGISTRY[name]['warmup'](resolve_params(name, indicator_params))
+            for name in INDICATOR_REGISTRY if name in indicator_params]
+
+    if timeframe is not None:
+        base_ms = timeframe_to_ms(timeframe)
+        for higher, params in indicator_params.get('higher_timeframes', {}).items():
+            ratio = -(-timeframe_to_ms(higher) // base_ms)
+            bars.append((warmup_bars(params) + 2) * ratio)
+
+    return max(bars, default=0)
+
+
+def parameter_keys():
+    """所有指标参数键和信号参数键（用于从参数字典中区分出指标开关）"""
+    keys = set(EXTRA_PARAMETER_KEYS)
+    for spec in INDICATOR_REGISTRY.values():
+        keys.update(spec['params'])
+        keys.update(spec['signal_params'])
+    return keys
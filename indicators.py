@@ -1,20 +1,128 @@
+import copy
 import pandas as pd
 import numpy as np
 import ta
 
+import indicator_kernels as kernels
+from config import DEFAULT_CONFIG
+from indicator_cache import dataset_fingerprint
+from indicator_registry import INDICATOR_REGISTRY, indicator_outputs, resolve_params
+from memory_utils import downcast_columns, is_compact
+from multi_timeframe import higher_timeframe_indicators, timeframe_columns
+
+# 可选的指标计算后端：'ta' 为参考实现，'numpy' 为 indicator_kernels 中的纯NumPy内核
+INDICATOR_BACKENDS = ('ta', 'numpy')
+
+
+class TaIntermediates:
+    """
+    ta后端的共享中间结果
+    
+    与 indicator_kernels.SharedIntermediates 的作用相同：KDJ与随机指标周期相同时共用一次
+    StochasticOscillator 计算，MACD的快线/慢线直接取 EMA 指标算过的收盘价EMA
+    （ta.trend.MACD 内部同样用 EMAIndicator 的公式计算，结果逐位相同）。
+    """
+    
+    def __init__(self, df):
+        self.df = df
+        self._memo = {}
+    
+    def _get(self, key, compute):
+        """读取中间量，首次访问时计算"""
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+    
+    def ema(self, period):
+        """收盘价EMA"""
+        return self._get(('ema', period),
+                         lambda: ta.trend.EMAIndicator(self.df['close'], window=period).ema_indicator())
+    
+    def stochastic(self, k_period, d_period):
+        """随机指标 (%K, %D)"""
+        def compute():
+            stoch = ta.momentum.StochasticOscillator(self.df['high'], self.df['low'], self.df['close'],
+                                                     window=k_period, smooth_window=d_period)
+            return stoch.stoch(), stoch.stoch_signal()
+        return self._get(('stochastic', k_period, d_period), compute)
+
+
 class TechnicalIndicators:
     """技术指标计算类"""
     
     @staticmethod
-    def calculate_rsi(df, period=14):
+    def _resolve_backend(backend):
+        """解析后端参数，未指定时使用配置中的 indicator_backend"""
+        if backend is None:
+            backend = DEFAULT_CONFIG.get('indicator_backend', 'numpy')
+        if backend not in INDICATOR_BACKENDS:
+            raise ValueError(f"未知的指标后端: {backend}")
+        return backend
+    
+    @staticmethod
+    def _use_numpy(backend):
+        """是否使用NumPy内核计算"""
+        return TechnicalIndicators._resolve_backend(backend) == 'numpy'
+    
+    @staticmethod
+    def _shared(df, shared):
+        """返回传入的共享中间结果，未传入时为本次计算单独创建"""
+        return shared if shared is not None else kernels.SharedIntermediates.from_frame(df)
+    
+    @staticmethod
+    def _ta_shared(df, shared):
+        """ta后端：返回传入的共享中间结果，未传入时为本次计算单独创建"""
+        return shared if shared is not None else TaIntermediates(df)
+    
+    @staticmethod
+    def _create_shared(df, backend):
+        """为一组指标计算创建对应后端的共享中间结果"""
+        if backend == 'numpy':
+            return kernels.SharedIntermediates.from_frame(df)
+        return TaIntermediates(df)
+    
+    @staticmethod
+    def _cached_columns(cache, fingerprint, columns, params, compute):
+        """
+        从缓存读取一组指标列，任一列未命中时重新计算整组并写回缓存
+        
+        Args:
+            cache: IndicatorCache，为 None 时直接计算
+            fingerprint: 数据指纹
+            columns: 该指标输出的列名列表
+            params: 影响计算结果的参数字典
+            compute: 无参函数，返回 Series（单列）或 DataFrame
+        
+        Returns:
+            {列名: 数组或Series}
+        """
+        if cache is not None:
+            cached = {column: cache.get(fingerprint, column, params) for column in columns}
+            if all(values is not None for values in cached.values()):
+                return cached
+        
+        result = compute()
+        if isinstance(result, pd.Series):
+            result = result.to_frame(columns[0])
+        if cache is not None:
+            for column in result.columns:
+                cache.put(fingerprint, column, params, result[column].to_numpy(dtype=np.float64))
+        return {column: result[column] for column in result.columns}
+    
+    @staticmethod
+    def calculate_rsi(df, period=14, backend=None, shared=None):
         """
         计算RSI指标
         
         Args:
             df: 包含OHLCV数据的DataFrame
             period: RSI周期，默认14
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
+            if TechnicalIndicators._use_numpy(backend):
+                return pd.Series(TechnicalIndicators._shared(df, shared).rsi(period), index=df.index)
             rsi = ta.momentum.RSIIndicator(df['close'], window=period)
             return rsi.rsi()
         except Exception as e:
@@ -22,7 +130,7 @@ class TechnicalIndicators:
             return pd.Series(index=df.index)
     
     @staticmethod
-    def calculate_kdj(df, k_period=9, d_period=3, j_period=3):
+    def calculate_kdj(df, k_period=9, d_period=3, j_period=3, backend=None, shared=None):
         """
         计算KDJ指标
         
@@ -31,19 +139,16 @@ class TechnicalIndicators:
             k_period: K值周期，默认9
             d_period: D值周期，默认3
             j_period: J值周期，默认3
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
-            # 使用ta库的StochasticOscillator计算K和D值
-            stoch = ta.momentum.StochasticOscillator(
-                df['high'], 
-                df['low'], 
-                df['close'],
-                window=k_period, 
-                smooth_window=d_period
-            )
+            if TechnicalIndicators._use_numpy(backend):
+                k, d, j = TechnicalIndicators._shared(df, shared).kdj(k_period, d_period)
+                return pd.DataFrame({'K': k, 'D': d, 'J': j}, index=df.index)
             
-            k = stoch.stoch()
-            d = stoch.stoch_signal()
+            # 使用ta库的StochasticOscillator计算K和D值（与相同周期的随机指标共用）
+            k, d = TechnicalIndicators._ta_shared(df, shared).stochastic(k_period, d_period)
             
             # 计算J值: J = 3*K - 2*D
             j = 3 * k - 2 * d
@@ -58,7 +163,7 @@ class TechnicalIndicators:
             return pd.DataFrame(index=df.index)
     
     @staticmethod
-    def calculate_bollinger_bands(df, period=20, std_dev=2):
+    def calculate_bollinger_bands(df, period=20, std_dev=2, backend=None, shared=None):
         """
         计算布林带指标
         
@@ -66,8 +171,14 @@ class TechnicalIndicators:
             df: 包含OHLCV数据的DataFrame
             period: 移动平均周期，默认20
             std_dev: 标准差倍数，默认2
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
+            if TechnicalIndicators._use_numpy(backend):
+                upper, middle, lower = TechnicalIndicators._shared(df, shared).bollinger_bands(period, std_dev)
+                return pd.DataFrame({'BB_upper': upper, 'BB_middle': middle, 'BB_lower': lower},
+                                    index=df.index)
             bb = ta.volatility.BollingerBands(df['close'], window=period, window_dev=std_dev)
             return pd.DataFrame({
                 'BB_upper': bb.bollinger_hband(),
@@ -79,31 +190,38 @@ class TechnicalIndicators:
             return pd.DataFrame(index=df.index)
     
     @staticmethod
-    def calculate_ema(df, period=12):
+    def calculate_ema(df, period=12, backend=None, shared=None):
         """
         计算指数移动平均线
         
         Args:
             df: 包含OHLCV数据的DataFrame
             period: EMA周期，默认12
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
-            ema = ta.trend.EMAIndicator(df['close'], window=period)
-            return ema.ema_indicator()
+            if TechnicalIndicators._use_numpy(backend):
+                return pd.Series(TechnicalIndicators._shared(df, shared).ema(period), index=df.index)
+            return TechnicalIndicators._ta_shared(df, shared).ema(period)
         except Exception as e:
             print(f"计算EMA失败: {e}")
             return pd.Series(index=df.index)
     
     @staticmethod
-    def calculate_sma(df, period=20):
+    def calculate_sma(df, period=20, backend=None, shared=None):
         """
         计算简单移动平均线
         
         Args:
             df: 包含OHLCV数据的DataFrame
             period: SMA周期，默认20
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
+            if TechnicalIndicators._use_numpy(backend):
+                return pd.Series(TechnicalIndicators._shared(df, shared).sma(period), index=df.index)
             sma = ta.trend.SMAIndicator(df['close'], window=period)
             return sma.sma_indicator()
         except Exception as e:
@@ -111,7 +229,7 @@ class TechnicalIndicators:
             return pd.Series(index=df.index)
     
     @staticmethod
-    def calculate_macd(df, fast_period=12, slow_period=26, signal_period=9):
+    def calculate_macd(df, fast_period=12, slow_period=26, signal_period=9, backend=None, shared=None):
         """
         计算MACD指标
         
@@ -120,21 +238,30 @@ class TechnicalIndicators:
             fast_period: 快线周期，默认12
             slow_period: 慢线周期，默认26
             signal_period: 信号线周期，默认9
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
-            macd = ta.trend.MACD(df['close'], window_fast=fast_period, 
-                               window_slow=slow_period, window_sign=signal_period)
+            if TechnicalIndicators._use_numpy(backend):
+                line, signal, histogram = TechnicalIndicators._shared(df, shared).macd(
+                    fast_period, slow_period, signal_period)
+                return pd.DataFrame({'MACD': line, 'MACD_signal': signal, 'MACD_histogram': histogram},
+                                    index=df.index)
+            # 与 ta.trend.MACD 相同：快慢EMA之差为MACD线，其EMA为信号线（快慢EMA与EMA指标共用）
+            ta_shared = TechnicalIndicators._ta_shared(df, shared)
+            macd = ta_shared.ema(fast_period) - ta_shared.ema(slow_period)
+            signal = ta.trend.EMAIndicator(macd, window=signal_period).ema_indicator()
             return pd.DataFrame({
-                'MACD': macd.macd(),
-                'MACD_signal': macd.macd_signal(),
-                'MACD_histogram': macd.macd_diff()
+                'MACD': macd,
+                'MACD_signal': signal,
+                'MACD_histogram': macd - signal
             })
         except Exception as e:
             print(f"计算MACD失败: {e}")
             return pd.DataFrame(index=df.index)
     
     @staticmethod
-    def calculate_stochastic(df, k_period=14, d_period=3):
+    def calculate_stochastic(df, k_period=14, d_period=3, backend=None, shared=None):
         """
         计算随机指标
         
@@ -142,28 +269,36 @@ class TechnicalIndicators:
             df: 包含OHLCV数据的DataFrame
             k_period: %K周期，默认14
             d_period: %D周期，默认3
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
-            stoch = ta.momentum.StochasticOscillator(df['high'], df['low'], df['close'],
-                                                   window=k_period, smooth_window=d_period)
+            if TechnicalIndicators._use_numpy(backend):
+                k, d = TechnicalIndicators._shared(df, shared).stochastic(k_period, d_period)
+                return pd.DataFrame({'Stoch_K': k, 'Stoch_D': d}, index=df.index)
+            k, d = TechnicalIndicators._ta_shared(df, shared).stochastic(k_period, d_period)
             return pd.DataFrame({
-                'Stoch_K': stoch.stoch(),
-                'Stoch_D': stoch.stoch_signal()
+                'Stoch_K': k,
+                'Stoch_D': d
             })
         except Exception as e:
             print(f"计算随机指标失败: {e}")
             return pd.DataFrame(index=df.index)
     
     @staticmethod
-    def calculate_atr(df, period=14):
+    def calculate_atr(df, period=14, backend=None, shared=None):
         """
         计算平均真实波幅
         
         Args:
             df: 包含OHLCV数据的DataFrame
             period: ATR周期，默认14
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            shared: 共享中间结果（numpy后端为SharedIntermediates，ta后端为TaIntermediates），默认单独计算
         """
         try:
+            if TechnicalIndicators._use_numpy(backend):
+                return pd.Series(TechnicalIndicators._shared(df, shared).atr(period), index=df.index)
             atr = ta.volatility.AverageTrueRange(df['high'], df['low'], df['close'], window=period)
             return atr.average_true_range()
         except Exception as e:
@@ -171,69 +306,254 @@ class TechnicalIndicators:
             return pd.Series(index=df.index)
     
     @staticmethod
-    def calculate_all_indicators(df, indicator_params=None):
+    def calculate_rsi_grid(df, periods):
+        """
+        一次计算多个周期的RSI（用于参数优化）
+        
+        Args:
+            df: 包含OHLCV数据的DataFrame
+            periods: RSI周期列表
+        
+        Returns:
+            (K线数 × 周期数) 的float64数组，第j列为 periods[j] 的RSI，与 calculate_rsi 结果一致
+        """
+        try:
+            return kernels.rsi_grid(df['close'].to_numpy(), periods)
+        except Exception as e:
+            print(f"批量计算RSI失败: {e}")
+            return np.full((len(df), len(periods)), np.nan)
+    
+    @staticmethod
+    def calculate_ema_grid(df, periods):
+        """
+        一次计算多个周期的EMA（用于参数优化）
+        
+        Args:
+            df: 包含OHLCV数据的DataFrame
+            periods: EMA周期列表
+        
+        Returns:
+            (K线数 × 周期数) 的float64数组，第j列为 periods[j] 的EMA
+        """
+        try:
+            return kernels.ema_grid(df['close'].to_numpy(), periods)
+        except Exception as e:
+            print(f"批量计算EMA失败: {e}")
+            return np.full((len(df), len(periods)), np.nan)
+    
+    @staticmethod
+    def calculate_sma_grid(df, periods):
+        """
+        一次计算多个周期的SMA（用于参数优化）
+        
+        Args:
+            df: 包含OHLCV数据的DataFrame
+            periods: SMA周期列表
+        
+        Returns:
+            (K线数 × 周期数) 的float64数组，第j列为 periods[j] 的SMA
+        """
+        try:
+            return kernels.sma_grid(df['close'].to_numpy(), periods)
+        except Exception as e:
+            print(f"批量计算SMA失败: {e}")
+            return np.full((len(df), len(periods)), np.nan)
+    
+    @staticmethod
+    def _indicator_jobs(df, indicator_params, backend, shared=None):
+        """
+        根据参数字典生成指标计算任务（指标、参数键与输出列见 indicator_registry）
+        
+        Returns:
+            [(输出列名列表, 影响结果的参数字典, 无参计算函数)]，顺序即结果中的列顺序
+        """
+        jobs = []
+        for name, spec in INDICATOR_REGISTRY.items():
+            if name not in indicator_params:
+                continue
+            params = resolve_params(name, indicator_params)
+            method = getattr(TechnicalIndicators, spec['method'])
+            
+            if 'series_param' in spec:
+                # EMA/SMA：周期列表中的每个周期单独成列
+                for period, column in zip(params[spec['series_param']], indicator_outputs(name, params)):
+                    jobs.append(([column], {'period': period, 'backend': backend},
+                                 lambda method=method, period=period: method(df, period, backend, shared)))
+            else:
+                args = list(params.values())
+                jobs.append((indicator_outputs(name, params), dict(params, backend=backend),
+                             lambda method=method, args=args: method(df, *args, backend, shared)))
+        
+        # 高周期指标：{'4h': {'rsi': True, 'rsi_period': 14}} 生成 'RSI_4h' 等列
+        for timeframe, params in indicator_params.get('higher_timeframes', {}).items():
+            jobs.append((timeframe_columns(timeframe, params),
+                         {'timeframe': timeframe, 'params': repr(sorted(params.items())), 'backend': backend},
+                         lambda timeframe=timeframe, params=params:
+                             higher_timeframe_indicators(df, timeframe, params, backend)))
+        
+        return jobs
+    
+    @staticmethod
+    def calculate_all_indicators(df, indicator_params=None, compact=None, backend=None, cache=None,
+                                 lazy=False):
         """
         计算所有技术指标
         
         Args:
             df: 包含OHLCV数据的DataFrame
             indicator_params: 指标参数字典
+            compact: 是否将指标列降为float32，默认在输入为紧凑表示时开启
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            cache: IndicatorCache，传入时按列复用已计算过的指标（只有参数变化的指标会重新计算）
+            lazy: 为True时返回 LazyIndicatorFrame，指标列在首次读取时才计算
+        
+        各指标共用一份共享中间结果：numpy后端为 SharedIntermediates，滚动最高/最低价、收盘价EMA、
+        滚动均值等中间量在KDJ与随机指标、EMA与MACD、SMA与布林带之间只计算一次；
+        ta后端为 TaIntermediates，相同周期的KDJ与随机指标、EMA与MACD的快慢线只计算一次。
         """
         if indicator_params is None:
             indicator_params = {}
+        if lazy:
+            return LazyIndicatorFrame(df, indicator_params, compact, backend, cache)
+        if compact is None:
+            compact = is_compact(df)
+        backend = TechnicalIndicators._resolve_backend(backend)
+        fingerprint = dataset_fingerprint(df) if cache is not None else None
+        shared = TechnicalIndicators._create_shared(df, backend)
+        
+        columns = {}
+        for names, params, compute in TechnicalIndicators._indicator_jobs(df, indicator_params, backend, shared):
+            columns.update(TechnicalIndicators._cached_columns(cache, fingerprint, names, params, compute))
+        if not columns:
+            return df.copy()
         
-        result_df = df.copy()
-        
-        # RSI
-        if 'rsi' in indicator_params:
-            rsi_period = indicator_params.get('rsi_period', 14)
-            result_df['RSI'] = TechnicalIndicators.calculate_rsi(df, rsi_period)
-        
-        # KDJ
-        if 'kdj' in indicator_params:
-            k_period = indicator_params.get('kdj_k_period', 9)
-            d_period = indicator_params.get('kdj_d_period', 3)
-            j_period = indicator_params.get('kdj_j_period', 3)
-            kdj_df = TechnicalIndicators.calculate_kdj(df, k_period, d_period, j_period)
-            result_df = pd.concat([result_df, kdj_df], axis=1)
-        
-        # 布林带
-        if 'boll' in indicator_params:
-            bb_period = indicator_params.get('bb_period', 20)
-            bb_std = indicator_params.get('bb_std', 2)
-            bb_df = TechnicalIndicators.calculate_bollinger_bands(df, bb_period, bb_std)
-            result_df = pd.concat([result_df, bb_df], axis=1)
-        
-        # EMA
-        if 'ema' in indicator_params:
-            ema_periods = indicator_params.get('ema_periods', [12, 26])
-            for period in ema_periods:
-                result_df[f'EMA_{period}'] = TechnicalIndicators.calculate_ema(df, period)
-        
-        # SMA
-        if 'sma' in indicator_params:
-            sma_periods = indicator_params.get('sma_periods', [20, 50])
-            for period in sma_periods:
-                result_df[f'SMA_{period}'] = TechnicalIndicators.calculate_sma(df, period)
-        
-        # MACD
-        if 'macd' in indicator_params:
-            fast_period = indicator_params.get('macd_fast', 12)
-            slow_period = indicator_params.get('macd_slow', 26)
-            signal_period = indicator_params.get('macd_signal', 9)
-            macd_df = TechnicalIndicators.calculate_macd(df, fast_period, slow_period, signal_period)
-            result_df = pd.concat([result_df, macd_df], axis=1)
-        
-        # 随机指标
-        if 'stoch' in indicator_params:
-            k_period = indicator_params.get('stoch_k_period', 14)
-            d_period = indicator_params.get('stoch_d_period', 3)
-            stoch_df = TechnicalIndicators.calculate_stochastic(df, k_period, d_period)
-            result_df = pd.concat([result_df, stoch_df], axis=1)
-        
-        # ATR
-        if 'atr' in indicator_params:
-            atr_period = indicator_params.get('atr_period', 14)
-            result_df['ATR'] = TechnicalIndicators.calculate_atr(df, atr_period)
-        
-        return result_df
+        # 所有指标列一次拼接，不逐列扩展整张表
+        indicator_df = pd.DataFrame(columns, index=df.index)
+        if compact:
+            downcast_columns(indicator_df, indicator_df.columns)
+        base = df.drop(columns=[col for col in indicator_df.columns if col in df.columns])
+        return pd.concat([base, indicator_df], axis=1)
+
+
+class LazyIndicatorFrame:
+    """
+    惰性指标表
+    
+    持有原始K线DataFrame的引用（不复制），声明与 calculate_all_indicators 相同的列，
+    但每个指标只在第一次被读取时计算并保留结果；从未被策略或图表读取的指标
+    （如当前信号规则不使用的ATR）不会计算。
+    支持回测与图表用到的 DataFrame 接口：columns、index、[]、in、len、iterrows。
+    rows 返回只包含部分K线的视图（如去掉预热K线后用于显示），指标仍在完整数据上计算。
+    """
+    
+    def __init__(self, df, indicator_params=None, compact=None, backend=None, cache=None):
+        """
+        初始化惰性指标表
+        
+        Args:
+            df: 包含OHLCV数据的DataFrame
+            indicator_params: 指标参数字典
+            compact: 是否将指标列降为float32，默认在输入为紧凑表示时开启
+            backend: 计算后端 'ta' 或 'numpy'，默认取配置 indicator_backend
+            cache: IndicatorCache，可选
+        """
+        self._base = df
+        self.compact = is_compact(df) if compact is None else compact
+        self._cache = cache
+        self._fingerprint = None
+        self._values = {}
+        self._rows = slice(None)
+        
+        backend = TechnicalIndicators._resolve_backend(backend)
+        shared = TechnicalIndicators._create_shared(df, backend)
+        self._jobs = {}
+        for job in TechnicalIndicators._indicator_jobs(df, indicator_params or {}, backend, shared):
+            for column in job[0]:
+                self._jobs[column] = job
+        
+        base_columns = [col for col in df.columns if col not in self._jobs]
+        self.columns = pd.Index(base_columns + list(self._jobs))
+    
+    @property
+    def index(self):
+        return self._base.index[self._rows]
+    
+    @property
+    def empty(self):
+        return len(self) == 0
+    
+    @property
+    def shape(self):
+        return len(self), len(self.columns)
+    
+    @property
+    def materialized_columns(self):
+        """已经计算过的指标列"""
+        return list(self._values)
+    
+    def __len__(self):
+        return len(self.index)
+    
+    def __contains__(self, column):
+        return column in self.columns
+    
+    def _materialize(self, column):
+        """计算指标列所在的整组指标（如MACD的三列）并保存"""
+        names, params, compute = self._jobs[column]
+        if self._cache is not None and self._fingerprint is None:
+            self._fingerprint = dataset_fingerprint(self._base)
+        
+        result = TechnicalIndicators._cached_columns(self._cache, self._fingerprint, names, params, compute)
+        dtype = np.float32 if self.compact else np.float64
+        for name in names:
+            if name in result:
+                self._values[name] = np.asarray(result[name], dtype=dtype)
+            else:
+                # 计算失败的列以NaN填充，与单项计算失败时返回空序列一致
+                self._values[name] = np.full(len(self._base), np.nan, dtype=dtype)
+    
+    def __getitem__(self, key):
+        if isinstance(key, list):
+            return self.to_frame(key)
+        if key in self._jobs:
+            if key not in self._values:
+                self._materialize(key)
+            return pd.Series(self._values[key][self._rows], index=self.index, name=key)
+        return self._base[key].iloc[self._rows]
+    
+    def rows(self, start=None, stop=None):
+        """
+        按位置截取K线的视图
+        
+        视图与本表共用已计算的指标（在完整数据上计算后再截取），在视图上读取的指标同样会保留到本表。
+        
+        Args:
+            start: 起始位置（含）
+            stop: 结束位置（不含）
+        """
+        view = copy.copy(self)
+        view._rows = slice(start, stop)
+        return view
+    
+    def to_frame(self, columns=None):
+        """
+        物化为普通DataFrame
+        
+        Args:
+            columns: 需要的列，默认全部（会计算所有尚未计算的指标）
+        """
+        if columns is None:
+            columns = list(self.columns)
+        data = {column: self[column] for column in columns}
+        return pd.DataFrame(data, index=self.index, columns=columns)
+    
+    def iterrows(self):
+        """逐行遍历（需要全部列，会计算所有指标）"""
+        return self.to_frame().iterrows()
+    
+    def memory_usage(self, index=True, deep=False):
+        """原始数据与已计算指标列的内存占用（字节）"""
+        usage = self._base.memory_usage(index=index, deep=deep)
+        usage = usage.drop([col for col in usage.index if col in self._jobs])
+        extra = pd.Series({column: values.nbytes for column, values in self._values.items()}, dtype=np.int64)
+        return pd.concat([usage, extra])
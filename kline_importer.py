@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+币安公开K线归档导入工具
+
+将 data.binance.vision 发布的月度/日度K线压缩包（如 BTCUSDT-1m-2024-01.zip）
+直接导入 BinanceDataFetcher 使用的本地存储，无需通过交易所接口逐页下载。
+CSV在压缩包内按块流式读取，不会把整个文件载入内存。
+
+用法:
+    python kline_importer.py downloads/ --quote USDT
+    python kline_importer.py BTCUSDT-1m-2024-01.zip BTCUSDT-1m-2024-02.zip
+"""
+
+import argparse
+import os
+import re
+import zipfile
+import numpy as np
+import pandas as pd
+
+from config import DEFAULT_CONFIG
+from data_fetcher import BinanceDataFetcher
+
+# 文件名格式: BTCUSDT-1m-2024-01.zip / BTCUSDT-1m-2024-01-15.zip
+ARCHIVE_NAME_PATTERN = re.compile(r'^([A-Z0-9]+)-(\d+[smhdwM])-(\d{4}-\d{2}(?:-\d{2})?)\.zip$')
+
+# 拆分交易对时依次尝试的计价币种
+QUOTE_ASSETS = ['USDT', 'FDUSD', 'USDC', 'BUSD', 'TUSD', 'BTC', 'ETH', 'BNB']
+
+# 2025年起现货归档的时间戳为微秒，超过该值即按微秒处理
+MICROSECOND_THRESHOLD = 10 ** 14
+
+
+def parse_archive_name(path, quote=None):
+    """
+    从归档文件名解析交易对和时间周期
+
+    Args:
+        path: 归档文件路径
+        quote: 计价币种，默认按 QUOTE_ASSETS 依次匹配
+
+    Returns:
+        (交易对, 时间周期)，如 ('BTC/USDT', '1m')；无法解析时返回 (None, None)
+    """
+    match = ARCHIVE_NAME_PATTERN.match(os.path.basename(path))
+    if not match:
+        return None, None
+
+    pair, timeframe = match.group(1), match.group(2)
+    for quote_asset in ([quote] if quote else QUOTE_ASSETS):
+        if pair.endswith(quote_asset) and len(pair) > len(quote_asset):
+            return f"{pair[:-len(quote_asset)]}/{quote_asset}", timeframe
+
+    return None, None
+
+
+class KlineArchiveImporter:
+    """
+    币安公开K线归档导入器
+
+    本地存储只按首尾时间戳判断缺口，导入的归档应在时间上连续
+    （例如按月连续的一批压缩包），否则中间缺失的月份不会被自动补齐。
+
+    按时间顺序导入时每块数据都晚于已存储的最后一根K线，存储只追加这一块、不重写已有数据；
+    与已有数据重叠的块先收集起来，每个文件结束时合并写入一次。
+    """
+
+    def __init__(self, store=None, chunk_size=None):
+        """
+        初始化导入器
+
+        Args:
+            store: 目标存储，默认按配置 data.cache_backend 创建
+            chunk_size: 每次从CSV读取并写入的行数，默认读取配置 data.import_chunk_size
+        """
+        self.store = store if store is not None else BinanceDataFetcher._create_store()
+        self.chunk_size = chunk_size or DEFAULT_CONFIG['data']['import_chunk_size']
+
+    def import_file(self, path, symbol=None, timeframe=None):
+        """
+        导入单个归档压缩包
+
+        Args:
+            path: 归档文件路径
+            symbol: 交易对，默认从文件名解析
+            timeframe: 时间周期，默认从文件名解析
+
+        Returns:
+            导入的K线数量
+        """
+        if symbol is None or timeframe is None:
+            parsed_symbol, parsed_timeframe = parse_archive_name(path)
+            symbol = symbol or parsed_symbol
+            timeframe = timeframe or parsed_timeframe
+        if symbol is None or timeframe is None:
+            raise ValueError(f"无法从文件名解析交易对/时间周期: {path}")
+
+        coverage = self.store.coverage(symbol, timeframe)
+        last_ts = coverage[1] if coverage is not None else None
+        overlapping = []
+
+        rows = 0
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if not member.endswith('.csv'):
+                    continue
+
+                # 部分归档首行为表头
+                with archive.open(member) as f:
+                    first_line = f.readline().decode('utf-8', errors='ignore')
+                skiprows = 0 if first_line[:1].isdigit() else 1
+
+                with archive.open(member) as f:
+                    reader = pd.read_csv(f, header=None, usecols=range(6), skiprows=skiprows,
+                                         names=['timestamp', 'open', 'high', 'low', 'close', 'volume'],
+                                         dtype={'timestamp': np.int64}, chunksize=self.chunk_size)
+                    for chunk in reader:
+                        timestamps = chunk['timestamp'].to_numpy()
+                        chunk['timestamp'] = np.where(timestamps >= MICROSECOND_THRESHOLD,
+                                                      timestamps // 1000, timestamps)
+                        rows += len(chunk)
+
+                        if last_ts is None or chunk['timestamp'].min() > last_ts:
+                            self.store.save(symbol, timeframe, chunk)  # 走存储的尾部追加路径
+                            last_ts = max(int(chunk['timestamp'].max()), last_ts or 0)
+                        else:
+                            overlapping.append(chunk)
+
+        if overlapping:
+            self.store.save(symbol, timeframe, pd.concat(overlapping, ignore_index=True))
+
+        return rows
+
+    def import_files(self, paths, quote=None):
+        """
+        批量导入归档，目录会递归查找其中的 .zip 文件
+
+        Args:
+            paths: 文件或目录路径列表
+            quote: 计价币种过滤，如 'USDT' 只导入USDT交易对
+
+        Returns:
+            {(交易对, 时间周期): 导入的K线数量}
+        """
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, name) for name in names if name.endswith('.zip'))
+            else:
+                files.append(path)
+
+        summary = {}
+        # 按文件名排序，同一交易对按时间先后写入
+        for file_path in sorted(files, key=os.path.basename):
+            symbol, timeframe = parse_archive_name(file_path, quote)
+            if symbol is None:
+                print(f"跳过无法识别的文件: {file_path}")
+                continue
+
+            try:
+                rows = self.import_file(file_path, symbol, timeframe)
+            except Exception as e:
+                print(f"导入失败 {file_path}: {e}")
+                continue
+
+            summary[(symbol, timeframe)] = summary.get((symbol, timeframe), 0) + rows
+            print(f"✅ {os.path.basename(file_path)}: {rows} 条")
+
+        return summary
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='导入币安公开K线归档')
+    parser.add_argument('paths', nargs='+', help='归档文件或目录')
+    parser.add_argument('--quote', default=None, help='只导入指定计价币种的交易对，如 USDT')
+    parser.add_argument('--backend', choices=['parquet', 'mmap'], default=None,
+                        help='目标存储后端，默认读取配置 data.cache_backend')
+    args = parser.parse_args()
+
+    if args.backend:
+        DEFAULT_CONFIG['data']['cache_backend'] = args.backend
+
+    summary = KlineArchiveImporter().import_files(args.paths, args.quote)
+
+    print("=" * 50)
+    for (symbol, timeframe), rows in sorted(summary.items()):
+        print(f"{symbol} {timeframe}: {rows} 条")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# 紧凑模式下价格/成交量/指标列的数据类型
+COMPACT_FLOAT_DTYPE = np.float32
+
+# 紧凑模式的精度容差
+# float32 有24位有效尾数，单个数值的存储误差不超过 2**-24 ≈ 6e-8；
+# 指标在此基础上经过滚动/递推计算，与float64结果的误差不超过
+# COMPACT_RTOL × 该指标序列的最大绝对值。对0~100的指标（RSI、KDJ等）即小于0.001个点；
+# MACD这类在0附近波动的指标，逐点相对误差会在接近0时变大，应按序列量级比较。
+# 回测中的资金计算始终使用双精度，价格误差只会影响恰好落在阈值上的信号。
+COMPACT_RTOL = 1e-5
+
+
+def is_compact(df):
+    """判断DataFrame是否为紧凑表示（整数毫秒时间索引）"""
+    return pd.api.types.is_integer_dtype(df.index.dtype)
+
+
+def to_compact(df):
+    """
+    转换为紧凑表示
+
+    浮点列降为float32，时间索引转换为int64毫秒时间戳，
+    内存占用约为原来的一半。
+
+    Args:
+        df: 以时间为索引的OHLCV（或含指标）DataFrame
+    """
+    if df.empty:
+        return df
+
+    float_columns = df.select_dtypes(include=[np.floating]).columns
+    compact = df.astype({column: COMPACT_FLOAT_DTYPE for column in float_columns})
+
+    if isinstance(compact.index, pd.DatetimeIndex):
+        epoch_ms = compact.index.values.astype('datetime64[ms]').astype(np.int64)
+        compact.index = pd.Index(epoch_ms, name=compact.index.name)
+
+    return compact
+
+
+def from_compact(df):
+    """
+    恢复为常规表示（datetime索引、float64列），用于图表展示等场景
+
+    Args:
+        df: 紧凑表示的DataFrame
+    """
+    if df.empty:
+        return df
+
+    float_columns = df.select_dtypes(include=[np.floating]).columns
+    restored = df.astype({column: np.float64 for column in float_columns})
+
+    if is_compact(restored):
+        restored.index = pd.to_datetime(restored.index, unit='ms').rename(df.index.name)
+
+    return restored
+
+
+def downcast_columns(df, columns):
+    """将指定列原地降为float32"""
+    for column in columns:
+        if column in df.columns and df[column].dtype != COMPACT_FLOAT_DTYPE:
+            df[column] = df[column].astype(COMPACT_FLOAT_DTYPE)
+    return df
+
+
+def memory_report(df):
+    """
+    统计DataFrame（或 LazyIndicatorFrame，只计已计算的列）的内存占用
+
+    Returns:
+        {'rows': 行数, 'index_bytes': 索引字节数, 'column_bytes': {列名: 字节数},
+         'total_bytes': 总字节数, 'total_mb': 总MB}
+    """
+    usage = df.memory_usage(index=True, deep=True)
+    index_bytes = int(usage.get('Index', 0))
+    column_bytes = {column: int(usage[column]) for column in usage.index if column != 'Index'}
+    total_bytes = index_bytes + sum(column_bytes.values())
+
+    return {
+        'rows': len(df),
+        'index_bytes': index_bytes,
+        'column_bytes': column_bytes,
+        'total_bytes': total_bytes,
+        'total_mb': total_bytes / 1024 / 1024
+    }
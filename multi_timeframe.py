@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from indicator_registry import INDICATOR_REGISTRY, indicator_outputs
+from resampler import bucket_start, completed_bar_index, resample_ohlcv
+
+
+def base_interval_ms(timestamps):
+    """由相邻K线的最小间隔推断基础周期长度（毫秒），不足两根K线时返回 None"""
+    if len(timestamps) < 2:
+        return None
+    return int(np.diff(timestamps).min())
+
+
+def timeframe_columns(timeframe, indicator_params):
+    """高周期指标对齐到基础K线后的列名，如 'RSI_4h'"""
+    return [f"{column}_{timeframe}"
+            for name in INDICATOR_REGISTRY if name in indicator_params
+            for column in indicator_outputs(name, indicator_params)]
+
+
+def higher_timeframe_indicators(df, timeframe, indicator_params, backend=None):
+    """
+    计算高周期指标并对齐到基础K线
+
+    先在本地把基础K线合成为高周期K线（开头不完整的一根丢弃），在高周期上计算一次指标，
+    再按已完成的高周期K线二分定位对齐：每根基础K线只看到收盘时间不晚于自身收盘时间的
+    高周期K线，结果列名带周期后缀（如 'RSI_4h'）。
+
+    Args:
+        df: 以时间为索引的基础周期OHLCV DataFrame（支持紧凑表示）
+        timeframe: 高周期，如 '4h', '1d'
+        indicator_params: 高周期上使用的指标参数字典（格式与 calculate_all_indicators 相同）
+        backend: 计算后端 'ta' 或 'numpy'
+
+    Returns:
+        与 df 同索引的DataFrame，尚无已完成高周期K线的位置为NaN
+    """
+    # indicators 在生成计算任务时引用本模块，这里延迟导入避免循环引用
+    from indicators import TechnicalIndicators
+
+    columns = timeframe_columns(timeframe, indicator_params)
+    if df.empty or not columns:
+        return pd.DataFrame(np.nan, index=df.index, columns=columns)
+
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    base_ms = base_interval_ms(timestamps)
+    if base_ms is None:
+        return pd.DataFrame(np.nan, index=df.index, columns=columns)
+
+    bars = resample_ohlcv(df, timeframe)
+    # 数据从高周期K线中途开始时，第一根高周期K线不完整
+    if bucket_start(timestamps[:1], timeframe)[0] != timestamps[0]:
+        bars = bars.iloc[1:]
+
+    params = {key: value for key, value in indicator_params.items() if key != 'higher_timeframes'}
+    indicators = TechnicalIndicators.calculate_all_indicators(bars, params, compact=False, backend=backend)
+
+    bar_timestamps = bars.index.values.astype('datetime64[ms]').astype(np.int64)
+    position = completed_bar_index(timestamps, base_ms, bar_timestamps, timeframe)
+    available = position >= 0
+
+    result = {}
+    for column in columns:
+        aligned = np.full(len(df), np.nan)
+        source = column[:-len(timeframe) - 1]
+        if source in indicators.columns:
+            values = indicators[source].to_numpy(dtype=np.float64)
+            aligned[available] = values[position[available]]
+        result[column] = aligned
+    return pd.DataFrame(result, index=df.index)
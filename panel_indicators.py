@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+import indicator_kernels as kernels
+from indicator_registry import INDICATOR_REGISTRY, indicator_outputs, resolve_params
+
+
+class PanelIndicators:
+    """
+    多交易对面板指标计算
+
+    输入为 (时间 × 交易对) 的最高价/最低价/收盘价矩阵，每个指标对所有交易对
+    一次性向量化计算，返回同样形状的矩阵，逐列结果与 TechnicalIndicators
+    的numpy后端对单个交易对的计算一致。上市较晚的交易对在上市前为NaN，
+    指标从其第一根有效K线起算。共享中间量（EMA、滚动均值、滚动最高/最低价）
+    在同一个面板的各指标间只计算一次。
+    """
+
+    def __init__(self, high, low, close, observed=None):
+        """
+        初始化面板
+
+        Args:
+            high: 最高价矩阵，DataFrame（索引为时间、列为交易对）或二维数组
+            low: 最低价矩阵
+            close: 收盘价矩阵
+            observed: 同形状的布尔矩阵，True 为交易所实际存在的K线（False 为补齐的K线），
+                      默认为收盘价非NaN的位置
+        """
+        self.index = close.index if isinstance(close, pd.DataFrame) else None
+        self.columns = close.columns if isinstance(close, pd.DataFrame) else None
+        self._shared = kernels.SharedIntermediates(
+            np.asarray(high, dtype=np.float64),
+            np.asarray(low, dtype=np.float64),
+            np.asarray(close, dtype=np.float64)
+        )
+        if self._shared.close.ndim != 2:
+            raise ValueError("面板数据必须是 (时间 × 交易对) 的二维矩阵")
+        self.observed = (np.isfinite(self._shared.close) if observed is None
+                         else np.asarray(observed, dtype=bool))
+
+    @classmethod
+    def from_frames(cls, frames):
+        """
+        由多个交易对的OHLCV DataFrame构造面板
+
+        各交易对按时间索引取并集对齐；上市后个别交易对缺失的K线（包括最后一根K线之后）
+        用前一根收盘价补齐（视为无成交的K线），避免递推类指标从缺口处起全部变为NaN。
+        补齐的K线在 observed 中为False，不能按其价格交易。
+
+        Args:
+            frames: {交易对: OHLCV DataFrame}，如 fetch_many_historical 的返回值
+        """
+        close = pd.DataFrame({symbol: df['close'] for symbol, df in frames.items()}).sort_index()
+        high = pd.DataFrame({symbol: df['high'] for symbol, df in frames.items()}).reindex(close.index)
+        low = pd.DataFrame({symbol: df['low'] for symbol, df in frames.items()}).reindex(close.index)
+
+        observed = close.notna().to_numpy()
+        close = close.ffill()
+        return cls(high.fillna(close), low.fillna(close), close, observed)
+
+    @property
+    def shape(self):
+        """(时间数, 交易对数)"""
+        return self._shared.close.shape
+
+    @property
+    def close(self):
+        """收盘价矩阵（float64数组，上市前为NaN）"""
+        return self._shared.close
+
+    def _wrap(self, values):
+        """输入为DataFrame时将结果包装为同样索引/列的DataFrame"""
+        if self.index is None:
+            return values
+        return pd.DataFrame(values, index=self.index, columns=self.columns)
+
+    def rsi(self, period=14):
+        return self._wrap(self._shared.rsi(period))
+
+    def ema(self, period=12):
+        return self._wrap(self._shared.ema(period))
+
+    def sma(self, period=20):
+        return self._wrap(self._shared.sma(period))
+
+    def bollinger_bands(self, period=20, std_dev=2):
+        """返回 (上轨, 中轨, 下轨)"""
+        return tuple(self._wrap(values) for values in self._shared.bollinger_bands(period, std_dev))
+
+    def macd(self, fast_period=12, slow_period=26, signal_period=9):
+        """返回 (MACD, 信号线, 柱状图)"""
+        return tuple(self._wrap(values) for values in
+                     self._shared.macd(fast_period, slow_period, signal_period))
+
+    def stochastic(self, k_period=14, d_period=3):
+        """返回 (%K, %D)"""
+        return tuple(self._wrap(values) for values in self._shared.stochastic(k_period, d_period))
+
+    def kdj(self, k_period=9, d_period=3, j_period=3):
+        """返回 (K, D, J)，j_period 与 calculate_kdj 一致不参与计算"""
+        return tuple(self._wrap(values) for values in self._shared.kdj(k_period, d_period))
+
+    def atr(self, period=14):
+        return self._wrap(self._shared.atr(period))
+
+    def calculate_all(self, indicator_params=None):
+        """
+        按与 calculate_all_indicators 相同的参数字典计算所有指标
+
+        Args:
+            indicator_params: 指标参数字典
+
+        Returns:
+            {指标列名: (时间 × 交易对) 矩阵}，列名与单交易对计算时相同（如 'RSI', 'BB_upper', 'EMA_12'）
+        """
+        if indicator_params is None:
+            indicator_params = {}
+        result = {}
+
+        for name, spec in INDICATOR_REGISTRY.items():
+            if name not in indicator_params:
+                continue
+            params = resolve_params(name, indicator_params)
+            # 面板方法与 TechnicalIndicators.calculate_* 同名（去掉前缀）、参数顺序相同
+            method = getattr(self, spec['method'][len('calculate_'):])
+            columns = indicator_outputs(name, params)
+
+            if 'series_param' in spec:
+                for period, column in zip(params[spec['series_param']], columns):
+                    result[column] = method(period)
+            else:
+                values = method(*params.values())
+                result.update(zip(columns, values if isinstance(values, tuple) else (values,)))
+
+        return result
@@ -0,0 +1,207 @@
+"""
+参数扫描
+
+在同一段K线上用多进程并行回测一组参数组合，返回每个组合的绩效指标表。
+K线数据放在共享内存中，工作进程启动时映射一次，任务只传递参数字典，
+不会为每个任务重复序列化整段K线。
+"""
+
+import itertools
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import BacktestEngine
+from config import DEFAULT_CONFIG
+from indicator_registry import INDICATOR_REGISTRY
+from indicators import TechnicalIndicators
+
+# 传给 BacktestEngine 构造函数而不是策略参数字典的键
+ENGINE_PARAMETER_KEYS = ['initial_capital', 'commission', 'take_profit', 'stop_loss']
+
+# 结果表中的绩效指标列（BacktestEngine.get_results 的标量结果）
+METRIC_COLUMNS = ['total_return', 'annual_return', 'max_drawdown', 'sharpe_ratio', 'win_rate',
+                  'total_trades', 'take_profit_count', 'stop_loss_count', 'normal_sell_count',
+                  'final_equity']
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 工作进程内的状态：共享内存句柄、重建的K线DataFrame、最近使用的指标结果
+_worker = {}
+
+
+def expand_grid(grid):
+    """
+    将参数网格展开为参数组合列表
+
+    Args:
+        grid: {参数名: 取值列表}，如 {'rsi_oversold': [20, 30], 'stop_loss': [None, 0.05]}；
+              也可以直接传入参数字典列表
+
+    Returns:
+        参数字典列表（按网格中键的顺序做笛卡尔积）
+    """
+    if isinstance(grid, (list, tuple)):
+        return [dict(combo) for combo in grid]
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def _indicator_key(strategy_params):
+    """只影响指标计算的参数（去掉信号阈值和高周期过滤条件），参数相同的组合共用指标结果"""
+    signal_keys = {'htf_filter'}
+    for spec in INDICATOR_REGISTRY.values():
+        signal_keys.update(spec['signal_params'])
+    return repr(sorted((key, value) for key, value in strategy_params.items() if key not in signal_keys))
+
+
+def share_frame(df):
+    """
+    将K线数据复制到共享内存，供工作进程用 attach_frame 映射
+
+    用完后由创建方对每个句柄调用 close() 和 unlink()。
+
+    Returns:
+        (共享内存句柄列表, 可序列化的描述字典)
+    """
+    columns = [column for column in OHLCV_COLUMNS if column in df.columns]
+    # 按列连续存放（列 × K线），重建DataFrame时每列都是共享内存上的连续视图
+    values = np.ascontiguousarray(df[columns].to_numpy(dtype=np.float64).T)
+    index = np.ascontiguousarray(df.index.to_numpy())
+
+    handles = []
+    spec = {'columns': columns, 'shape': values.shape, 'index_dtype': index.dtype.str,
+            'index_name': df.index.name}
+    for key, array in (('values', values), ('index', index)):
+        handle = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=handle.buf)[:] = array
+        handles.append(handle)
+        spec[key] = handle.name
+    return handles, spec
+
+
+def attach_frame(spec):
+    """
+    在工作进程中映射共享内存并重建K线DataFrame
+
+    Returns:
+        (共享内存句柄列表, DataFrame)
+    """
+    values_handle = shared_memory.SharedMemory(name=spec['values'])
+    index_handle = shared_memory.SharedMemory(name=spec['index'])
+    values = np.ndarray(spec['shape'], dtype=np.float64, buffer=values_handle.buf)
+    index = np.ndarray(spec['shape'][1:], dtype=np.dtype(spec['index_dtype']), buffer=index_handle.buf)
+
+    # 由二维数组构造且不复制，所有工作进程共用同一份K线数据
+    df = pd.DataFrame(values.T, columns=spec['columns'], index=pd.Index(index, name=spec['index_name']),
+                      copy=False)
+    return [values_handle, index_handle], df
+
+
+def _init_worker(spec, backend):
+    """工作进程初始化：映射共享内存中的K线数据"""
+    handles, df = attach_frame(spec)
+    _worker.update(handles=handles, df=df, backend=backend, frames=OrderedDict())
+
+
+def _init_local(df, backend):
+    """在当前进程中串行执行时直接使用原始数据，不经过共享内存"""
+    _worker.update(df=df, backend=backend, frames=OrderedDict())
+
+
+def _run_combo(combo):
+    """
+    回测单个参数组合
+
+    Args:
+        combo: 参数字典，引擎参数（ENGINE_PARAMETER_KEYS）与策略参数混在一起
+
+    Returns:
+        绩效指标字典
+    """
+    strategy_params = {key: value for key, value in combo.items() if key not in ENGINE_PARAMETER_KEYS}
+    engine_params = {key: combo[key] for key in ENGINE_PARAMETER_KEYS if key in combo}
+
+    # 任务按指标参数排序后分块派发，相邻组合通常只有阈值或止盈止损不同，直接复用指标结果
+    frames = _worker['frames']
+    key = _indicator_key(strategy_params)
+    if key not in frames:
+        frames[key] = TechnicalIndicators.calculate_all_indicators(
+            _worker['df'], strategy_params, compact=False, backend=_worker['backend'])
+        if len(frames) > 2:
+            frames.popitem(last=False)
+    frames.move_to_end(key)
+
+    # 回测中的异常不在这里捕获：串行时直接抛出，多进程时由 executor.map 在主进程重新抛出
+    results = BacktestEngine(**engine_params).run_backtest(frames[key], strategy_params)
+    return {metric: results.get(metric, np.nan) for metric in METRIC_COLUMNS}
+
+
+class ParameterSweep:
+    """多进程参数扫描"""
+
+    def __init__(self, df, base_params=None, max_workers=None, backend=None):
+        """
+        初始化参数扫描
+
+        Args:
+            df: OHLCV数据DataFrame
+            base_params: 所有组合共用的参数（策略参数和引擎参数），网格中的同名参数会覆盖
+            max_workers: 工作进程数，None为CPU核数，1为在当前进程中串行执行
+            backend: 指标计算后端，None 使用 config 中的 indicator_backend
+        """
+        self.df = df
+        self.base_params = dict(base_params or {})
+        self.max_workers = max_workers or DEFAULT_CONFIG['parameter_sweep']['max_workers'] or os.cpu_count()
+        self.backend = backend
+
+    def run(self, grid, chunksize=None):
+        """
+        运行参数扫描
+
+        Args:
+            grid: 参数网格 {参数名: 取值列表} 或参数字典列表，见 expand_grid
+            chunksize: 每次派发给工作进程的组合数，None为自动
+
+        Returns:
+            DataFrame: 每行一个参数组合（按网格顺序），列为网格参数和 METRIC_COLUMNS
+
+        Raises:
+            任一组合回测失败时抛出该组合的异常（不返回部分结果）
+        """
+        combos = expand_grid(grid)
+        if not combos or self.df.empty:
+            return pd.DataFrame()
+
+        tasks = [{**self.base_params, **combo} for combo in combos]
+        # 指标参数相同的组合排在一起，便于工作进程复用指标结果
+        order = sorted(range(len(tasks)), key=lambda i: _indicator_key(tasks[i]))
+        workers = min(self.max_workers, len(tasks))
+
+        if workers <= 1:
+            _init_local(self.df, self.backend)
+            try:
+                metrics = [_run_combo(tasks[i]) for i in order]
+            finally:
+                _worker.clear()
+        else:
+            if chunksize is None:
+                chunksize = max(1, len(tasks) // (workers * 4))
+            handles, spec = share_frame(self.df)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(spec, self.backend)) as executor:
+                    metrics = list(executor.map(_run_combo, (tasks[i] for i in order), chunksize=chunksize))
+            finally:
+                for handle in handles:
+                    handle.close()
+                    handle.unlink()
+
+        rows = [None] * len(tasks)
+        for position, i in enumerate(order):
+            rows[i] = metrics[position]
+        return pd.concat([pd.DataFrame(combos), pd.DataFrame(rows)], axis=1)
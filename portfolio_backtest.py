@@ -0,0 +1,228 @@
+"""
+多交易对组合回测
+
+在统一的时间轴上对一篮子交易对运行同一策略：共用一份现金，每个交易对各自持仓。
+指标由 PanelIndicators 对 (时间 × 交易对) 矩阵一次性计算，信号由 signal_rules 按与
+BacktestEngine.calculate_signals 相同的规则生成；逐K线推进时所有交易对的止盈止损、买卖和权益都是长度为交易对数的向量运算，不在每根K线上按交易对循环。
+"""
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import BacktestEngine
+from indicator_registry import warmup_bars
+from panel_indicators import PanelIndicators
+from signal_rules import signal_matrix
+
+# 交易记录中的动作代码
+ACTIONS = np.array(['BUY', 'SELL', 'TAKE_PROFIT', 'STOP_LOSS'])
+BUY, SELL, TAKE_PROFIT, STOP_LOSS = range(4)
+
+
+class PortfolioBacktest:
+    """共享资金的多交易对组合回测"""
+
+    def __init__(self, initial_capital=10000, commission=0.001, take_profit=None, stop_loss=None,
+                 max_positions=None):
+        """
+        初始化组合回测
+
+        Args:
+            initial_capital: 初始资金（所有交易对共用）
+            commission: 手续费率
+            take_profit: 止盈百分比，如 0.1 表示10%
+            stop_loss: 止损百分比，如 0.05 表示5%
+            max_positions: 同时持仓的交易对数上限，None为交易对数；
+                           每次买入最多使用 组合权益/max_positions 的资金
+        """
+        self.initial_capital = initial_capital
+        self.commission = commission
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.max_positions = max_positions
+
+    @staticmethod
+    def calculate_signals(indicators, close, strategy_params):
+        """
+        计算 (时间 × 交易对) 信号矩阵，规则见 signal_rules（与 BacktestEngine.calculate_signals 相同）
+
+        Args:
+            indicators: {指标列名: (时间 × 交易对) 矩阵}，如 PanelIndicators.calculate_all 的返回值
+            close: (时间 × 交易对) 收盘价矩阵
+            strategy_params: 策略参数字典
+        """
+        if strategy_params.get('htf_filter'):
+            raise ValueError("组合回测不支持高周期过滤(htf_filter)")
+
+        return signal_matrix(indicators, close, strategy_params)
+
+    def run_backtest(self, frames, strategy_params, skip_warmup=True):
+        """
+        运行组合回测
+
+        每根K线的处理顺序与 BacktestEngine 相同：先检查各持仓的止盈止损，再记录组合权益，
+        再处理信号（先卖出释放现金，再买入）；触发止盈止损的交易对在该K线不再交易。
+        与 BacktestEngine 相同，有止盈止损触发的K线不记录到权益曲线（positions 仍包含每根K线）。
+        同一根K线上的多个买入按列顺序占用剩余持仓名额，平分当前现金，且每个不超过
+        组合权益/max_positions 的95%。只在交易对实际存在的K线上交易：上市前、数据缺口中
+        以及最后一根K线之后（PanelIndicators 用前值补齐的K线）不触发止盈止损、不买卖，
+        持仓按最近一根实际K线的收盘价计值；数据在面板结束前终止的交易对在其最后一根
+        实际K线上强制平仓。
+
+        Args:
+            frames: {交易对: OHLCV DataFrame}，如 fetch_many_historical 的返回值
+            strategy_params: 策略参数字典（与单交易对回测相同）
+            skip_warmup: 是否跳过指标预热区间（从公共时间轴起点计算）
+
+        Returns:
+            dict: BacktestEngine.get_results 的各项结果（基于组合权益曲线，交易记录带 symbol 列，
+                  胜率按每个交易对的买卖配对计算），另有 positions（时间 × 交易对 持仓数量）
+                  和 position_values（时间 × 交易对 持仓市值）
+        """
+        panel = PanelIndicators.from_frames(frames)
+        indicators = panel.calculate_all(strategy_params)
+        close = panel.close
+        signals = self.calculate_signals(indicators, close, strategy_params)
+
+        bars, count = close.shape
+        if bars == 0:
+            return {}
+        start = min(warmup_bars(strategy_params), bars - 1) if skip_warmup else 0
+        max_positions = self.max_positions or count
+        take_profit = self.take_profit or np.inf
+        stop_loss = -self.stop_loss if self.stop_loss else -np.inf
+        tradable = panel.observed
+        prices = np.where(np.isfinite(close), close, 0.0)
+        # 每个交易对最后一根实际K线的位置（没有数据的交易对为-1）
+        last_bar = np.where(tradable.any(axis=0), bars - 1 - np.argmax(tradable[::-1], axis=0), -1)
+
+        cash = float(self.initial_capital)
+        shares = np.zeros(count)
+        buy_price = np.full(count, np.nan)  # 空仓时为NaN，止盈止损比较恒为False
+        wins = 0
+
+        equity = np.empty(bars - start)
+        capital = np.empty(bars - start)
+        recorded = np.ones(bars - start, dtype=bool)
+        positions = np.zeros((bars - start, count))
+        events = []  # (K线位置, 交易对位置数组, 动作, 价格, 股数, 金额, 交易后现金, 收益率%)
+
+        def record(i, symbols, action, price, amount, sign, return_pct=None):
+            """记录同一根K线上同一动作的多笔交易，交易后现金按列顺序累计"""
+            capital_after = cash + sign * np.cumsum(amount)
+            events.append((i, symbols, action, price, shares[symbols].copy(), amount, capital_after, return_pct))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i in range(start, bars):
+                price = prices[i]
+                row = signals[i]
+
+                # 止盈止损
+                current_return = (price - buy_price) / buy_price
+                exited = ((current_return >= take_profit) | (current_return <= stop_loss)) & tradable[i]
+                if exited.any():
+                    for action, hit in ((TAKE_PROFIT, exited & (current_return >= take_profit)),
+                                        (STOP_LOSS, exited & (current_return < take_profit))):
+                        symbols = np.flatnonzero(hit)
+                        if len(symbols):
+                            revenue = shares[symbols] * price[symbols] * (1 - self.commission)
+                            record(i, symbols, action, price[symbols], revenue, 1, current_return[symbols] * 100)
+                            cash += revenue.sum()
+                    wins += int((exited & (price > buy_price)).sum())
+                    shares[exited] = 0
+                    buy_price[exited] = np.nan
+                    recorded[i - start] = False
+
+                # 记录组合权益（止盈止损K线的权益只用于计算买入额度，不进入权益曲线）
+                equity[i - start] = cash + shares @ price
+                capital[i - start] = cash
+                positions[i - start] = shares
+
+                if i == start:  # 起始K线只记录权益
+                    continue
+
+                # 卖出信号
+                sell = (row == -1) & (shares > 0) & tradable[i]
+                if sell.any():
+                    symbols = np.flatnonzero(sell)
+                    revenue = shares[symbols] * price[symbols] * (1 - self.commission)
+                    record(i, symbols, SELL, price[symbols], revenue, 1)
+                    cash += revenue.sum()
+                    wins += int((price[symbols] > buy_price[symbols]).sum())
+                    shares[symbols] = 0
+                    buy_price[symbols] = np.nan
+
+                # 买入信号
+                buy = (row == 1) & (shares == 0) & ~exited & tradable[i]
+                slots = max_positions - int((shares > 0).sum())
+                if slots > 0 and buy.any():
+                    symbols = np.flatnonzero(buy)[:slots]
+                    budget = cash / len(symbols)
+                    allocation = min(budget, equity[i - start] / max_positions) * 0.95  # 保留5%现金
+                    candidate = np.floor(allocation / price[symbols])
+                    cost = candidate * price[symbols] * (1 + self.commission)
+                    filled = (candidate > 0) & (cost <= budget)
+                    symbols, candidate, cost = symbols[filled], candidate[filled], cost[filled]
+                    if len(symbols):
+                        shares[symbols] = candidate
+                        buy_price[symbols] = price[symbols]
+                        record(i, symbols, BUY, price[symbols], cost, -1)
+                        cash -= cost.sum()
+
+                # 数据在此终止的交易对强制平仓（面板最后一根K线的平仓在循环结束后统一处理）
+                delisted = (last_bar == i) & (shares > 0)
+                if i < bars - 1 and delisted.any():
+                    symbols = np.flatnonzero(delisted)
+                    revenue = shares[symbols] * price[symbols] * (1 - self.commission)
+                    record(i, symbols, SELL, price[symbols], revenue, 1)
+                    cash += revenue.sum()
+                    wins += int((price[symbols] > buy_price[symbols]).sum())
+                    shares[symbols] = 0
+                    buy_price[symbols] = np.nan
+
+        # 最后一根K线强制平仓
+        symbols = np.flatnonzero(shares > 0)
+        if len(symbols):
+            price = prices[-1]
+            revenue = shares[symbols] * price[symbols] * (1 - self.commission)
+            record(bars - 1, symbols, SELL, price[symbols], revenue, 1)
+            cash += revenue.sum()
+            wins += int((price[symbols] > buy_price[symbols]).sum())
+            shares[symbols] = 0
+
+        index = panel.index
+        names = np.asarray(panel.columns)
+        rows = []
+        for i, symbols, action, price, quantity, amount, capital_after, return_pct in events:
+            for k, symbol in enumerate(symbols):
+                trade = {
+                    'timestamp': index[i],
+                    'symbol': names[symbol],
+                    'action': ACTIONS[action],
+                    'price': price[k],
+                    'shares': int(quantity[k]),
+                    'cost' if action == BUY else 'revenue': amount[k],
+                    'capital': capital_after[k],
+                    'position': int(quantity[k]) if action == BUY else 0
+                }
+                if return_pct is not None:
+                    trade['return_pct'] = return_pct[k]
+                rows.append(trade)
+        trades = pd.DataFrame(rows)
+
+        # 组合权益曲线上的指标沿用 BacktestEngine.get_results
+        summary = BacktestEngine(self.initial_capital, self.commission, self.take_profit, self.stop_loss)
+        summary.equity_curve = pd.DataFrame({
+            'timestamp': index[start:][recorded],
+            'equity': equity[recorded],
+            'capital': capital[recorded],
+            'exposure': (equity - capital)[recorded]
+        })
+        summary.trades = trades.to_dict('records')
+        results = summary.get_results()
+
+        round_trips = int((trades['action'] != 'BUY').sum()) if not trades.empty else 0
+        results['win_rate'] = wins / round_trips * 100 if round_trips else 0
+        results['positions'] = pd.DataFrame(positions, index=index[start:], columns=panel.columns)
+        results['position_values'] = results['positions'] * prices[start:]
+        return results
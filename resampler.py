@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+MINUTE_MS = 60 * 1000
+DAY_MS = 24 * 60 * MINUTE_MS
+WEEK_MS = 7 * DAY_MS
+# 1970-01-01 是周四，币安周线从周一 00:00 (UTC) 开始
+WEEK_OFFSET_MS = 4 * DAY_MS
+
+# 可作为派生基础的时间周期，从细到粗
+BASE_TIMEFRAMES = ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d']
+
+_UNIT_MS = {'s': 1000, 'm': MINUTE_MS, 'h': 60 * MINUTE_MS, 'd': DAY_MS, 'w': WEEK_MS}
+
+
+def timeframe_to_ms(timeframe):
+    """
+    时间周期转换为毫秒
+
+    月线('1M')长度不固定，返回30天作为近似值，仅用于估算。
+    """
+    amount, unit = int(timeframe[:-1]), timeframe[-1]
+    if unit == 'M':
+        return amount * 30 * DAY_MS
+    return amount * _UNIT_MS[unit]
+
+
+def can_derive(base_timeframe, timeframe):
+    """判断 timeframe 的K线能否由 base_timeframe 的K线精确合成"""
+    base_ms = timeframe_to_ms(base_timeframe)
+    target_ms = timeframe_to_ms(timeframe)
+    if base_ms >= target_ms:
+        return False
+    # 周线/月线边界都落在整天上
+    if timeframe[-1] in ('w', 'M'):
+        return DAY_MS % base_ms == 0
+    return target_ms % base_ms == 0
+
+
+def bucket_start(timestamps, timeframe):
+    """
+    计算每个时间戳所属K线的开盘时间，与币安的K线边界一致
+
+    分钟/小时/天按UTC纪元对齐，周线从周一开始，月线按自然月。
+
+    Args:
+        timestamps: 毫秒时间戳数组(int64)
+        timeframe: 目标时间周期
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    amount, unit = int(timeframe[:-1]), timeframe[-1]
+
+    if unit == 'M':
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+        months -= months % amount
+        return months.astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+
+    period = timeframe_to_ms(timeframe)
+    if unit == 'w':
+        return timestamps - (timestamps - WEEK_OFFSET_MS) % period
+    return timestamps - timestamps % period
+
+
+def grid_position(timestamps, timeframe):
+    """
+    计算时间戳在K线网格上的序号（相邻K线序号相差1）
+
+    Args:
+        timestamps: K线开盘时间（毫秒，int64数组）
+        timeframe: 时间周期
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    amount, unit = int(timeframe[:-1]), timeframe[-1]
+
+    if unit == 'M':
+        months = timestamps.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+        return months // amount
+
+    offset = WEEK_OFFSET_MS if unit == 'w' else 0
+    return (timestamps - offset) // timeframe_to_ms(timeframe)
+
+
+def grid_timestamp(positions, timeframe):
+    """grid_position 的逆运算：由网格序号得到K线开盘时间（毫秒）"""
+    positions = np.asarray(positions, dtype=np.int64)
+    amount, unit = int(timeframe[:-1]), timeframe[-1]
+
+    if unit == 'M':
+        return (positions * amount).astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+
+    offset = WEEK_OFFSET_MS if unit == 'w' else 0
+    return positions * timeframe_to_ms(timeframe) + offset
+
+
+def next_bucket_start(timestamp, timeframe):
+    """计算时间戳所属K线的下一根K线的开盘时间（毫秒）"""
+    start = int(bucket_start([timestamp], timeframe)[0])
+    if timeframe[-1] == 'M':
+        # 任意连续n个月都短于 n*31 天且长于 (n-1)*31 天
+        return int(bucket_start([start + int(timeframe[:-1]) * 31 * DAY_MS], timeframe)[0])
+    return start + timeframe_to_ms(timeframe)
+
+
+def bars_before(timestamp, timeframe, bars):
+    """
+    计算时间戳之前第 bars 根K线的开盘时间（毫秒）
+
+    即在 timestamp 之前再取 bars 根完整K线时的起点，用于指标预热。
+    """
+    first = grid_position([timestamp - 1], timeframe)[0] + 1
+    return int(grid_timestamp([first - bars], timeframe)[0])
+
+
+def completed_bar_index(base_timestamps, base_ms, bar_timestamps, timeframe):
+    """
+    对每根基础K线，找出其收盘时已经走完的最后一根高周期K线
+
+    高周期K线的收盘时间不晚于基础K线的收盘时间才算已完成，
+    因此对齐后的数据不会用到当时尚未收盘的高周期K线（无未来函数）。
+
+    Args:
+        base_timestamps: 基础K线开盘时间（毫秒，int64数组，升序）
+        base_ms: 基础K线周期长度（毫秒）
+        bar_timestamps: 高周期K线开盘时间（毫秒，int64数组，升序）
+        timeframe: 高周期
+
+    Returns:
+        高周期K线位置数组，尚无已完成K线时为 -1
+    """
+    bar_close = grid_timestamp(grid_position(bar_timestamps, timeframe) + 1, timeframe)
+    base_close = np.asarray(base_timestamps, dtype=np.int64) + base_ms
+    return np.searchsorted(bar_close, base_close, side='right') - 1
+
+
+def resample_ohlcv(df, timeframe):
+    """
+    将较细周期的K线合成为较粗周期
+
+    输入需按时间升序、以时间为索引；每组取首根开盘价、末根收盘价、
+    最高价的最大值、最低价的最小值、成交量之和，全部为向量化操作。
+
+    Args:
+        df: 包含OHLCV数据的DataFrame
+        timeframe: 目标时间周期，如 '1h', '4h', '1d', '1w'
+    """
+    if df.empty:
+        return df
+
+    timestamps = df.index.values.astype('datetime64[ms]').astype(np.int64)
+    buckets = bucket_start(timestamps, timeframe)
+
+    # 每组的起止位置
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    result = pd.DataFrame({
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends],
+        'volume': np.add.reduceat(df['volume'].to_numpy(), starts)
+    }, index=pd.DatetimeIndex(buckets[starts].astype('datetime64[ms]'), name='timestamp'))
+
+    return result
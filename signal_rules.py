@@ -0,0 +1,89 @@
+"""
+交易信号规则
+
+RSI、KDJ、布林带、EMA、MACD 的买卖规则按 indicator_registry 中各指标的 signal 声明
+在这里实现一次，单交易对回测（BacktestEngine）、批量参数回测（BatchBacktest）和
+组合回测（PortfolioBacktest）共用，三者的信号保持一致。所有运算都在 (K线 × 列) 矩阵上进行，
+列可以是交易对，也可以是参数组合。
+"""
+
+import numpy as np
+
+from indicator_registry import INDICATOR_REGISTRY, signal_inputs, signal_thresholds
+
+
+def rule_signals(rule, inputs, close, thresholds):
+    """
+    按一条规则计算买入/卖出掩码
+
+    Args:
+        rule: 规则类型 'threshold' / 'cross' / 'band'
+        inputs: 规则的输入矩阵列表，每个矩阵比 close 多一行：首行为上一根K线（没有时为NaN）
+        close: (K线 × 列) 收盘价矩阵
+        thresholds: 阈值列表（买入阈值在前），每个阈值为标量或长度为列数的数组
+
+    Returns:
+        (买入, 卖出)，与 close 同形状的布尔矩阵
+    """
+    if rule == 'threshold':
+        value = inputs[0]
+        buy_threshold, sell_threshold = thresholds
+        buy = (value[1:] < buy_threshold) & (value[:-1] >= buy_threshold)
+        sell = (value[1:] > sell_threshold) & (value[:-1] <= sell_threshold)
+    elif rule == 'cross':
+        fast, slow = inputs
+        buy = (fast[1:] > slow[1:]) & (fast[:-1] <= slow[:-1])
+        sell = (fast[1:] < slow[1:]) & (fast[:-1] >= slow[:-1])
+        if thresholds:
+            buy &= fast[1:] < thresholds[0]
+            sell &= fast[1:] > thresholds[1]
+    elif rule == 'band':
+        lower, upper = inputs
+        buy = close <= lower[1:]
+        sell = close >= upper[1:]
+    else:
+        raise ValueError(f"未知的信号规则: {rule}")
+    return buy, sell
+
+
+def with_previous(values, previous=None):
+    """在矩阵前拼接上一根K线的值（previous 为None时为NaN）"""
+    if previous is None:
+        previous = np.full((1, values.shape[1]), np.nan)
+    return np.vstack([previous, values])
+
+
+def signal_matrix(indicators, close, strategy_params):
+    """
+    计算 (K线 × 列) 信号矩阵
+
+    按注册表顺序应用 strategy_params 中启用的指标规则，后面的规则覆盖前面的信号；
+    规则的输入列不全时跳过该规则。
+
+    Args:
+        indicators: {指标列名: 矩阵或Series}，如包含指标的DataFrame或 PanelIndicators.calculate_all 的返回值
+        close: 收盘价，一维（单交易对）或 (K线 × 列) 矩阵
+        strategy_params: 策略参数字典
+
+    Returns:
+        与 close 同行数的 (K线 × 列) int8 矩阵，1为买入、-1为卖出、0为无信号
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if close.ndim == 1:
+        close = close[:, None]
+    signals = np.zeros(close.shape, dtype=np.int8)
+
+    for name, spec in INDICATOR_REGISTRY.items():
+        if 'signal' not in spec or name not in strategy_params:
+            continue
+        columns = signal_inputs(name, strategy_params)
+        if not all(column in indicators for column in columns):
+            continue
+
+        inputs = [with_previous(np.asarray(indicators[column], dtype=np.float64).reshape(close.shape))
+                  for column in columns]
+        buy, sell = rule_signals(spec['signal']['rule'], inputs, close, signal_thresholds(name, strategy_params))
+        signals[buy] = 1
+        signals[sell] = -1
+
+    return signals
@@ -0,0 +1,243 @@
+"""
+增量技术指标
+
+每个指标对象可用历史数据 seed 初始化，之后每来一根K线调用一次 update，
+单次更新为O(1)，输出与 TechnicalIndicators 对应的批量计算结果一致。
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+NAN = float('nan')
+
+
+class StreamingEMA:
+    """
+    增量EMA
+
+    与 TechnicalIndicators.calculate_ema（ta.trend.EMAIndicator）一致：
+    alpha = 2/(period+1)，首个值取第一根收盘价，前 period-1 根输出NaN。
+    """
+
+    def __init__(self, period=12):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.count = 0
+        self._ema = NAN
+
+    @property
+    def value(self):
+        """当前EMA值，预热期内为NaN"""
+        return self._ema if self.count >= self.period else NAN
+
+    def update(self, close):
+        """输入一根K线的收盘价，返回最新EMA"""
+        if self.count == 0:
+            self._ema = close
+        else:
+            self._ema = (1 - self.alpha) * self._ema + self.alpha * close
+        self.count += 1
+        return self.value
+
+    def seed(self, closes):
+        """用历史收盘价初始化，返回最新值"""
+        for close in closes:
+            self.update(close)
+        return self.value
+
+
+class StreamingRSI:
+    """
+    增量RSI（Wilder平滑）
+
+    与 TechnicalIndicators.calculate_rsi（ta.momentum.RSIIndicator）一致：
+    涨跌幅以 alpha = 1/period 做指数平滑，第一根K线的涨跌记为0，
+    前 period-1 根输出NaN，平均跌幅为0时输出100。
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.alpha = 1.0 / period
+        self.count = 0
+        self.prev_close = None
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+
+    @property
+    def value(self):
+        """当前RSI值，预热期内为NaN"""
+        if self.count < self.period:
+            return NAN
+        if self._avg_loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + self._avg_gain / self._avg_loss)
+
+    def update(self, close):
+        """输入一根K线的收盘价，返回最新RSI"""
+        if self.prev_close is None:
+            gain = loss = 0.0
+        else:
+            diff = close - self.prev_close
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+
+        if self.count == 0:
+            self._avg_gain, self._avg_loss = gain, loss
+        else:
+            self._avg_gain = (1 - self.alpha) * self._avg_gain + self.alpha * gain
+            self._avg_loss = (1 - self.alpha) * self._avg_loss + self.alpha * loss
+
+        self.prev_close = close
+        self.count += 1
+        return self.value
+
+    def seed(self, closes):
+        """用历史收盘价初始化，返回最新值"""
+        for close in closes:
+            self.update(close)
+        return self.value
+
+
+class StreamingMACD:
+    """
+    增量MACD
+
+    与 TechnicalIndicators.calculate_macd（ta.trend.MACD）一致：
+    MACD = EMA(fast) - EMA(slow)，信号线为MACD的EMA，从第一个有效MACD值开始计算。
+    """
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        self.fast = StreamingEMA(fast_period)
+        self.slow = StreamingEMA(slow_period)
+        self.signal = StreamingEMA(signal_period)
+        self.macd = NAN
+
+    @property
+    def value(self):
+        """(MACD, 信号线, 柱状图)，预热期内为NaN"""
+        signal = self.signal.value
+        return self.macd, signal, self.macd - signal
+
+    def update(self, close):
+        """输入一根K线的收盘价，返回 (MACD, 信号线, 柱状图)"""
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        if not math.isnan(self.macd):
+            self.signal.update(self.macd)
+        return self.value
+
+    def seed(self, closes):
+        """用历史收盘价初始化，返回最新值"""
+        for close in closes:
+            self.update(close)
+        return self.value
+
+
+class StreamingATR:
+    """
+    增量ATR
+
+    与 TechnicalIndicators.calculate_atr（ta.volatility.AverageTrueRange）一致：
+    第 period 根K线取前 period 个真实波幅的均值，之后按Wilder方式平滑，
+    在此之前输出0（总K线数不足 period 时批量计算整列为NaN，增量计算仍输出0）。
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0
+        self.prev_close = None
+        self._tr_sum = 0.0
+        self._atr = 0.0
+
+    @property
+    def value(self):
+        """当前ATR值"""
+        return self._atr
+
+    def update(self, high, low, close):
+        """输入一根K线的最高价、最低价、收盘价，返回最新ATR"""
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        self.count += 1
+        if self.count < self.period:
+            self._tr_sum += true_range
+        elif self.count == self.period:
+            self._atr = (self._tr_sum + true_range) / self.period
+        else:
+            self._atr = (self._atr * (self.period - 1) + true_range) / float(self.period)
+
+        self.prev_close = close
+        return self._atr
+
+    def seed(self, highs, lows, closes):
+        """用历史K线初始化，返回最新值"""
+        for high, low, close in zip(highs, lows, closes):
+            self.update(high, low, close)
+        return self.value
+
+
+class RollingStats:
+    """
+    增量滚动均值/标准差（总体标准差，ddof=0）
+
+    与 calculate_sma 及 calculate_bollinger_bands 的滚动窗口一致。
+    窗口内用滑动Welford方式更新，每经过 window 次更新用窗口数据重新精确求和一次，
+    避免长时间运行的累计误差，均摊仍为O(1)。与pandas滚动计算的差异在1e-12量级（相对误差）。
+    """
+
+    def __init__(self, window=20):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+
+    @property
+    def mean(self):
+        """当前滚动均值，窗口未满时为NaN"""
+        return self._mean if len(self.values) == self.window else NAN
+
+    @property
+    def std(self):
+        """当前滚动标准差，窗口未满时为NaN"""
+        if len(self.values) < self.window:
+            return NAN
+        return math.sqrt(max(self._m2, 0.0) / self.window)
+
+    def bands(self, std_dev=2):
+        """布林带 (上轨, 中轨, 下轨)"""
+        mean, std = self.mean, self.std
+        return mean + std_dev * std, mean, mean - std_dev * std
+
+    def update(self, value):
+        """输入新值，返回 (均值, 标准差)"""
+        if len(self.values) == self.window:
+            removed = self.values[0]
+            self.values.append(value)
+            delta = value - removed
+            old_mean = self._mean
+            self._mean += delta / self.window
+            self._m2 += delta * (value - self._mean + removed - old_mean)
+        else:
+            self.values.append(value)
+            delta = value - self._mean
+            self._mean += delta / len(self.values)
+            self._m2 += delta * (value - self._mean)
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            window_values = np.fromiter(self.values, dtype=np.float64, count=len(self.values))
+            self._mean = float(window_values.mean())
+            self._m2 = float(((window_values - self._mean) ** 2).sum())
+
+        return self.mean, self.std
+
+    def seed(self, values):
+        """用历史数据初始化，返回 (均值, 标准差)"""
+        for value in values:
+            self.update(value)
+        return self.mean, self.std
@@ -0,0 +1,39 @@
+"""测试公共设置：把项目根目录加入导入路径，提供随机K线数据"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def random_ohlcv(bars, seed=0, start='2023-01-01', freq='1h'):
+    """
+    生成随机游走的OHLCV数据
+
+    Args:
+        bars: K线数
+        seed: 随机种子
+        start: 第一根K线的时间
+        freq: K线间隔
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = np.r_[close[:1], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.005, bars)) * close
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, bars)
+    }, index=pd.date_range(start, periods=bars, freq=freq, name='timestamp'))
+
+
+@pytest.fixture
+def make_ohlcv():
+    """返回 random_ohlcv，供测试按需生成不同长度和种子的数据"""
+    return random_ohlcv
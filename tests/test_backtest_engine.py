@@ -0,0 +1,77 @@
+"""回测引擎测试"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from indicator_registry import warmup_bars
+from indicators import TechnicalIndicators
+
+
+@pytest.mark.parametrize('higher', ['4h', '1d', '1w'])
+def test_warmup_matches_fetch_with_higher_timeframe(make_ohlcv, higher):
+    # 获取数据时在开始日期前多取 warmup_bars(params, timeframe) 根K线，回测应从开始日期起算
+    params = {'rsi': True, 'higher_timeframes': {higher: {'rsi': True, 'rsi_period': 14}},
+              'htf_filter': {'column': f'RSI_{higher}', 'buy_min': 50}}
+    warmup = warmup_bars(params, '1h')
+    df = make_ohlcv(warmup + 2000, seed=3, start='2022-01-03')
+    indicators = TechnicalIndicators.calculate_all_indicators(df, params)
+
+    results = BacktestEngine().run_backtest(indicators, params, timeframe='1h')
+    assert results['equity_curve']['timestamp'].iloc[0] == df.index[warmup]
+    assert warmup > warmup_bars(params)
+
+
+def _run(df, signals, params, engine_args, skip_warmup, reference):
+    """用给定信号运行回测（替换策略信号，覆盖任意买卖序列）"""
+    engine = BacktestEngine(*engine_args)
+    engine.calculate_signals = lambda frame, strategy_params: signals
+    return engine.run_backtest(df, params, skip_warmup=skip_warmup, reference=reference)
+
+
+ENGINE_ARGS = [
+    # (初始资金, 手续费率, 止盈, 止损)
+    (10000, 0.001, None, None),
+    (10000, 0.001, 0.03, None),
+    (10000, 0.001, None, 0.02),
+    (10000, 0.0, 0.02, 0.02),
+    (10000, 0.01, 0.05, 0.01),
+    (150, 0.001, 0.02, 0.02),  # 资金只够买一股
+    (90, 0.001, None, 0.03),   # 价格（约100）较高时资金不足一股，这些买入信号被跳过
+]
+
+
+@pytest.mark.parametrize('skip_warmup', [True, False])
+@pytest.mark.parametrize('engine_args', ENGINE_ARGS)
+@pytest.mark.parametrize('seed', range(6))
+def test_array_core_matches_reference_loop(make_ohlcv, seed, engine_args, skip_warmup):
+    df = make_ohlcv(1500, seed=seed)
+    rng = np.random.default_rng(seed + 100)
+    # 信号密度各不相同：稀疏信号让止盈止损有机会触发，密集信号覆盖连续买卖
+    density = [0.01, 0.05, 0.3][seed % 3]
+    signals = pd.Series(rng.choice([-1, 0, 1], size=len(df), p=[density, 1 - 2 * density, density]),
+                        index=df.index)
+    params = {'rsi': True, 'rsi_period': 50}
+
+    expected = _run(df, signals, params, engine_args, skip_warmup, reference=True)
+    actual = _run(df, signals, params, engine_args, skip_warmup, reference=False)
+
+    assert set(actual) == set(expected)
+    for key, value in expected.items():
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual[key], value, check_dtype=False)
+        else:
+            assert actual[key] == value or (np.isnan(actual[key]) and np.isnan(value)), key
+
+
+def test_array_core_matches_reference_loop_with_strategy_signals(make_ohlcv):
+    df = make_ohlcv(3000, seed=42)
+    params = {'rsi': True, 'kdj': True, 'boll': True, 'ema': True, 'macd': True}
+    indicators = TechnicalIndicators.calculate_all_indicators(df, params)
+
+    for engine_args in ENGINE_ARGS:
+        expected = BacktestEngine(*engine_args).run_backtest(indicators, params, reference=True)
+        actual = BacktestEngine(*engine_args).run_backtest(indicators, params)
+        pd.testing.assert_frame_equal(actual['equity_curve'], expected['equity_curve'], check_dtype=False)
+        pd.testing.assert_frame_equal(actual['trades'], expected['trades'], check_dtype=False)
@@ -0,0 +1,54 @@
+"""批量回测与逐组合 BacktestEngine 的一致性"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from batch_backtest import BatchBacktest
+from indicators import TechnicalIndicators
+from parameter_sweep import ENGINE_PARAMETER_KEYS, METRIC_COLUMNS, expand_grid
+
+GRID = [
+    {'rsi': True, 'rsi_period': 10, 'rsi_oversold': 35, 'take_profit': 0.03},
+    {'rsi': True, 'kdj': True, 'stop_loss': 0.02},
+    {'boll': True, 'bb_period': 15, 'commission': 0.002},
+    {'ema': True, 'ema_periods': [5, 20], 'ema_short': 5, 'ema_long': 20, 'take_profit': 0.02, 'stop_loss': 0.02},
+    {'macd': True, 'kdj': True, 'kdj_buy_threshold': 30, 'initial_capital': 500},
+]
+
+
+def _engine_metrics(df, combo, bars=None, skip_warmup=True):
+    strategy_params = {key: value for key, value in combo.items() if key not in ENGINE_PARAMETER_KEYS}
+    engine_params = {key: combo[key] for key in ENGINE_PARAMETER_KEYS if key in combo}
+    indicators = TechnicalIndicators.calculate_all_indicators(df, strategy_params)
+    if bars is not None:
+        indicators = indicators.iloc[bars[0]:bars[1]]
+    return BacktestEngine(**engine_params).run_backtest(indicators, strategy_params, skip_warmup=skip_warmup)
+
+
+def _assert_metrics(row, expected):
+    for metric in METRIC_COLUMNS:
+        assert row[metric] == pytest.approx(expected[metric], rel=1e-9, abs=1e-9), metric
+
+
+def test_batch_matches_engine(make_ohlcv):
+    df = make_ohlcv(3000, seed=5)
+    metrics = BatchBacktest(df).run(GRID)
+    for position, combo in enumerate(expand_grid(GRID)):
+        _assert_metrics(metrics.iloc[position], _engine_metrics(df, combo))
+
+
+def test_batch_bar_range_matches_sliced_engine(make_ohlcv):
+    df = make_ohlcv(3000, seed=6)
+    batch = BatchBacktest(df)
+    metrics = batch.run(GRID, bars=(1000, 2000), skip_warmup=False)
+    for position, combo in enumerate(GRID):
+        _assert_metrics(metrics.iloc[position], _engine_metrics(df, combo, (1000, 2000), skip_warmup=False))
+
+
+def test_batch_bar_range_end_is_clamped(make_ohlcv):
+    df = make_ohlcv(800, seed=7)
+    batch = BatchBacktest(df)
+    pd.testing.assert_frame_equal(batch.run(GRID, bars=(200, len(df) + 500)), batch.run(GRID, bars=(200, len(df))))
+    assert batch.run(GRID, bars=(len(df), len(df) + 10)).empty
@@ -0,0 +1,113 @@
+"""本地K线存储（OHLCVStore / CandleArchive）"""
+
+import os
+
+import numpy as np
+import pytest
+
+import data_store
+from candle_archive import PRICE_COLUMNS, CandleArchive
+from data_store import OHLCVStore
+
+MINUTE = 60_000
+
+
+def candles(first, last, value=1.0):
+    """[first, last) 分钟的K线列表"""
+    return [[i * MINUTE, value, value + 1, value - 0.5, value + 0.5, float(i)] for i in range(first, last)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return OHLCVStore(str(tmp_path))
+
+
+def test_tail_append_does_not_rewrite(store):
+    store.save('BTC/USDT', '1m', candles(100, 200))
+    main_file = store._path('BTC/USDT', '1m')
+    mtime = os.stat(main_file).st_mtime_ns
+
+    store.save('BTC/USDT', '1m', candles(200, 205))
+    store.save('BTC/USDT', '1m', candles(205, 210))
+
+    assert os.stat(main_file).st_mtime_ns == mtime
+    assert store.coverage('BTC/USDT', '1m') == (100 * MINUTE, 209 * MINUTE)
+    df = store.load('BTC/USDT', '1m')
+    np.testing.assert_array_equal(df['volume'].to_numpy(), np.arange(100, 210))
+    assert len(store.load('BTC/USDT', '1m', 198 * MINUTE, 202 * MINUTE)) == 5
+
+
+def test_overlapping_save_merges_parts(store):
+    store.save('BTC/USDT', '1m', candles(100, 200))
+    store.save('BTC/USDT', '1m', candles(200, 210))
+    store.save('BTC/USDT', '1m', candles(150, 220, value=3.0))
+    store.save('BTC/USDT', '1m', candles(50, 60))
+
+    assert not os.path.exists(store._parts_dir('BTC/USDT', '1m'))
+    df = store.load('BTC/USDT', '1m')
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    assert len(df) == 10 + 120
+    assert (df['open'].to_numpy()[df.index >= np.datetime64(150 * MINUTE, 'ms')] == 3.0).all()
+
+
+def test_parts_compact_at_limit(store, monkeypatch):
+    monkeypatch.setattr(data_store, 'MAX_PARTS', 4)
+    store.save('BTC/USDT', '1m', candles(0, 10))
+    for k in range(1, 10):
+        store.save('BTC/USDT', '1m', candles(k * 10, k * 10 + 10))
+        parts = store._files('BTC/USDT', '1m')[1:]
+        assert len(parts) < 4
+
+    np.testing.assert_array_equal(store.load('BTC/USDT', '1m')['volume'].to_numpy(), np.arange(100))
+
+
+def test_clear_removes_parts(store):
+    store.save('BTC/USDT', '1m', candles(0, 10))
+    store.save('BTC/USDT', '1m', candles(10, 20))
+    store.save('ETH/USDT', '1m', candles(0, 10))
+    store.clear('BTC/USDT')
+
+    assert store.coverage('BTC/USDT', '1m') is None
+    assert store.coverage('ETH/USDT', '1m') == (0, 9 * MINUTE)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return CandleArchive(str(tmp_path))
+
+
+def test_archive_tail_append_in_place(archive):
+    archive.save('BTC/USDT', '1m', candles(100, 200))
+    before = archive.load('BTC/USDT', '1m')  # 保持旧映射打开，追加后仍可读取
+
+    archive.save('BTC/USDT', '1m', candles(200, 205))
+    archive.save('BTC/USDT', '1m', candles(205, 210) + candles(207, 208, value=9.0))
+
+    assert len(before) == 100
+    assert archive.coverage('BTC/USDT', '1m') == (100 * MINUTE, 209 * MINUTE)
+    df = archive.load('BTC/USDT', '1m')
+    np.testing.assert_array_equal(df['volume'].to_numpy(), np.arange(100, 210))
+    assert df['open'].iloc[-3] == 9.0
+    for name in ['timestamp'] + PRICE_COLUMNS:
+        assert len(np.load(os.path.join(archive._dir('BTC/USDT', '1m'), f'{name}.npy'))) == 110
+
+
+def test_archive_append_overwrites_partial_write(archive):
+    archive.save('BTC/USDT', '1m', candles(0, 10))
+    # 模拟上次追加只写完了价格列
+    close_path = os.path.join(archive._dir('BTC/USDT', '1m'), 'close.npy')
+    with open(close_path, 'ab') as f:
+        f.write(np.arange(3, dtype=np.float64).tobytes())
+
+    archive.save('BTC/USDT', '1m', candles(10, 20))
+    df = archive.load('BTC/USDT', '1m')
+    np.testing.assert_array_equal(df['close'].to_numpy(), np.full(20, 1.5))
+
+
+def test_archive_overlapping_save_merges(archive):
+    archive.save('BTC/USDT', '1m', candles(100, 200))
+    archive.save('BTC/USDT', '1m', candles(150, 220, value=3.0))
+
+    df = archive.load('BTC/USDT', '1m')
+    assert len(df) == 120 and df.index.is_unique
+    assert (df['open'].to_numpy()[50:] == 3.0).all()
@@ -0,0 +1,136 @@
+"""numpy 指标后端与 ta 参考实现的一致性"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_registry import INDICATOR_REGISTRY, indicator_outputs, resolve_params
+from indicators import TechnicalIndicators
+from panel_indicators import PanelIndicators
+
+RTOL = 1e-9
+
+# 每个指标测试的参数：默认参数之外加一组非默认参数
+PARAMETER_SETS = [
+    {},
+    {'rsi_period': 6, 'kdj_k_period': 5, 'kdj_d_period': 2, 'bb_period': 7, 'bb_std': 1.5,
+     'ema_periods': [3, 50], 'sma_periods': [4, 30], 'macd_fast': 5, 'macd_slow': 35, 'macd_signal': 4,
+     'stoch_k_period': 21, 'stoch_d_period': 5, 'atr_period': 7},
+]
+
+
+def _as_frame(result, columns):
+    """把 calculate_* 的返回值统一为DataFrame"""
+    if isinstance(result, pd.Series):
+        return result.to_frame(columns[0])
+    return result
+
+
+def _calculate(df, name, params, backend):
+    """用指定后端计算一个注册指标的全部输出列"""
+    spec = INDICATOR_REGISTRY[name]
+    method = getattr(TechnicalIndicators, spec['method'])
+    values = resolve_params(name, params)
+    if 'series_param' in spec:
+        columns = indicator_outputs(name, params)
+        return pd.DataFrame({column: method(df, period, backend=backend)
+                             for period, column in zip(values[spec['series_param']], columns)})
+    return _as_frame(method(df, *values.values(), backend=backend), spec['outputs'])
+
+
+def assert_matches(actual, expected):
+    """NaN位置相同，其余位置相对误差不超过 RTOL"""
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    assert actual.shape == expected.shape
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    valid = ~np.isnan(expected)
+    # 零附近（如MACD柱状图穿越零轴）按序列量级的相对误差比较
+    scale = np.abs(expected[valid]).max(initial=0.0)
+    np.testing.assert_allclose(actual[valid], expected[valid], rtol=RTOL, atol=RTOL * scale)
+
+
+@pytest.mark.parametrize('params', PARAMETER_SETS)
+@pytest.mark.parametrize('name', list(INDICATOR_REGISTRY))
+@pytest.mark.parametrize('bars', [500, 30, 5, 1])
+def test_numpy_backend_matches_ta(make_ohlcv, name, params, bars):
+    df = make_ohlcv(bars, seed=bars)
+    expected = _calculate(df, name, params, 'ta')
+    actual = _calculate(df, name, params, 'numpy')
+
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        assert_matches(actual[column], expected[column])
+
+
+@pytest.mark.parametrize('params', PARAMETER_SETS)
+def test_calculate_all_indicators_matches_ta(make_ohlcv, params):
+    df = make_ohlcv(800, seed=7)
+    indicator_params = {name: True for name in INDICATOR_REGISTRY}
+    indicator_params.update(params)
+
+    expected = TechnicalIndicators.calculate_all_indicators(df, indicator_params, backend='ta')
+    actual = TechnicalIndicators.calculate_all_indicators(df, indicator_params, backend='numpy')
+
+    assert list(actual.columns) == list(expected.columns)
+    for column in expected.columns:
+        assert_matches(actual[column], expected[column])
+
+
+@pytest.mark.parametrize('params', PARAMETER_SETS)
+def test_panel_matches_ta_per_symbol(make_ohlcv, params):
+    # 后两个交易对在面板中途上市（都持续到面板末尾），第三个交易对只有少于指标周期的几根K线
+    frames = {
+        'AAA/USDT': make_ohlcv(600, seed=1),
+        'BBB/USDT': make_ohlcv(250, seed=2, start='2023-01-15 14:00'),
+        'CCC/USDT': make_ohlcv(4, seed=3, start='2023-01-25 20:00'),
+    }
+    indicator_params = {name: True for name in INDICATOR_REGISTRY}
+    indicator_params.update(params)
+
+    panel = PanelIndicators.from_frames(frames)
+    result = panel.calculate_all(indicator_params)
+
+    for position, (symbol, df) in enumerate(frames.items()):
+        expected = TechnicalIndicators.calculate_all_indicators(df, indicator_params, backend='ta')
+        listed = panel.index.get_loc(df.index[0])
+        end = listed + len(df)
+        for column in expected.columns:
+            if column in df.columns:
+                continue
+            values = np.asarray(result[column])[:, position]
+            assert np.isnan(values[:listed]).all(), (symbol, column)
+            assert_matches(values[listed:end], expected[column])
+
+
+def test_ta_shared_intermediates_match_ta_classes(make_ohlcv):
+    # ta后端共用的随机指标和EMA与直接调用ta库的指标类逐位相同
+    import ta
+
+    df = make_ohlcv(500, seed=11)
+    indicator_params = {'kdj': True, 'stoch': True, 'ema': True, 'macd': True,
+                        'kdj_k_period': 14, 'ema_periods': [12, 26, 50]}
+    result = TechnicalIndicators.calculate_all_indicators(df, indicator_params, backend='ta')
+
+    stoch = ta.momentum.StochasticOscillator(df['high'], df['low'], df['close'], window=14, smooth_window=3)
+    macd = ta.trend.MACD(df['close'], window_fast=12, window_slow=26, window_sign=9)
+    expected = {
+        'K': stoch.stoch(), 'D': stoch.stoch_signal(), 'Stoch_K': stoch.stoch(), 'Stoch_D': stoch.stoch_signal(),
+        'MACD': macd.macd(), 'MACD_signal': macd.macd_signal(), 'MACD_histogram': macd.macd_diff(),
+        'EMA_50': ta.trend.EMAIndicator(df['close'], window=50).ema_indicator()
+    }
+    for column, values in expected.items():
+        np.testing.assert_array_equal(result[column].to_numpy(), values.to_numpy())
+
+
+def test_lazy_rows_view_matches_full_history(make_ohlcv):
+    # 视图中的指标在完整数据上计算后再截取，与对完整结果切片相同
+    df = make_ohlcv(300, seed=2)
+    indicator_params = {'rsi': True, 'macd': True, 'boll': True}
+    lazy = TechnicalIndicators.calculate_all_indicators(df, indicator_params, lazy=True)
+    view = lazy.rows(100)
+
+    assert len(view) == 200 and view.index[0] == df.index[100]
+    expected = TechnicalIndicators.calculate_all_indicators(df, indicator_params)
+    pd.testing.assert_frame_equal(view.to_frame(), expected.iloc[100:], check_dtype=False)
+    assert 'RSI' in lazy.materialized_columns
@@ -0,0 +1,61 @@
+"""公开K线归档导入"""
+
+import zipfile
+
+import numpy as np
+import pytest
+
+from candle_archive import CandleArchive
+from data_store import OHLCVStore
+from kline_importer import KlineArchiveImporter
+
+MINUTE = 60_000
+
+
+def write_archive(path, first, last, header=False, microseconds=False):
+    """写一个 [first, last) 分钟的归档压缩包"""
+    lines = ['open_time,open,high,low,close,volume,close_time'] if header else []
+    for i in range(first, last):
+        timestamp = i * MINUTE * (1000 if microseconds else 1)
+        lines.append(f"{timestamp},1.0,2.0,0.5,1.5,{i},{timestamp + MINUTE - 1}")
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr(path.name.replace('.zip', '.csv'), '\n'.join(lines) + '\n')
+    return str(path)
+
+
+@pytest.fixture(params=[OHLCVStore, CandleArchive])
+def store(request, tmp_path):
+    store = request.param(str(tmp_path / 'store'))
+    saves = []
+    original = store.save
+
+    def save(symbol, timeframe, ohlcv):
+        # 记录每次写入是否晚于已有数据（即走尾部追加路径）
+        coverage = store.coverage(symbol, timeframe)
+        saves.append(coverage is None or ohlcv['timestamp'].min() > coverage[1])
+        original(symbol, timeframe, ohlcv)
+
+    store.save = save
+    store.saves = saves
+    return store
+
+
+def test_sequential_files_only_append(tmp_path, store):
+    files = [write_archive(tmp_path / 'BTCUSDT-1m-2024-01.zip', 0, 1000, header=True),
+             write_archive(tmp_path / 'BTCUSDT-1m-2024-02.zip', 1000, 2500, microseconds=True)]
+    summary = KlineArchiveImporter(store, chunk_size=300).import_files(files)
+
+    assert summary == {('BTC/USDT', '1m'): 2500}
+    assert len(store.saves) == 4 + 5 and all(store.saves)
+    df = store.load('BTC/USDT', '1m')
+    np.testing.assert_array_equal(df['volume'].to_numpy(), np.arange(2500))
+
+
+def test_overlapping_file_merges_once(tmp_path, store):
+    importer = KlineArchiveImporter(store, chunk_size=300)
+    importer.import_file(write_archive(tmp_path / 'BTCUSDT-1m-2024-02.zip', 1000, 2000))
+    importer.import_file(write_archive(tmp_path / 'BTCUSDT-1m-2024-01.zip', 0, 1200))
+
+    assert store.saves.count(False) == 1
+    df = store.load('BTC/USDT', '1m')
+    np.testing.assert_array_equal(df['volume'].to_numpy(), np.arange(2000))
@@ -0,0 +1,28 @@
+"""多进程参数扫描"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_backtest import BatchBacktest
+from parameter_sweep import METRIC_COLUMNS, ParameterSweep
+
+GRID = {'rsi': [True], 'rsi_oversold': [25, 35], 'stop_loss': [None, 0.03]}
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_matches_batch_backtest(make_ohlcv, max_workers):
+    df = make_ohlcv(800, seed=4)
+    result = ParameterSweep(df, max_workers=max_workers, backend='numpy').run(GRID)
+    expected = BatchBacktest(df, backend='numpy').run(GRID)
+    pd.testing.assert_frame_equal(result[METRIC_COLUMNS], expected[METRIC_COLUMNS],
+                                  check_dtype=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_worker_errors_propagate(make_ohlcv, max_workers):
+    # 组合回测中的异常不能被吞掉变成NaN结果
+    df = make_ohlcv(200, seed=4)
+    grid = [{'rsi': True, 'initial_capital': 10000}, {'rsi': True, 'initial_capital': None}]
+    with pytest.raises(TypeError):
+        ParameterSweep(df, max_workers=max_workers, backend='numpy').run(grid)
@@ -0,0 +1,80 @@
+"""多交易对组合回测"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_engine import BacktestEngine
+from indicators import TechnicalIndicators
+from portfolio_backtest import PortfolioBacktest
+
+PARAMS = {'rsi': True, 'kdj': True, 'boll': True, 'ema': True, 'macd': True}
+
+
+@pytest.mark.parametrize('engine_args', [(10000, 0.001, None, None), (10000, 0.001, 0.03, 0.02)])
+def test_single_symbol_matches_engine(make_ohlcv, engine_args):
+    df = make_ohlcv(3000, seed=9)
+    results = PortfolioBacktest(*engine_args).run_backtest({'AAA/USDT': df}, PARAMS)
+
+    indicators = TechnicalIndicators.calculate_all_indicators(df, PARAMS, backend='numpy')
+    expected = BacktestEngine(*engine_args).run_backtest(indicators, PARAMS)
+
+    trades = results['trades'].drop(columns='symbol')
+    pd.testing.assert_frame_equal(trades, expected['trades'][trades.columns], check_dtype=False)
+    assert results['final_equity'] == pytest.approx(expected['final_equity'], rel=1e-12)
+    assert results['win_rate'] == pytest.approx(expected['win_rate'])
+
+    # 权益曲线的记录规则相同（止盈止损K线不记录），时间戳和数值逐条一致
+    columns = ['timestamp', 'equity', 'capital']
+    pd.testing.assert_frame_equal(results['equity_curve'][columns], expected['equity_curve'][columns],
+                                  check_dtype=False, rtol=1e-12)
+    for metric in ['total_return', 'annual_return', 'max_drawdown', 'sharpe_ratio']:
+        assert results[metric] == pytest.approx(expected[metric], rel=1e-9), metric
+
+
+def _replace_signals(portfolio, pattern):
+    """替换信号：按 pattern（时间 × 交易对 的函数）给出买卖信号"""
+    portfolio.calculate_signals = lambda indicators, close, params: pattern(np.shape(close))
+
+
+def test_no_trades_on_filled_bars(make_ohlcv):
+    full = make_ohlcv(600, seed=10)
+    short = make_ohlcv(300, seed=11)
+    # 第二个交易对有一段缺口，且数据比面板早结束
+    gapped = short.drop(short.index[100:150])
+    frames = {'AAA/USDT': full, 'BBB/USDT': gapped}
+
+    portfolio = PortfolioBacktest(max_positions=2)
+    # 每隔几根K线交替出现买入和卖出信号
+    _replace_signals(portfolio, lambda shape: np.tile(np.resize([1, 0, 0, -1, 0], shape[0])[:, None], (1, shape[1])))
+    results = portfolio.run_backtest(frames, {}, skip_warmup=False)
+
+    trades = results['trades']
+    traded = trades[trades['symbol'] == 'BBB/USDT']
+    assert traded['timestamp'].isin(gapped.index).all()
+    assert traded['price'].to_numpy() == pytest.approx(gapped['close'].reindex(traded['timestamp']).to_numpy())
+
+    # 最后一根实际K线之后不再交易、不再持有
+    last = gapped.index[-1]
+    assert traded['timestamp'].max() <= last
+    assert traded.iloc[-1]['action'] != 'BUY'
+    assert (results['positions'].loc[results['positions'].index > last, 'BBB/USDT'] == 0).all()
+
+
+def test_position_held_into_delisting_is_closed_at_last_real_bar(make_ohlcv):
+    full = make_ohlcv(400, seed=12)
+    ended = make_ohlcv(200, seed=13)
+    portfolio = PortfolioBacktest(max_positions=2)
+
+    def pattern(shape):
+        signals = np.zeros(shape, dtype=np.int8)
+        signals[150] = 1  # 买入后不再有卖出信号
+        return signals
+
+    _replace_signals(portfolio, pattern)
+    results = portfolio.run_backtest({'AAA/USDT': full, 'BBB/USDT': ended}, {}, skip_warmup=False)
+
+    trades = results['trades'].set_index(['symbol', 'action'])
+    assert trades.loc[('BBB/USDT', 'SELL'), 'timestamp'] == ended.index[-1]
+    assert trades.loc[('BBB/USDT', 'SELL'), 'price'] == ended['close'].iloc[-1]
+    assert trades.loc[('AAA/USDT', 'SELL'), 'timestamp'] == full.index[-1]
@@ -0,0 +1,38 @@
+"""交易信号规则"""
+
+import numpy as np
+import pytest
+
+from backtest_engine import BacktestEngine
+from indicators import TechnicalIndicators
+from panel_indicators import PanelIndicators
+from signal_rules import signal_matrix
+
+STRATEGIES = [
+    {'rsi': True, 'rsi_oversold': 35, 'rsi_overbought': 65},
+    {'kdj': True, 'kdj_buy_threshold': 30, 'kdj_sell_threshold': 70},
+    {'boll': True},
+    {'ema': True, 'ema_periods': [5, 20], 'ema_short': 5, 'ema_long': 20},
+    {'ema': True, 'ema_periods': [5], 'ema_short': 5, 'ema_long': 20},  # 长期EMA未计算，规则不生效
+    {'macd': True},
+    {'rsi': True, 'kdj': True, 'boll': True, 'ema': True, 'macd': True},
+]
+
+
+@pytest.mark.parametrize('strategy', STRATEGIES)
+def test_panel_columns_match_single_symbol(make_ohlcv, strategy):
+    frames = {symbol: make_ohlcv(400, seed=seed) for seed, symbol in enumerate(['AAA', 'BBB', 'CCC'])}
+    panel = PanelIndicators.from_frames(frames)
+    signals = signal_matrix(panel.calculate_all(strategy), panel.close, strategy)
+
+    for k, df in enumerate(frames.values()):
+        indicators = TechnicalIndicators.calculate_all_indicators(df, strategy, backend='numpy')
+        expected = BacktestEngine().calculate_signals(indicators, strategy)
+        np.testing.assert_array_equal(signals[:, k], expected.to_numpy())
+
+
+def test_missing_inputs_skip_rule(make_ohlcv):
+    df = make_ohlcv(200, seed=1)
+    strategy = {'ema': True, 'ema_periods': [5], 'ema_short': 5, 'ema_long': 20}
+    indicators = TechnicalIndicators.calculate_all_indicators(df, strategy, backend='numpy')
+    assert not signal_matrix(indicators, df['close'], strategy).any()
@@ -0,0 +1,111 @@
+"""增量指标与批量计算的一致性"""
+
+import numpy as np
+import pytest
+
+import indicator_kernels as kernels
+from indicators import TechnicalIndicators
+from streaming_indicators import RollingStats, StreamingATR, StreamingEMA, StreamingMACD, StreamingRSI
+
+# 递推顺序与pandas/NumPy的实现相同，只允许浮点舍入级别的差异
+RTOL = 1e-10
+# RollingStats 的滑动Welford更新与按窗口重新求和的差异在1e-12量级（见类文档），标准差相对误差放宽到1e-9
+ROLLING_RTOL = 1e-9
+
+
+def assert_stream_matches(values, expected, rtol=RTOL):
+    """NaN位置完全相同，其余按相对误差比较"""
+    values = np.asarray(values, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(values), np.isnan(expected))
+    np.testing.assert_allclose(values, expected, rtol=rtol, atol=rtol * np.nanmax(np.abs(expected), initial=1.0))
+
+
+@pytest.fixture(params=[3, 300])
+def df(request, make_ohlcv):
+    return make_ohlcv(request.param, seed=5)
+
+
+@pytest.mark.parametrize('backend', ['ta', 'numpy'])
+@pytest.mark.parametrize('period', [1, 5, 12])
+def test_ema(df, backend, period):
+    stream = StreamingEMA(period)
+    values = [stream.update(close) for close in df['close']]
+    assert_stream_matches(values, TechnicalIndicators.calculate_ema(df, period, backend=backend))
+    assert_stream_matches(values, kernels.ema(df['close'].to_numpy(), period))
+
+
+@pytest.mark.parametrize('backend', ['ta', 'numpy'])
+@pytest.mark.parametrize('period', [2, 14])
+def test_rsi(df, backend, period):
+    stream = StreamingRSI(period)
+    values = [stream.update(close) for close in df['close']]
+    assert_stream_matches(values, TechnicalIndicators.calculate_rsi(df, period, backend=backend))
+
+
+def test_rsi_all_gains_is_100(make_ohlcv):
+    stream = StreamingRSI(3)
+    values = [stream.update(close) for close in np.arange(1.0, 11.0)]
+    assert np.isnan(values[:2]).all()
+    assert values[2:] == [100.0] * 8
+
+
+@pytest.mark.parametrize('backend', ['ta', 'numpy'])
+@pytest.mark.parametrize('periods', [(12, 26, 9), (3, 5, 2)])
+def test_macd(df, backend, periods):
+    stream = StreamingMACD(*periods)
+    values = np.array([stream.update(close) for close in df['close']]).reshape(-1, 3)
+    expected = TechnicalIndicators.calculate_macd(df, *periods, backend=backend)
+    for k, column in enumerate(['MACD', 'MACD_signal', 'MACD_histogram']):
+        assert_stream_matches(values[:, k], expected[column])
+
+
+@pytest.mark.parametrize('backend', ['ta', 'numpy'])
+@pytest.mark.parametrize('period', [1, 14])
+def test_atr(df, backend, period):
+    stream = StreamingATR(period)
+    values = [stream.update(high, low, close) for high, low, close in zip(df['high'], df['low'], df['close'])]
+    expected = TechnicalIndicators.calculate_atr(df, period, backend=backend)
+    if len(df) < period:
+        # 批量计算在数据不足一个周期时整列为NaN，增量计算无法预知后续数据，预热期内仍输出0
+        assert np.isnan(expected).all() and values == [0.0] * len(df)
+    else:
+        assert_stream_matches(values, expected)
+
+
+@pytest.mark.parametrize('backend', ['ta', 'numpy'])
+@pytest.mark.parametrize('window', [1, 20])
+def test_rolling_stats(df, backend, window):
+    stats = RollingStats(window)
+    means, stds, bands = [], [], []
+    for close in df['close']:
+        mean, std = stats.update(close)
+        means.append(mean)
+        stds.append(std)
+        bands.append(stats.bands(2))
+    bands = np.array(bands).reshape(-1, 3)
+
+    assert_stream_matches(means, TechnicalIndicators.calculate_sma(df, window, backend=backend), ROLLING_RTOL)
+    assert_stream_matches(stds, kernels.rolling_std(df['close'].to_numpy(), window), ROLLING_RTOL)
+    expected = TechnicalIndicators.calculate_bollinger_bands(df, window, 2, backend=backend)
+    for k, column in enumerate(['BB_upper', 'BB_middle', 'BB_lower']):
+        assert_stream_matches(bands[:, k], expected[column], ROLLING_RTOL)
+
+
+def test_rolling_stats_long_run_does_not_drift():
+    # 价格水平很高、窗口很小时累计误差最明显；周期性重新求和后仍与精确值一致
+    values = 1e6 + np.random.default_rng(3).normal(size=20000)
+    stats = RollingStats(7)
+    stds = [stats.update(value)[1] for value in values]
+    assert_stream_matches(stds, kernels.rolling_std(values, 7), ROLLING_RTOL)
+
+
+def test_seed_then_update_matches_streaming(df):
+    closes = df['close'].to_numpy()
+    half = len(closes) // 2
+    seeded, streamed = StreamingMACD(), StreamingMACD()
+    seeded.seed(closes[:half])
+    for close in closes[:half]:
+        streamed.update(close)
+    for close in closes[half:]:
+        np.testing.assert_array_equal(seeded.update(close), streamed.update(close))
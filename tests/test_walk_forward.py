@@ -0,0 +1,25 @@
+"""滚动窗口前推优化"""
+
+import pytest
+
+from walk_forward import WalkForward
+
+GRID = {'rsi': [True], 'rsi_oversold': [25, 35], 'take_profit': [None, 0.03]}
+
+
+def test_out_of_sample_windows_are_contiguous(make_ohlcv):
+    df = make_ohlcv(3000, seed=8)
+    walk = WalkForward(df, train='40D', test='10D', max_workers=1)
+    results = walk.run(GRID)
+
+    timestamps = results['equity_curve']['timestamp']
+    assert timestamps.is_unique and timestamps.is_monotonic_increasing
+    windows = walk.windows(13)
+    for (_, _, test_end), (_, next_start, _) in zip(windows, windows[1:]):
+        assert test_end == next_start
+
+
+@pytest.mark.parametrize('step', ['5D', '15D'])
+def test_step_must_equal_test(make_ohlcv, step):
+    with pytest.raises(ValueError):
+        WalkForward(make_ohlcv(3000, seed=8), train='40D', test='10D', step=step)
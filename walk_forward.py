@@ -0,0 +1,190 @@
+"""
+滚动窗口前推优化（walk-forward）
+
+把历史切成滚动的训练/测试窗口：在每个训练窗口上用 BatchBacktest 搜索参数网格，
+取目标指标最优的参数在紧随其后的测试窗口上做样本外回测，再把各测试窗口的权益曲线
+首尾相接（每个测试窗口以上一个窗口结束时的资金开始）。
+
+指标在完整历史上计算并在各窗口间复用：指标只依赖过去的K线，窗口切片开头已完成预热，
+不需要每个窗口重新计算。各训练窗口的参数搜索相互独立，可多进程并行。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from backtest_engine import BacktestEngine
+from batch_backtest import BatchBacktest
+from config import DEFAULT_CONFIG
+from indicator_cache import IndicatorCache
+from indicator_registry import warmup_bars
+from indicators import TechnicalIndicators
+from parameter_sweep import ENGINE_PARAMETER_KEYS, attach_frame, expand_grid, share_frame
+
+# 工作进程内的状态：共享内存句柄、批量回测器（其中缓存了完整历史上的指标）、参数组合和目标指标
+_worker = {}
+
+
+def _best_combo(batch, combos, bars, objective):
+    """
+    在一个训练窗口上回测全部组合，返回目标指标最大的组合
+
+    Returns:
+        (组合位置, 目标指标值)
+    """
+    metrics = batch.run(combos, bars=bars, skip_warmup=False)
+    best = int(metrics[objective].to_numpy().argmax())
+    return best, float(metrics[objective].iloc[best])
+
+
+def _init_worker(spec, backend, combos, objective):
+    """工作进程初始化：映射共享内存中的K线数据"""
+    handles, df = attach_frame(spec)
+    _worker.update(handles=handles, batch=BatchBacktest(df, backend=backend), combos=combos, objective=objective)
+
+
+def _optimize_window(bars):
+    """在工作进程中优化一个训练窗口"""
+    return _best_combo(_worker['batch'], _worker['combos'], bars, _worker['objective'])
+
+
+class WalkForward:
+    """滚动窗口前推优化"""
+
+    def __init__(self, df, base_params=None, train='180D', test='30D', step=None, objective='sharpe_ratio',
+                 max_workers=None, backend=None):
+        """
+        初始化前推优化
+
+        Args:
+            df: OHLCV数据DataFrame
+            base_params: 所有组合共用的参数（策略参数和引擎参数），网格中的同名参数会覆盖
+            train: 训练窗口长度，K线数或时间长度字符串（如 '180D'）
+            test: 测试窗口长度，K线数或时间长度字符串
+            step: 窗口每次前移的长度，None 表示等于测试窗口；必须等于测试窗口长度，
+                  否则测试窗口会重叠（样本外K线重复计入）或相互间隔（遗漏K线）
+            objective: 训练窗口上选择参数的指标（METRIC_COLUMNS 之一），取最大值；
+                       max_drawdown 为负数，取最大即回撤最小
+            max_workers: 并行优化训练窗口的进程数，None使用 config 中 parameter_sweep 的设置（默认CPU核数），
+                         1为在当前进程中串行执行
+            backend: 指标计算后端，None 使用 config 中的 indicator_backend
+        """
+        self.df = df
+        self.base_params = dict(base_params or {})
+        self.train_bars = self._to_bars(train)
+        self.test_bars = self._to_bars(test)
+        self.step_bars = self._to_bars(step) if step is not None else self.test_bars
+        if self.step_bars != self.test_bars:
+            raise ValueError(f"窗口前移长度({self.step_bars}根K线)必须等于测试窗口长度({self.test_bars}根K线)，"
+                             f"样本外权益曲线才能首尾相接")
+        self.objective = objective
+        self.max_workers = max_workers or DEFAULT_CONFIG['parameter_sweep']['max_workers'] or os.cpu_count()
+        self.backend = backend
+        self.cache = IndicatorCache(**DEFAULT_CONFIG['indicator_cache'])
+
+    def _to_bars(self, length):
+        """把时间长度字符串按K线间隔换算为K线数"""
+        if isinstance(length, str):
+            interval = pd.Series(self.df.index).diff().median()
+            return max(1, int(pd.Timedelta(length) / interval))
+        return int(length)
+
+    def windows(self, first=0):
+        """
+        划分训练/测试窗口
+
+        Args:
+            first: 第一个训练窗口的起始位置（通常为指标预热K线数）
+
+        Returns:
+            [(训练起始, 测试起始, 测试结束)] K线位置列表，训练窗口为 [训练起始, 测试起始)，
+            测试窗口为 [测试起始, 测试结束)，最后一个测试窗口可能不足 test 长度
+        """
+        windows = []
+        start = first
+        while start + self.train_bars < len(self.df):
+            test_start = start + self.train_bars
+            windows.append((start, test_start, min(test_start + self.test_bars, len(self.df))))
+            start += self.step_bars
+        return windows
+
+    def run(self, grid):
+        """
+        运行前推优化
+
+        Args:
+            grid: 参数网格 {参数名: 取值列表} 或参数字典列表，见 parameter_sweep.expand_grid
+
+        Returns:
+            dict: 拼接后的样本外回测结果（字段与 BacktestEngine.get_results 相同，
+                  equity_curve 和 trades 中的 window 列为所属窗口序号），
+                  另有 windows：每个窗口的起止时间、选中的参数、训练目标值和样本外表现
+        """
+        combos = expand_grid(grid)
+        params = [{**self.base_params, **combo} for combo in combos]
+        first = max((warmup_bars(combo) for combo in params), default=0)
+        windows = self.windows(first)
+        if not combos or not windows:
+            print("数据不足以划分训练/测试窗口")
+            return {}
+
+        # 训练窗口参数搜索
+        training = [(start, test_start) for start, test_start, _ in windows]
+        workers = min(self.max_workers, len(windows))
+        if workers <= 1:
+            batch = BatchBacktest(self.df, backend=self.backend)
+            best = [_best_combo(batch, params, bars, self.objective) for bars in training]
+        else:
+            handles, spec = share_frame(self.df)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(spec, self.backend, params, self.objective)) as executor:
+                    best = list(executor.map(_optimize_window, training))
+            finally:
+                for handle in handles:
+                    handle.close()
+                    handle.unlink()
+
+        # 样本外回测：按窗口顺序依次进行，资金在窗口间延续
+        initial_capital = self.base_params.get('initial_capital', DEFAULT_CONFIG['initial_capital'])
+        capital = initial_capital
+        equity_parts, trade_parts, rows = [], [], []
+        index = self.df.index
+
+        for window, ((start, test_start, test_end), (choice, train_value)) in enumerate(zip(windows, best)):
+            combo = params[choice]
+            strategy_params = {key: value for key, value in combo.items() if key not in ENGINE_PARAMETER_KEYS}
+            engine = BacktestEngine(capital, combo.get('commission', DEFAULT_CONFIG['commission']),
+                                    combo.get('take_profit'), combo.get('stop_loss'))
+            indicators = TechnicalIndicators.calculate_all_indicators(
+                self.df, strategy_params, compact=False, backend=self.backend, cache=self.cache)
+            results = engine.run_backtest(indicators.iloc[test_start:test_end], strategy_params, skip_warmup=False)
+
+            equity_parts.append(results['equity_curve'][['timestamp', 'equity', 'capital', 'position', 'price']]
+                                .assign(window=window))
+            if not results['trades'].empty:
+                trade_parts.append(results['trades'].assign(window=window))
+
+            rows.append({
+                'window': window,
+                'train_start': index[start],
+                'test_start': index[test_start],
+                'test_end': index[test_end - 1],
+                **combos[choice],
+                f'train_{self.objective}': train_value,
+                'test_return': results['total_return'],
+                'test_max_drawdown': results['max_drawdown'],
+                'test_trades': results['total_trades'],
+                'start_capital': capital,
+                'end_capital': engine.capital
+            })
+            capital = engine.capital
+
+        # 用回测引擎对拼接后的权益曲线和交易记录计算整体指标
+        summary = BacktestEngine(initial_capital)
+        summary.equity_curve = pd.concat(equity_parts, ignore_index=True)
+        summary.trades = pd.concat(trade_parts, ignore_index=True).to_dict('records') if trade_parts else []
+        results = summary.get_results()
+        results['windows'] = pd.DataFrame(rows)
+        return results